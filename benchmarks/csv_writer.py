@@ -0,0 +1,93 @@
+"""
+Rows per second of the per-row pandas to_csv(mode="a") compared to the CsvWriter
+
+The rows are added by concurrent coroutines like the products of the category page
+
+Usage:
+    python benchmarks/csv_writer.py --rows 1000000 --concurrency 20 --files 50
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import pandas as pd
+
+
+# isort: off
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_crawler.csvwriter import close_csv_writers, write_row  # noqa: E402
+
+# isort: on
+
+
+COLUMNS = [f"column_{idx}" for idx in range(20)]
+
+
+def series(idx: int) -> dict[str, str | int]:
+    return {
+        column: f"value {idx}, {column}" if position % 2 else idx
+        for position, column in enumerate(COLUMNS)
+    }
+
+
+async def to_csv_per_row(
+    series: dict[str, str | int], columns: list[str], filename: str
+):
+    exists = await asyncio.to_thread(os.path.exists, filename)
+    pd.DataFrame([series], columns=columns).to_csv(
+        filename,  # type: ignore
+        mode="a",  # type: ignore
+        header=not exists,
+        encoding="utf-8-sig",
+        index=False,
+    )
+
+
+async def measure(name: str, save, rows: int, concurrency: int, files: int):
+    with TemporaryDirectory() as directory:
+        filenames = [os.path.join(directory, f"{idx}.csv") for idx in range(files)]
+
+        async def worker(start: int):
+            for idx in range(start, rows, concurrency):
+                await save(series(idx), COLUMNS, filenames[idx % files])
+
+        start_time = perf_counter()
+        await asyncio.gather(*(worker(start) for start in range(concurrency)))
+        await close_csv_writers()
+        elapsed = perf_counter() - start_time
+
+        written = sum(len(pd.read_csv(filename)) for filename in filenames)
+        assert written == rows, f"{written} rows written instead of {rows}"
+
+    print(f"{name: <24} {rows / elapsed: >12.1f} rows/s ({elapsed:.2f}s)")
+
+
+async def main(rows: int, concurrency: int, files: int, baseline_rows: int):
+    # ? Per-row to_csv() takes minutes for 1M rows, so it can be measured on fewer rows
+    await measure(
+        "to_csv() per row",
+        to_csv_per_row,
+        min(rows, baseline_rows),
+        concurrency,
+        files,
+    )
+    await measure("CsvWriter", write_row, rows, concurrency, files)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--baseline_rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.concurrency, args.files, args.baseline_rows))
@@ -0,0 +1,147 @@
+"""
+Pages per second of new_page()/close() per product compared to the PagePool
+
+Usage:
+    python benchmarks/page_pool.py --pages 500 --concurrency 10
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+from playwright.async_api import async_playwright
+
+
+# isort: off
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_crawler.browser import PagePool  # noqa: E402
+
+# isort: on
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from playwright.async_api import BrowserContext
+
+
+PRODUCT_HTML = """
+<html>
+<head><title>Product</title></head>
+<body>
+<div class="product"><h1>Product</h1><span class="price">10,000</span></div>
+{images}
+</body>
+</html>
+""".format(
+    images="".join(f"<p>Detail {idx}</p>" for idx in range(200))
+)
+
+
+async def serve() -> tuple[web.AppRunner, str]:
+    async def product(_: web.Request):
+        return web.Response(text=PRODUCT_HTML, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/product/{idx}", product)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/product"
+
+
+async def new_page_per_product(context: BrowserContext, url: str):
+    page = await context.new_page()
+    await page.goto(url, wait_until="load")
+    await page.content()
+    await page.close()
+
+
+def pooled(pool: PagePool) -> Callable[[BrowserContext, str], Awaitable[None]]:
+    async def visit(_: BrowserContext, url: str):
+        async with pool.page() as page:
+            await page.goto(url, wait_until="load")
+            await page.content()
+
+    return visit
+
+
+async def measure(
+    name: str,
+    visit: Callable[[BrowserContext, str], Awaitable[None]],
+    context: BrowserContext,
+    base_url: str,
+    pages: int,
+    concurrency: int,
+):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def task(idx: int):
+        async with semaphore:
+            await visit(context, f"{base_url}/{idx}")
+
+    start_time = perf_counter()
+    await asyncio.gather(*(task(idx) for idx in range(pages)))
+    elapsed = perf_counter() - start_time
+    print(f"{name: <24} {pages / elapsed: >8.1f} pages/s ({elapsed:.2f}s)")
+
+
+async def main(pages: int, concurrency: int, max_reuse: int):
+    runner, base_url = await serve()
+    try:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context()
+
+            # ? Warm up the browser so that the first pattern doesn't pay the start-up cost
+            await measure(
+                "warm up", new_page_per_product, context, base_url, 10, concurrency
+            )
+
+            await measure(
+                "new_page() per product",
+                new_page_per_product,
+                context,
+                base_url,
+                pages,
+                concurrency,
+            )
+
+            pool = PagePool(
+                browser=context,  # type: ignore
+                max_reuse=max_reuse,
+                max_idle=concurrency,
+            )
+            await measure(
+                f"PagePool (reuse {max_reuse})",
+                pooled(pool),
+                context,
+                base_url,
+                pages,
+                concurrency,
+            )
+            await pool.close()
+
+            await browser.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--max_reuse", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pages, args.concurrency, args.max_reuse))
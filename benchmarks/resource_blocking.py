@@ -0,0 +1,190 @@
+"""
+Page load time and bytes downloaded with the HTTP cache (no routing) compared to the ResourceBlocker (routing disables the HTTP cache)
+
+Every product page has its own images, and the same stylesheet and script (cacheable) as the other pages, so the blocked images are weighed against the shared files downloaded again for every page
+
+Usage:
+    python benchmarks/resource_blocking.py --pages 200 --concurrency 10 --image_size 80000 --static_size 150000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+from playwright.async_api import async_playwright
+
+
+# isort: off
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_crawler.browser import (  # noqa: E402
+    BLOCKED_RESOURCE_TYPES,
+    TRACKER_HOSTS,
+    ResourceBlocker,
+)
+
+# isort: on
+
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser
+
+
+PRODUCT_HTML = """
+<html>
+<head>
+<title>Product</title>
+<link rel="stylesheet" href="/static/style.css">
+<script src="/static/app.js"></script>
+</head>
+<body>
+<div class="product"><h1>Product {idx}</h1><span class="price">10,000</span></div>
+{images}
+</body>
+</html>
+"""
+
+
+class Server:
+    def __init__(self, image_size: int, static_size: int) -> None:
+        self.image = b"\xff" * image_size
+        self.stylesheet = b"/* style */" + b" " * static_size
+        self.script = b"// app" + b" " * static_size
+        self.bytes_sent = 0
+
+    async def product(self, request: web.Request):
+        idx = request.match_info["idx"]
+        images = "".join(f'<img src="/images/{idx}-{n}.jpg">' for n in range(5))
+        body = PRODUCT_HTML.format(idx=idx, images=images).encode()
+        self.bytes_sent += len(body)
+        return web.Response(body=body, content_type="text/html")
+
+    async def static(self, request: web.Request):
+        if request.match_info["name"] == "style.css":
+            body, content_type = self.stylesheet, "text/css"
+        else:
+            body, content_type = self.script, "application/javascript"
+        self.bytes_sent += len(body)
+        return web.Response(
+            body=body,
+            content_type=content_type,
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+
+    async def images(self, _: web.Request):
+        self.bytes_sent += len(self.image)
+        return web.Response(body=self.image, content_type="image/jpeg")
+
+    async def start(self) -> tuple[web.AppRunner, str]:
+        app = web.Application()
+        app.router.add_get("/product/{idx}", self.product)
+        app.router.add_get("/static/{name}", self.static)
+        app.router.add_get("/images/{name}", self.images)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        return runner, f"http://127.0.0.1:{port}/product"
+
+
+async def measure(
+    name: str,
+    browser: Browser,
+    server: Server,
+    base_url: str,
+    pages: int,
+    concurrency: int,
+    blocker: ResourceBlocker | None = None,
+):
+    # ? New context for every pattern, so that they don't share the HTTP cache
+    context = await browser.new_context()
+    if blocker:
+        await context.route("**/*", blocker.handle)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def visit(idx: int):
+        async with semaphore:
+            page = await context.new_page()
+            await page.goto(f"{base_url}/{idx}", wait_until="load")
+            await page.close()
+
+    server.bytes_sent = 0
+    start_time = perf_counter()
+    await asyncio.gather(*(visit(idx) for idx in range(pages)))
+    elapsed = perf_counter() - start_time
+    print(
+        f"{name: <24} {pages / elapsed: >8.1f} pages/s ({elapsed:.2f}s) | {server.bytes_sent / 1_000_000: >8.1f} MB downloaded"
+    )
+
+    await context.close()
+
+
+async def main(pages: int, concurrency: int, image_size: int, static_size: int):
+    server = Server(image_size, static_size)
+    runner, base_url = await server.start()
+    try:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+
+            # ? Warm up the browser so that the first pattern doesn't pay the start-up cost
+            await measure("warm up", browser, server, base_url, 10, concurrency)
+
+            await measure(
+                "HTTP cache (no routing)",
+                browser,
+                server,
+                base_url,
+                pages,
+                concurrency,
+            )
+            await measure(
+                "ResourceBlocker",
+                browser,
+                server,
+                base_url,
+                pages,
+                concurrency,
+                ResourceBlocker(
+                    blocked_resource_types=BLOCKED_RESOURCE_TYPES,
+                    blocked_hosts=TRACKER_HOSTS,
+                    allowed_urls=(),
+                ),
+            )
+            # ? Routing without blocking anything only pays the lost HTTP cache
+            await measure(
+                "Routing, nothing blocked",
+                browser,
+                server,
+                base_url,
+                pages,
+                concurrency,
+                ResourceBlocker(
+                    blocked_resource_types=frozenset(),
+                    blocked_hosts=frozenset(),
+                    allowed_urls=(),
+                ),
+            )
+
+            await browser.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--image_size", type=int, default=80_000)
+    parser.add_argument("--static_size", type=int, default=150_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pages, args.concurrency, args.image_size, args.static_size))
@@ -0,0 +1,125 @@
+"""
+Lookups per second of the pickle file per product states compared to the StateStore
+
+Usage:
+    python benchmarks/state_store.py --products 100000 --categories 20
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import random
+import sys
+
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+
+# isort: off
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_crawler.state import ProductState  # noqa: E402
+from market_crawler.statestore import StateStore  # noqa: E402
+
+# isort: on
+
+
+DATE = "20240101"
+
+
+def keys(products: int, categories: int) -> list[tuple[str, str]]:
+    return [(f"category_{idx % categories}", f"{idx:08d}") for idx in range(products)]
+
+
+def save_pickle_files(directory: str, states: list[tuple[str, str]]):
+    for category_name, productid in states:
+        product_state = ProductState(
+            productid=productid,
+            category_name=category_name,
+            date=DATE,
+            sitename="benchmark",
+        )
+        product_state.done = True
+
+        os.makedirs(os.path.join(directory, DATE, category_name), exist_ok=True)
+        with open(
+            os.path.join(directory, DATE, category_name, f"{productid}.pkl"), "wb"
+        ) as f:
+            f.write(pickle.dumps(product_state))
+
+
+def lookup_pickle_file(directory: str, category_name: str, productid: str) -> bool:
+    file = os.path.join(directory, DATE, category_name, f"{productid}.pkl")
+    if not os.path.exists(file):
+        return False
+
+    with open(file, "rb") as f:
+        return pickle.loads(f.read()).done
+
+
+def measure(name: str, count: int, elapsed: float, unit: str = "lookups"):
+    print(f"{name: <32} {count / elapsed: >12.1f} {unit}/s ({elapsed:.2f}s)")
+
+
+def main(products: int, categories: int, misses: float):
+    states = keys(products, categories)
+    lookups = random.sample(states, len(states)) + [
+        (category_name, f"missing_{productid}")
+        for category_name, productid in random.sample(states, int(len(states) * misses))
+    ]
+    random.shuffle(lookups)
+
+    with TemporaryDirectory() as directory:
+        start_time = perf_counter()
+        save_pickle_files(directory, states)
+        measure("pickle files (save)", products, perf_counter() - start_time, "writes")
+
+        start_time = perf_counter()
+        for category_name, productid in lookups:
+            lookup_pickle_file(directory, category_name, productid)
+        measure("pickle files", len(lookups), perf_counter() - start_time)
+
+        # ? Opening the store migrates the pickle files that are saved above
+        start_time = perf_counter()
+        store = StateStore(directory=directory)
+        measure(
+            "StateStore (migrate)",
+            store.migrated,
+            perf_counter() - start_time,
+            "states",
+        )
+
+        start_time = perf_counter()
+        for category_name, productid in states:
+            store.save_product_state("20240102", category_name, productid, True)
+            # ? Batches are committed like market_crawler.state.commit_states() (without the CSV writers)
+            if store.commit_due:
+                store.commit()
+        store.flush()
+        measure(
+            f"StateStore (save, {store.commits} commits)",
+            products,
+            perf_counter() - start_time,
+            "writes",
+        )
+
+        start_time = perf_counter()
+        for category_name, productid in lookups:
+            store.product_state(DATE, category_name, productid)
+        measure("StateStore", len(lookups), perf_counter() - start_time)
+
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument(
+        "--misses", type=float, default=0.1, help="Ratio of the products not saved"
+    )
+    args = parser.parse_args()
+
+    main(args.products, args.categories, args.misses)
@@ -0,0 +1,97 @@
+"""
+Files per second of reading the temporary .CSV files with the ProcessPoolExecutor (per file) compared to the bulk reader (see market_crawler.tempreader), when it is run for the first time and when it is run again (i.e., generate.py) with the files unchanged
+
+Usage:
+    python benchmarks/temp_reader.py --files 3000 --rows 20 --columns 45
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import pandas as pd
+
+
+# isort: off
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_crawler.resume import chained_files  # noqa: E402
+from market_crawler.tempreader import read_temporary_files  # noqa: E402
+
+# isort: on
+
+
+def save_files(directory: str, files: int, rows: int, columns: int):
+    for file in range(files):
+        pd.DataFrame(
+            {
+                f"column_{column}": [
+                    f"value {file}, {row}, {column}" for row in range(rows)
+                ]
+                for column in range(columns)
+            }
+        ).to_csv(
+            os.path.join(directory, f"products_{file:05d}_1_temporary.csv"),
+            encoding="utf-8-sig",
+            index=False,
+        )
+
+
+def read_process_pool(directory: str) -> list[pd.DataFrame]:
+    with ProcessPoolExecutor(max_workers=cpu_count()) as executor:
+        results = [
+            executor.submit(
+                pd.read_csv,  # type: ignore
+                filename,
+                encoding="utf-8-sig",
+                dtype="str",
+            )
+            for filename in chained_files(directory, "*_temporary.csv")
+        ]
+
+    return [r.result() for r in results]
+
+
+def measure(
+    name: str, read, directory: str, files: int, expected: pd.DataFrame | None = None
+):
+    start_time = perf_counter()
+    dfs = read(directory)
+    elapsed = perf_counter() - start_time
+
+    df = pd.concat(dfs, ignore_index=True)
+    if expected is not None:
+        assert df.equals(expected), f"{name} doesn't read the same rows"
+
+    print(f"{name: <28} {files / elapsed: >12.1f} files/s ({elapsed:.2f}s)")
+    return df
+
+
+def main(files: int, rows: int, columns: int):
+    with TemporaryDirectory() as directory:
+        save_files(directory, files, rows, columns)
+
+        expected = measure("ProcessPoolExecutor", read_process_pool, directory, files)
+        measure("bulk reader", read_temporary_files, directory, files, expected)
+
+        # ? Files are unchanged, so they are taken from the manifest
+        measure(
+            "bulk reader (manifest)", read_temporary_files, directory, files, expected
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--columns", type=int, default=45)
+    args = parser.parse_args()
+
+    main(args.files, args.rows, args.columns)
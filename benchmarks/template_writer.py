@@ -0,0 +1,124 @@
+"""
+Rows per second of the cell by cell copying into the template (per mapped column) compared to the bulk template writer (see market_crawler.excel.copy_to_openpyxl_template())
+
+Usage:
+    python benchmarks/template_writer.py --rows 500000 --columns 45
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from types import SimpleNamespace
+
+import pandas as pd
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from excelsheet import col_to_excel, write_to_excel_template_cell_openpyxl
+
+
+# isort: off
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_crawler.excel import copy_to_openpyxl_template  # noqa: E402
+
+# isort: on
+
+
+def dataframe(rows: int, columns: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            f"column_{column}": [f"value {row}, {column}" for row in range(rows)]
+            for column in range(columns)
+        }
+    )
+
+
+def save_template(filename: str, columns: list[str]):
+    wb = Workbook()
+    ws = wb.active
+    assert ws
+
+    for idx, column in enumerate(columns, start=1):
+        cell = ws.cell(row=1, column=idx, value=column)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill("solid", fgColor="DDEBF7")
+        ws.column_dimensions[col_to_excel(idx)].width = 20
+
+    ws.freeze_panes = "A2"
+    wb.save(filename)
+
+
+def copy_cell_by_cell(
+    *,
+    df: pd.DataFrame,
+    output_file: str,
+    template_file: str,
+    column_mapping: dict[str, str],
+    crawl_data: SimpleNamespace,
+):
+    wb = load_workbook(template_file)
+    ws = wb.active
+
+    columns = tuple(df.columns)
+    col_dict = {columns[x - 1]: col_to_excel(x) for x in range(1, len(columns) + 1)}
+
+    for attr in vars(crawl_data):
+        column = column_mapping[attr]
+        write_to_excel_template_cell_openpyxl(
+            worksheet=ws, df=df, name=column, alphabet=col_dict[column]
+        )
+
+    wb.save(output_file.replace(".csv", ".xlsx"))
+
+
+def measure(name: str, copy, rows: int, columns: int):
+    df = dataframe(rows, columns)
+
+    # ? All the columns are filled, like the markets that map every column of the template
+    column_mapping = {f"attr_{idx}": column for idx, column in enumerate(df.columns)}
+    crawl_data = SimpleNamespace(**{attr: attr for attr in column_mapping})
+
+    with TemporaryDirectory() as directory:
+        template_file = os.path.join(directory, "template.xlsx")
+        output_file = os.path.join(directory, "output.csv")
+        save_template(template_file, list(df.columns))
+
+        start_time = perf_counter()
+        copy(
+            df=df,
+            output_file=output_file,
+            template_file=template_file,
+            column_mapping=column_mapping,
+            crawl_data=crawl_data,
+        )
+        elapsed = perf_counter() - start_time
+
+        # ? Write-only workbook doesn't save the dimensions of the worksheet, so the rows are counted
+        ws = load_workbook(output_file.replace(".csv", ".xlsx"), read_only=True).active
+        written = sum(1 for _ in ws.iter_rows(max_col=1, values_only=True))  # type: ignore
+        assert written == rows + 1, f"{written - 1} rows written instead of {rows}"
+
+    print(f"{name: <24} {rows / elapsed: >12.1f} rows/s ({elapsed:.2f}s)")
+
+
+def main(rows: int, columns: int, baseline_rows: int):
+    # ? Cell by cell copying keeps every cell of the template in memory, so it can be measured on fewer rows
+    measure("cell by cell", copy_cell_by_cell, min(rows, baseline_rows), columns)
+    measure("bulk template writer", copy_to_openpyxl_template, rows, columns)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--columns", type=int, default=45)
+    parser.add_argument("--baseline_rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    main(args.rows, args.columns, args.baseline_rows)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+
+from argparse import ArgumentParser
+from datetime import datetime
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+from colorama import init
+from playwright.async_api import async_playwright
+
+from dunia.browser import BrowserConfig
+from dunia.playwright import AsyncPlaywrightBrowser
+from market_crawler.extraction import load_content
+from market_crawler.fetching import save_fetch_modes, use_http_fetcher
+from market_crawler.initialization import get_categories
+from market_crawler.log import info, success, warning
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from dunia.playwright import PlaywrightBrowser
+    from market_crawler.fetching import HTTPFetcher, PageType
+    from market_crawler.initialization import Category
+
+
+class UnsavedHTML:
+    """
+    Calibration always loads the page from the URL, the HTML files saved by the crawler are never read
+    """
+
+    directory = ""
+    file = ""
+
+    async def exists(self) -> bool:
+        return False
+
+    async def load(self) -> str:
+        raise FileNotFoundError("HTML content is not saved for calibration")
+
+    async def save(self, content: str) -> None:
+        pass
+
+
+async def calibrate_page_type(
+    page_type: PageType,
+    categories: list[Category],
+    browser: PlaywrightBrowser,
+    fetcher: HTTPFetcher,
+    samples: int,
+    rate_limit: int,
+    async_timeout: int,
+) -> dict[str, Any]:
+    """
+    Compare the data extracted from the HTTP response with the data extracted from the browser for the sample URLs of the page type
+
+    The browser content is loaded through load_content() with the page type's "on_failure" and "wait_until" (see PageType), the same way as the crawler loads the page when it is not fetched with HTTP
+    """
+
+    async def load(url: str) -> str:
+        return await load_content(
+            browser=browser,
+            url=url,
+            html=UnsavedHTML(),
+            on_failure=page_type.on_failure,
+            wait_until=page_type.wait_until,
+            async_timeout=async_timeout,
+            rate_limit=rate_limit,
+        )
+
+    urls = (await page_type.urls(categories, load))[:samples]
+
+    matched = 0
+    for url in urls:
+        browser_data = await page_type.extract(await load(url), url)
+
+        http_data = None
+        if (content := await fetcher.get(url, rate_limit=rate_limit)) is not None:
+            try:
+                http_data = await page_type.extract(content, url)
+            except Exception as err:
+                warning(f"Data is not extracted from HTTP content ({err}): {url}")
+
+        if http_data == browser_data:
+            matched += 1
+            success(f"<light-cyan>{page_type.name}</>: Same data -> {url}")
+        else:
+            warning(f"{page_type.name}: Different data -> {url}")
+
+    mode = "http" if urls and matched == len(urls) else "browser"
+    info(
+        f"<light-cyan>{page_type.name}</>: {matched} of {len(urls)} pages have the same data (<light-green>{mode}</>)"
+    )
+
+    return {
+        "mode": mode,
+        "samples": len(urls),
+        "matched": matched,
+        "date": datetime.now().strftime("%Y%m%d"),
+    }
+
+
+async def calibrate(market: str, samples: int, headless: bool):
+    """
+    Record the fetch mode ("http" or "browser") for every page type of the market in fetch_modes.json (see market_crawler.fetching)
+
+    The market must define page_types() in its app.py, and the pages must not require the login (as the HTTP requests are sent without any cookies)
+    """
+    app: Any = import_module(f"market_crawler.{market}.app")
+    config: Any = import_module(f"market_crawler.{market}.config")
+
+    if not hasattr(app, "page_types"):
+        raise ValueError(
+            f"Market {market} doesn't define page_types() in app.py for calibration"
+        )
+
+    categories = await get_categories(sitename=config.SITENAME)
+
+    browser_config = BrowserConfig(
+        headless=headless,
+        default_navigation_timeout=config.DEFAULT_NAVIGATION_TIMEOUT,
+        default_timeout=config.DEFAULT_TIMEOUT,
+    )
+
+    modes: dict[str, Any] = {}
+    async with async_playwright() as playwright, use_http_fetcher() as fetcher:
+        browser = await AsyncPlaywrightBrowser(
+            browser_config=browser_config, playwright=playwright
+        ).create()
+
+        for page_type in app.page_types():
+            modes[page_type.name] = await calibrate_page_type(
+                page_type,
+                categories,
+                browser,
+                fetcher,
+                samples,
+                config.DEFAULT_RATE_LIMIT,
+                config.DEFAULT_ASYNC_TIMEOUT,
+            )
+
+    filepath = save_fetch_modes(config.SITENAME, modes)
+    success(f"Fetch modes saved to <light-cyan>{filepath}</>")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--market",
+        help="Market that needs calibration",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--samples",
+        help="Number of pages compared for every page type",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--headless",
+        help="Headless mode",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    init(autoreset=True)
+
+    asyncio.run(calibrate(args.market, args.samples, args.headless))
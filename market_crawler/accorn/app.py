@@ -8,35 +8,39 @@ from __future__ import annotations
 import asyncio
 
 from contextlib import suppress
-from functools import cache
+from functools import cache, partial
 from typing import NamedTuple
 from urllib.parse import urljoin
 
 from playwright.async_api import async_playwright
 
+from dunia import extraction
 from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import (
-    AsyncPlaywrightBrowser,
-    PlaywrightBrowser,
-    PlaywrightElementHandle,
-    PlaywrightPage,
-)
+from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from market_crawler import error, log
 from market_crawler.accorn import config
 from market_crawler.accorn.data import AccornCrawlData
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.browser import borrow_page, use_page_pool
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_content, parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file
+from market_crawler.pipeline import Pipeline, Stage
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
-from market_crawler.state import CategoryState, get_category_state, get_product_state
+from market_crawler.state import (
+    CategoryState,
+    ProductState,
+    get_category_state,
+    get_product_state,
+)
 from market_crawler.template import build_detailed_images_html
 from robustify.error import MaxTriesReached
 from robustify.functional import do, isin
@@ -72,22 +76,29 @@ async def run(settings: Settings):
     )
     login_info = get_login_info()
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
         categories = await get_categories(sitename=config.SITENAME)
 
         log.detail.total_categories(len(categories))
 
         columns = list(settings.COLUMN_MAPPING.values())
-        crawler = ConcurrentCrawler(
-            categories=categories,
-            start_category=config.START_CATEGORY,
-            end_category=config.END_CATEGORY,
-            chunk_size=config.CATEGORIES_CHUNK_SIZE,
-            crawl=crawl,
-        )
-        await crawl_categories(crawler, browser, settings, columns)
+        async with product_pipeline(browser, settings, columns) as pipeline:
+            crawler = ConcurrentCrawler(
+                categories=categories,
+                start_category=config.START_CATEGORY,
+                end_category=config.END_CATEGORY,
+                chunk_size=config.CATEGORIES_CHUNK_SIZE,
+                crawl=(
+                    partial(crawl, pipeline=pipeline) if config.USE_PIPELINE else crawl
+                ),
+            )
+            async with use_page_pool(browser, max_reuse=config.MAX_PAGE_REUSE):
+                await crawl_categories(crawler, browser, settings, columns)
 
 
 async def crawl(
@@ -95,6 +106,7 @@ async def crawl(
     browser: PlaywrightBrowser,
     settings: Settings,
     columns: list[str],
+    pipeline: Pipeline | None = None,
 ):
     category_url = category.url
     category_name = category.name
@@ -157,22 +169,30 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
-                extract_product(
-                    idx,
-                    browser,
-                    category_page_url,
-                    category_state,
-                    category_html,
-                    filename,
-                    columns,
-                    settings,
+        if pipeline:
+            await pipeline.run(
+                ProductJob(
+                    idx, category_page_url, category_state, category_html, filename
                 )
-                for idx in chunk
+                for idx in range(number_of_products)
+            )
+        else:
+            await crawl_products(
+                (
+                    extract_product(
+                        idx,
+                        browser,
+                        category_page_url,
+                        category_state,
+                        category_html,
+                        filename,
+                        columns,
+                        settings,
+                    )
+                    for idx in range(number_of_products)
+                ),
+                chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
             )
-
-            await asyncio.gather(*tasks)
 
         log.action.category_page_crawled(category_name, category_state.pageno)
 
@@ -223,6 +243,57 @@ async def get_product_link(product: Element, category_page_url: str):
     return urljoin(category_page_url, product_link)
 
 
+class ProductJob(NamedTuple):
+    idx: int
+    category_page_url: str
+    category_state: CategoryState
+    category_html: CategoryHTML
+    filename: str
+
+
+class ProductPage(NamedTuple):
+    job: ProductJob
+    product_url: str
+    product_state: ProductState
+    content: str
+    detailed_images_html_source: str
+
+
+class ProductRows(NamedTuple):
+    page: ProductPage
+    rows: list[AccornCrawlData]
+    has_options: bool
+
+
+def product_pipeline(
+    browser: PlaywrightBrowser, settings: Settings, columns: list[str]
+) -> Pipeline:
+    """
+    Products are fetched on the event loop, parsed and extracted in the thread pool (on the event loop of each thread, see market_crawler.pipeline.run_in_thread_loop()), and written on the event loop
+    """
+    return Pipeline(
+        stages=[
+            Stage(
+                name="fetch",
+                fn=partial(fetch_product, browser=browser, settings=settings),
+                workers=config.MAX_PRODUCTS_CHUNK_SIZE,
+            ),
+            Stage(
+                name="extract",
+                fn=extract_rows,
+                workers=config.EXTRACT_WORKERS,
+                executor="thread",
+            ),
+            Stage(
+                name="write",
+                fn=partial(save_product, settings=settings, columns=columns),
+            ),
+        ],
+        queue_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        max_thread_workers=config.EXTRACT_WORKERS,
+    )
+
+
 async def extract_product(
     idx: int,
     browser: PlaywrightBrowser,
@@ -233,6 +304,21 @@ async def extract_product(
     columns: list[str],
     settings: Settings,
 ):
+    job = ProductJob(idx, category_page_url, category_state, category_html, filename)
+    if not (
+        product_page := await fetch_product(job, browser=browser, settings=settings)
+    ):
+        return None
+
+    await save_product(
+        await extract_rows(product_page), settings=settings, columns=columns
+    )
+
+
+async def fetch_product(
+    job: ProductJob, *, browser: PlaywrightBrowser, settings: Settings
+) -> ProductPage | None:
+    idx, category_page_url, category_state, category_html, _ = job
     html_top, html_bottom = (
         settings.DETAILED_IMAGES_HTML_SOURCE_TOP,
         settings.DETAILED_IMAGES_HTML_SOURCE_BOTTOM,
@@ -303,28 +389,48 @@ async def extract_product(
     ):
         return None
 
-    page = await browser.new_page()
-    await visit_link(page, product_url)
+    async with borrow_page(browser) as page:
+        await visit_link(page, product_url)
+        content = await page.content()
 
-    if not (document := await parse_document(await page.content(), engine="lexbor")):
-        raise HTMLParsingError(
-            "Document is not parsed correctly", url=category_page_url
+        # ? Images are loaded lazily by the page, so they are extracted before the page is returned
+        match await extract_images(
+            page,
+            product_url,
+            html_top,
+            html_bottom,
+        ):
+            case Ok(detailed_images_html_source):
+                pass
+            case Err(err):
+                log.debug(f"{err}: <yellow>{product_url}</>")
+                detailed_images_html_source = "NOT PRESENT"
+
+    return ProductPage(
+        job, product_url, product_state, content, detailed_images_html_source
+    )
+
+
+async def extract_rows(product_page: ProductPage) -> ProductRows:
+    category_state = product_page.job.category_state
+    product_url = product_page.product_url
+
+    # ? Product page is parsed only once, so dunia's parser is used directly instead of the document cache of the event loop (see market_crawler.extraction.parse_document())
+    if not (
+        document := await extraction.parse_document(
+            product_page.content, engine="lexbor"
         )
+    ):
+        raise HTMLParsingError("Document is not parsed correctly", url=product_url)
 
     tasks = (
         extract_product_name(document),
         extract_thumbnail_images(document, product_url),
         extract_table(document),
         extract_options(document),
-        extract_images(
-            page,
-            product_url,
-            html_top,
-            html_bottom,
-        ),
     )
 
-    R1, R2, R3, R4, R5 = await asyncio.gather(*tasks)
+    R1, R2, R3, R4 = await asyncio.gather(*tasks)
 
     match R1:
         case Ok(product_name):
@@ -360,27 +466,39 @@ async def extract_product(
         case Err(err):
             raise error.OptionsNotFound(err, url=product_url)
 
-    match R5:
-        case Ok(detailed_images_html_source):
-            pass
-        case Err(err):
-            log.debug(f"{err}: <yellow>{product_url}</>")
-            detailed_images_html_source = "NOT PRESENT"
-
-    await page.close()
-
-    if options:
-        for option in options:
-            match split_options_text(option, price2):
-                case Ok(result):
-                    option1, _price2, option2, option3 = result
-                case Err(err):
-                    raise error.IncorrectData(
-                        f"Could not split option text ({option}) into price2 due to an error -> {err}",
-                        url=product_url,
-                    )
+    if not options:
+        crawl_data = AccornCrawlData(
+            category=category_state.name,
+            product_url=product_url,
+            product_name=product_name,
+            thumbnail_image_url=thumbnail_image_url,
+            thumbnail_image_url2=thumbnail_image_url2,
+            thumbnail_image_url3=thumbnail_image_url3,
+            thumbnail_image_url4=thumbnail_image_url4,
+            thumbnail_image_url5=thumbnail_image_url5,
+            price2=price2,
+            price3=price3,
+            delivery_fee=delivery_fee,
+            detailed_images_html_source=product_page.detailed_images_html_source,
+            option1="",
+            option2="",
+            option3="",
+        )
+        return ProductRows(product_page, [crawl_data], False)
 
-            crawl_data = AccornCrawlData(
+    rows: list[AccornCrawlData] = []
+    for option in options:
+        match split_options_text(option, price2):
+            case Ok(result):
+                option1, _price2, option2, option3 = result
+            case Err(err):
+                raise error.IncorrectData(
+                    f"Could not split option text ({option}) into price2 due to an error -> {err}",
+                    url=product_url,
+                )
+
+        rows.append(
+            AccornCrawlData(
                 category=category_state.name,
                 product_url=product_url,
                 product_name=product_name,
@@ -392,58 +510,43 @@ async def extract_product(
                 price2=_price2,
                 price3=price3,
                 delivery_fee=delivery_fee,
-                detailed_images_html_source=detailed_images_html_source,
+                detailed_images_html_source=product_page.detailed_images_html_source,
                 option1=option1,
                 option2=option2,
                 option3=str(option3),
             )
-            await save_series_csv(
-                to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
-            )
-
-        log.action.product_crawled_with_options(
-            idx,
-            category_state.name,
-            category_state.pageno,
-            product_url,
-            len(options),
         )
-        product_state.done = True
-        if config.USE_PRODUCT_SAVE_STATES:
-            await product_state.save()
-        return None
 
-    crawl_data = AccornCrawlData(
-        category=category_state.name,
-        product_url=product_url,
-        product_name=product_name,
-        thumbnail_image_url=thumbnail_image_url,
-        thumbnail_image_url2=thumbnail_image_url2,
-        thumbnail_image_url3=thumbnail_image_url3,
-        thumbnail_image_url4=thumbnail_image_url4,
-        thumbnail_image_url5=thumbnail_image_url5,
-        price2=price2,
-        price3=price3,
-        delivery_fee=delivery_fee,
-        detailed_images_html_source=detailed_images_html_source,
-        option1="",
-        option2="",
-        option3="",
-    )
+    return ProductRows(product_page, rows, True)
 
-    product_state.done = True
-    if config.USE_PRODUCT_SAVE_STATES:
-        await product_state.save()
 
-    await save_series_csv(
-        to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
-    )
+async def save_product(
+    product_rows: ProductRows, *, settings: Settings, columns: list[str]
+) -> None:
+    product_page = product_rows.page
+    idx, _, category_state, _, filename = product_page.job
 
-    log.action.product_crawled(
-        idx, crawl_data.category, category_state.pageno, crawl_data.product_url
-    )
+    for crawl_data in product_rows.rows:
+        await save_series_csv(
+            to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
+        )
 
-    return None
+    product_page.product_state.done = True
+    if config.USE_PRODUCT_SAVE_STATES:
+        await product_page.product_state.save()
+
+    if product_rows.has_options:
+        log.action.product_crawled_with_options(
+            idx,
+            category_state.name,
+            category_state.pageno,
+            product_page.product_url,
+            len(product_rows.rows),
+        )
+    else:
+        log.action.product_crawled(
+            idx, category_state.name, category_state.pageno, product_page.product_url
+        )
 
 
 @returns_future(error.QueryNotFound)
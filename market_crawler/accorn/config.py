@@ -21,9 +21,15 @@ DEFAULT_RATE_LIMIT: Final[int] = 10
 CATEGORIES_CHUNK_SIZE: Final[int] = 5
 MIN_PRODUCTS_CHUNK_SIZE: Final[int] = 10
 MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 10
+MAX_PAGE_REUSE: Final[int] = 50
+
+# ? Products are fetched, extracted (in EXTRACT_WORKERS threads) and written by the stages of market_crawler.pipeline, instead of one coroutine per product
+USE_PIPELINE: Final[bool] = False
+EXTRACT_WORKERS: Final[int] = 4
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "캠핑용품"
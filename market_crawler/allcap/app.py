@@ -21,23 +21,25 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, load_page, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import (
-    AsyncPlaywrightBrowser,
-    PlaywrightBrowser,
-    PlaywrightElementHandle,
-    PlaywrightPage,
-)
+from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from market_crawler import error, log
 from market_crawler.allcap import config
 from market_crawler.allcap.data import AllcapCrawlData
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import (
+    load_content,
+    load_page,
+    parse_document,
+    visit_link,
+)
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file
+from market_crawler.registry import register_product, save_product_membership
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.template import build_detailed_images_html
@@ -108,9 +110,12 @@ async def run(settings: Settings):
         login_button_query="li.loginbt > a > img",
     )
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
         if await asyncio.to_thread(os.path.exists, "subcategories.txt"):
             subcategories = await get_categories(
@@ -219,8 +224,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -231,10 +236,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -367,6 +372,19 @@ async def extract_product(
     ):
         return None
 
+    if config.REUSE_DUPLICATE_PRODUCTS and await save_product_membership(
+        sitename=config.SITENAME,
+        key=productid,
+        category_name=category_state.name,
+        filename=filename,
+        columns=columns,
+        column_mapping=settings.COLUMN_MAPPING,
+    ):
+        product_state.done = True
+        if config.USE_PRODUCT_SAVE_STATES:
+            await product_state.save()
+        return None
+
     sold_out_text = await extract_soldout_text(product)
 
     page = await browser.new_page()
@@ -431,6 +449,8 @@ async def extract_product(
                 to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
             )
 
+        if config.REUSE_DUPLICATE_PRODUCTS:
+            register_product(config.SITENAME, productid, crawl_data)
         log.action.product_crawled_with_options(
             idx,
             category_state.name,
@@ -471,6 +491,8 @@ async def extract_product(
     await save_series_csv(
         to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
     )
+    if config.REUSE_DUPLICATE_PRODUCTS:
+        register_product(config.SITENAME, productid, crawl_data)
 
     log.action.product_crawled(
         idx, crawl_data.category, category_state.pageno, crawl_data.product_url
@@ -24,6 +24,10 @@ MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 15
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+# ? Products in several subcategories only get the membership row after the first crawl (see market_crawler.registry)
+REUSE_DUPLICATE_PRODUCTS: Final[bool] = True
+# ? Done products are checked against the set of product IDs loaded once per category (see market_crawler.statestore)
+PRELOAD_PRODUCT_STATES: Final[bool] = True
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "모자 S(56cm)"
@@ -15,9 +15,9 @@ from playwright.async_api import async_playwright
 
 from dunia.browser import BrowserConfig
 from dunia.login import LoginInfo
-from dunia.playwright import AsyncPlaywrightBrowser
 from market_crawler import log
 from market_crawler.apis import config
+from market_crawler.session import create_browser
 
 
 def pytest_collection_modifyitems(items: list[pytest.Function]):
@@ -55,9 +55,12 @@ async def browser():
     log.info("Running browser login fixture (headless) ...")
 
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
 
 @pytest.fixture(scope="package")
@@ -77,6 +80,9 @@ async def browser_headed():
     )
     log.info("Running browser login fixture (headed) ...")
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
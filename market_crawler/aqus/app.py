@@ -5,7 +5,6 @@
 
 from __future__ import annotations
 
-import asyncio
 import re
 
 from contextlib import suppress
@@ -20,23 +19,24 @@ from dunia.aio import gather
 from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
-from dunia.extraction import load_content, load_page, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import (
-    AsyncPlaywrightBrowser,
-    PlaywrightBrowser,
-    PlaywrightElementHandle,
-    PlaywrightPage,
-)
+from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from market_crawler import error, log
 from market_crawler.aqus import config
 from market_crawler.aqus.data import AQUSCrawlData
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import (
+    load_content,
+    load_page,
+    parse_document,
+    visit_link,
+)
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.template import build_detailed_images_html
@@ -85,9 +85,12 @@ async def run(settings: Settings):
         login_button_strategy=login_button_strategy,
     )
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
         categories = await get_categories(sitename=config.SITENAME)
 
@@ -175,8 +178,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     browser,
                     settings,
@@ -187,10 +190,10 @@ async def crawl(
                     filename,
                     columns,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -17,23 +17,19 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import (
-    AsyncPlaywrightBrowser,
-    PlaywrightBrowser,
-    PlaywrightElementHandle,
-    PlaywrightPage,
-)
+from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from market_crawler import error, log
 from market_crawler.artinus import config
 from market_crawler.artinus.data import ArtinusCrawlData
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_content, parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.template import build_detailed_images_html
@@ -71,9 +67,12 @@ async def run(settings: Settings):
     )
     login_info = get_login_info()
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
         columns = list(settings.COLUMN_MAPPING.values())
 
@@ -105,8 +104,8 @@ async def crawl_urls(
     urls: list[str], browser: PlaywrightBrowser, settings: Settings, columns: list[str]
 ):
     series: list[dict[str, str | int]] = []
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(
                 idx,
                 browser,
@@ -114,10 +113,10 @@ async def crawl_urls(
                 urls[idx],
                 series,
             )
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
     filename: str = temporary_custom_urls_csv_file(
         sitename=config.SITENAME,
@@ -295,8 +294,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -307,10 +306,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -14,10 +14,10 @@ import pytest
 from playwright.async_api import async_playwright
 
 from dunia.browser import BrowserConfig
-from dunia.playwright import AsyncPlaywrightBrowser
 from market_crawler import log
 from market_crawler.bagissue import config
 from market_crawler.bagissue.app import get_login_info
+from market_crawler.session import create_browser
 
 
 def pytest_collection_modifyitems(items: list[pytest.Function]):
@@ -48,9 +48,12 @@ async def browser():
     log.info("Running browser login fixture (headless) ...")
 
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
 
 @pytest.fixture(scope="package")
@@ -63,9 +66,12 @@ async def browser_headed():
     login_info = get_login_info()
     log.info("Running browser login fixture (headed) ...")
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
 
 @pytest.fixture(scope="package")
@@ -8,7 +8,7 @@ from __future__ import annotations
 import asyncio
 
 from functools import cache
-from typing import NamedTuple
+from typing import TYPE_CHECKING, NamedTuple
 from urllib.parse import urljoin
 
 import pandas as pd
@@ -20,14 +20,15 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.playwright import AsyncPlaywrightBrowser, PlaywrightBrowser
 from market_crawler import error, log
 from market_crawler.banax import config
 from market_crawler.banax.data import BanaxCrawlData
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_content, parse_document, visit_link
+from market_crawler.fetching import PageType, fetch_mode
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML, ProductHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
@@ -36,6 +37,10 @@ from market_crawler.state import CategoryState, get_category_state, get_product_
 from robustify.result import Err, Ok, Result, returns_future
 
 
+if TYPE_CHECKING:
+    from market_crawler.fetching import Load
+
+
 @cache
 def page_url(*, current_url: str, next_page_no: int) -> str:
     if "?pg" in current_url:
@@ -88,8 +93,8 @@ async def crawl_urls(
     urls: list[str], browser: PlaywrightBrowser, settings: Settings, columns: list[str]
 ):
     series: list[dict[str, str | int]] = []
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(
                 idx,
                 browser,
@@ -97,10 +102,10 @@ async def crawl_urls(
                 urls[idx],
                 series,
             )
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
     filename: str = temporary_custom_urls_csv_file(
         sitename=config.SITENAME,
@@ -237,6 +242,8 @@ async def crawl(
         wait_until="networkidle",
         async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
         rate_limit=config.DEFAULT_RATE_LIMIT,
+        fetch_mode=fetch_mode(config.SITENAME, "category"),
+        validate=products_present,
     )
     if config.SAVE_HTML and not await category_html.exists():
         await category_html.save(content)
@@ -272,6 +279,8 @@ async def crawl(
             wait_until="networkidle",
             async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
             rate_limit=config.DEFAULT_RATE_LIMIT,
+            fetch_mode=fetch_mode(config.SITENAME, "category"),
+            validate=products_present,
         )
         if config.SAVE_HTML and not await category_html.exists():
             await category_html.save(content)
@@ -296,8 +305,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -308,10 +317,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -334,6 +343,75 @@ async def get_product_link(product: Element, category_url: str):
     return urljoin(category_url, await product_link.get_attribute("href"))
 
 
+async def products_present(content: str) -> bool:
+    """
+    Required selectors of the category page (see fetch_mode)
+    """
+    if not (document := await parse_document(content, engine="lexbor")):
+        return False
+
+    return bool(await has_products(document))
+
+
+async def product_present(content: str) -> bool:
+    """
+    Required selectors of the product page (see fetch_mode)
+    """
+    if not (document := await parse_document(content, engine="lexbor")):
+        return False
+
+    R1, R2 = await asyncio.gather(
+        extract_product_name(document), extract_table(document)
+    )
+    return R1.is_ok() and R2.is_ok()
+
+
+def page_types() -> list[PageType]:
+    """
+    Page types checked by calibrate.py
+    """
+
+    async def category_urls(categories: list[Category], _: Load) -> list[str]:
+        return [category.url for category in categories]
+
+    async def product_urls(categories: list[Category], load: Load) -> list[str]:
+        category_url = categories[0].url
+        return await category_data(await load(category_url), category_url)
+
+    async def category_data(content: str, category_url: str) -> list[str]:
+        if not (document := await parse_document(content, engine="lexbor")):
+            raise HTMLParsingError("Document is not parsed correctly", url=category_url)
+
+        products = (await get_products(document)).unwrap()
+        return [
+            (await get_product_link(product, category_url)).unwrap()
+            for product in products
+        ]
+
+    async def product_data(content: str, product_url: str) -> Data:
+        if not (document := await parse_document(content, engine="lexbor")):
+            raise HTMLParsingError("Document is not parsed correctly", url=product_url)
+
+        return await extract_data(document, product_url, "", "")
+
+    return [
+        PageType(
+            name="category",
+            urls=category_urls,
+            extract=category_data,
+            on_failure="fetch",
+            wait_until="networkidle",
+        ),
+        PageType(
+            name="product",
+            urls=product_urls,
+            extract=product_data,
+            on_failure="fetch",
+            wait_until="networkidle",
+        ),
+    ]
+
+
 async def extract_product(
     idx: int,
     browser: PlaywrightBrowser,
@@ -356,6 +434,8 @@ async def extract_product(
         wait_until="networkidle",
         async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
         rate_limit=config.DEFAULT_RATE_LIMIT,
+        fetch_mode=fetch_mode(config.SITENAME, "category"),
+        validate=products_present,
     )
     if config.SAVE_HTML and not await category_html.exists():
         await category_html.save(content)
@@ -426,6 +506,8 @@ async def extract_product(
         wait_until="networkidle",
         async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
         rate_limit=config.DEFAULT_RATE_LIMIT,
+        fetch_mode=fetch_mode(config.SITENAME, "product"),
+        validate=product_present,
     )
     if config.SAVE_HTML and not await product_html.exists():
         await product_html.save(content)
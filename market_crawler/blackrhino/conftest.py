@@ -16,10 +16,11 @@ import pytest
 from playwright.async_api import async_playwright
 
 from dunia.browser import BrowserConfig
-from dunia.playwright import AsyncPlaywrightBrowser, PlaywrightBrowser
+from dunia.playwright import PlaywrightBrowser
 from market_crawler.blackrhino import config
 from market_crawler.blackrhino.app import get_login_info
 from market_crawler.log import info
+from market_crawler.session import create_browser
 
 
 def pytest_collection_modifyitems(items: list[pytest.Function]) -> None:
@@ -50,9 +51,12 @@ async def browser() -> AsyncGenerator[PlaywrightBrowser, None]:
     info("Running browser login fixture (headless) ...")
 
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
 
 @pytest.fixture(scope="package")
@@ -65,6 +69,9 @@ async def browser_headed() -> AsyncGenerator[PlaywrightBrowser, None]:
     login_info = get_login_info()
     info("Running browser login fixture (headed) ...")
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
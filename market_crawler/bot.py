@@ -13,24 +13,43 @@ import re
 import shutil
 import sys
 
-from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 from functools import wraps
-from glob import glob
+from importlib import import_module
 from pathlib import Path
 from time import time
 from typing import TYPE_CHECKING
 
 import pandas as pd
 
-from openpyxl.utils.exceptions import IllegalCharacterError
-
+from market_crawler.columnar import parquet_available
 from market_crawler.config import get_market_data
+from market_crawler.csvwriter import temp_format, use_market_csv_writers
+from market_crawler.deduplication import RowDeduplicator
 from market_crawler.excel import (
     concat_df_from_dir,
     copy_dataframe_cells_to_excel_template,
+    iter_temporary_dataframes,
+    remove_illegal_characters,
+    report_illegal_characters,
+    save_streaming_workbook,
 )
 from market_crawler.log import LOGGER_FORMAT_STR, info, logger, success, warning
+from market_crawler.ratelimit import report_rate_limiters
+from market_crawler.readiness import report_readiness
+from market_crawler.registry import report_product_registries
+from market_crawler.report import RunReport, current_run_report, get_run_report
+from market_crawler.resume import chain_directory, chained_files
+from market_crawler.singleflight import report_coalescing
+from market_crawler.statestore import (
+    close_state_store,
+    close_state_stores,
+    flush_state_stores,
+    get_state_store,
+    report_state_stores,
+)
 
 
 if TYPE_CHECKING:
@@ -66,34 +85,14 @@ def timeit_save[
 
             time_took = end_time - start_time
 
-            save_path = os.path.join(
-                reports_dir,
-                f"{date}.txt",
+            save_report(
+                reports_dir=reports_dir,
+                products_file=products_file,
+                date=date,
+                full_start_time=full_start_time,
+                full_end_time=full_end_time,
+                time_took=time_took,
             )
-            # ? "r+" operation fails if the file doesn't exists
-            if not os.path.exists(save_path):
-                Path(save_path).touch()
-            with open(
-                save_path,
-                "r+",
-                encoding="utf-8",
-            ) as f:
-                content = f.read()
-                run_count = content.count("Run #") + 1
-                if run_count > 1:
-                    f.write("\n\n")
-                f.write(f"Run #{run_count}\n")
-                f.write(f"Output file: {products_file}\n")
-                f.write(f"Run Date: {date}\n")
-                f.write(
-                    f"Start Time: {datetime.now().strftime('%Y%m%d')} {full_start_time}\n"
-                )
-                f.write(
-                    f"End Time: {datetime.now().strftime('%Y%m%d')} {full_end_time}\n"
-                )
-                f.write(f"Time took: {timedelta(seconds=time_took)}")
-
-            success(f"Report file saved to <light-cyan>{save_path}</>")
 
             return result
 
@@ -102,37 +101,96 @@ def timeit_save[
     return decorator
 
 
-# ? This is the entry point for the market crawler
-def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
-    market_dir = os.path.join(os.path.dirname(__file__), config.SITENAME)
-
-    # ? Directory to save the crawled data files while the program is running
-    # ? The final output will be generated by combining the files from this directory
-    temp_dir = os.path.join(market_dir, "temp")
-
-    # ? Directory to save screenshots of the webpage while the program is running
-    screenshot_dir = os.path.join(market_dir, "screenshots")
-
-    # ? Directory to save all crawled HTML files (if desired) for a particular market
-    html_dir = os.path.join(market_dir, "html")
+def save_report(
+    *,
+    reports_dir: str,
+    products_file: str,
+    date: str,
+    full_start_time: str,
+    full_end_time: str,
+    time_took: float,
+):
+    save_path = os.path.join(
+        reports_dir,
+        f"{date}.txt",
+    )
+    # ? "r+" operation fails if the file doesn't exists
+    if not os.path.exists(save_path):
+        Path(save_path).touch()
+    with open(
+        save_path,
+        "r+",
+        encoding="utf-8",
+    ) as f:
+        content = f.read()
+        run_count = content.count("Run #") + 1
+        if run_count > 1:
+            f.write("\n\n")
+        f.write(f"Run #{run_count}\n")
+        f.write(f"Output file: {products_file}\n")
+        f.write(f"Run Date: {date}\n")
+        f.write(f"Start Time: {datetime.now().strftime('%Y%m%d')} {full_start_time}\n")
+        f.write(f"End Time: {datetime.now().strftime('%Y%m%d')} {full_end_time}\n")
+        f.write(f"Time took: {timedelta(seconds=time_took)}")
+
+        report_rate_limiters()
+        report_readiness()
+        report_coalescing()
+        report_product_registries()
+        report_state_stores()
+        if report := get_run_report().render():
+            f.write(f"\n\n{report}")
+        get_run_report().clear()
+
+    success(f"Report file saved to <light-cyan>{save_path}</>")
+
+
+def append_report(*, reports_dir: str, date: str):
+    """
+    Append the statistics that are collected after the report file is saved (i.e., by finalize()) to the last run in the report file
+    """
+    if report := get_run_report().render():
+        with open(os.path.join(reports_dir, f"{date}.txt"), "a", encoding="utf-8") as f:
+            f.write(f"\n\n{report}")
+    get_run_report().clear()
 
-    # ? Directory to save all the pickled states
-    states_dir = os.path.join(market_dir, "states")
 
-    # ? Directory to save the log files
-    logs_dir = os.path.join(market_dir, "logs")
+@dataclass(slots=True, frozen=True)
+class MarketDirectories:
+    market_dir: str
+    temp_dir: str
+    screenshot_dir: str
+    html_dir: str
+    states_dir: str
+    logs_dir: str
+    reports_dir: str
+    profiles_dir: str
 
-    # ? Directory to save report files after every successful program run
-    reports_dir = os.path.join(market_dir, "reports")
 
-    # ? Directory to save the files generated by profilers (i.e., .prof, etc.)
-    profiles_dir = os.path.join(market_dir, "profiles")
+def market_directories(sitename: str) -> MarketDirectories:
+    market_dir = os.path.join(os.path.dirname(__file__), sitename)
 
-    output_file: str = os.path.join(
-        market_dir,
-        settings.OUTPUT_FILE,
+    return MarketDirectories(
+        market_dir=market_dir,
+        # ? Directory to save the crawled data files while the program is running
+        # ? The final output will be generated by combining the files from this directory
+        temp_dir=os.path.join(market_dir, "temp"),
+        # ? Directory to save screenshots of the webpage while the program is running
+        screenshot_dir=os.path.join(market_dir, "screenshots"),
+        # ? Directory to save all crawled HTML files (if desired) for a particular market
+        html_dir=os.path.join(market_dir, "html"),
+        # ? Directory to save all the pickled states
+        states_dir=os.path.join(market_dir, "states"),
+        # ? Directory to save the log files
+        logs_dir=os.path.join(market_dir, "logs"),
+        # ? Directory to save report files after every successful program run
+        reports_dir=os.path.join(market_dir, "reports"),
+        # ? Directory to save the files generated by profilers (i.e., .prof, etc.)
+        profiles_dir=os.path.join(market_dir, "profiles"),
     )
 
+
+def configure_logger(settings: Settings, log_file: str):
     if settings.TEST_MODE:
         logger.enable("dunia")
         logger.enable("robustify")
@@ -147,12 +205,7 @@ def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
                     enqueue=True,
                 ),
                 dict(
-                    sink=(
-                        os.path.join(
-                            logs_dir,
-                            f"{settings.DATE}.log",
-                        )
-                    ),
+                    sink=log_file,
                     level="DEBUG",
                     format=LOGGER_FORMAT_STR,
                     enqueue=True,
@@ -174,10 +227,7 @@ def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
                     enqueue=True,
                 ),
                 dict(
-                    sink=os.path.join(
-                        logs_dir,
-                        f"{settings.DATE}.log",
-                    ),
+                    sink=log_file,
                     level="INFO",
                     format=LOGGER_FORMAT_STR,
                     enqueue=True,
@@ -186,6 +236,25 @@ def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
             ]
         )
 
+
+# ? This is the entry point for the market crawler
+def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
+    directories = market_directories(config.SITENAME)
+    market_dir, temp_dir, logs_dir, reports_dir, profiles_dir = (
+        directories.market_dir,
+        directories.temp_dir,
+        directories.logs_dir,
+        directories.reports_dir,
+        directories.profiles_dir,
+    )
+
+    output_file: str = os.path.join(
+        market_dir,
+        settings.OUTPUT_FILE,
+    )
+
+    configure_logger(settings, os.path.join(logs_dir, f"{settings.DATE}.log"))
+
     local_lang = locale.getdefaultlocale()[0]
     if local_lang == "en_US":
         info(f"Locale: <MAGENTA><w>{local_lang} (English) </w></MAGENTA>")
@@ -199,9 +268,9 @@ def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
         settings=settings,
         logs_dir=logs_dir,
         temp_dir=temp_dir,
-        states_dir=states_dir,
-        html_dir=html_dir,
-        screenshot_dir=screenshot_dir,
+        states_dir=directories.states_dir,
+        html_dir=directories.html_dir,
+        screenshot_dir=directories.screenshot_dir,
         reports_dir=reports_dir,
         profiles_dir=profiles_dir,
         output_file=output_file,
@@ -209,7 +278,10 @@ def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
 
     @timeit_save(reports_dir, output_file, settings.DATE)
     def run():
-        asyncio.get_event_loop().run_until_complete(bot(settings))
+        if settings.WORKERS > 1 and not settings.URLS:
+            run_workers(bot, config, settings, logs_dir)
+        else:
+            asyncio.get_event_loop().run_until_complete(crawl_market(bot, settings))
 
     if not settings.TEST_MODE:
         run()
@@ -246,6 +318,156 @@ def run_bot(bot: Callable[..., Any], config: Config, settings: Settings):
         output_file=output_file,
         column_mapping=settings.COLUMN_MAPPING,
     )
+    append_report(reports_dir=reports_dir, date=settings.DATE)
+
+
+async def crawl_market(bot: Callable[..., Any], settings: Settings):
+    """
+    Run the market's bot, the buffered rows are written before the output file is created from the temporary files (see market_crawler.csvwriter)
+    """
+    if settings.TEMP_FORMAT == "parquet" and not parquet_available():
+        warning(
+            "pyarrow is not installed (i.e., poetry install --extras parquet), so the temporary files are saved as .CSV"
+        )
+    else:
+        temp_format.set(settings.TEMP_FORMAT)
+
+    async with use_market_csv_writers():
+        await bot(settings)
+
+    # ? Rows are written above, so the last states of the market are committed now, in a thread as the other markets may still be running on the event loop (see orchestrate.py)
+    await asyncio.to_thread(flush_state_stores)
+
+
+async def run_market(
+    bot: Callable[..., Any], config: Config, settings: Settings, log_level: str
+):
+    """
+    Run the market crawler inside an already running event loop, so that several markets can be run in the same process (see orchestrate.py)
+
+    Every market still has its own log file, report file and output file, just like run_bot()
+    """
+    current_run_report.set(RunReport())
+
+    directories = market_directories(config.SITENAME)
+    output_file = os.path.join(directories.market_dir, settings.OUTPUT_FILE)
+
+    with logger.contextualize(market=config.SITENAME):
+        handler_id = logger.add(
+            os.path.join(directories.logs_dir, f"{settings.DATE}.log"),
+            level=log_level,
+            format=LOGGER_FORMAT_STR,
+            filter=lambda record: record["extra"].get("market") == config.SITENAME,
+            enqueue=True,
+            encoding="utf-8-sig",
+        )
+        try:
+            info(f"Market: <MAGENTA><w>{config.SITENAME}</w></MAGENTA>")
+
+            initialize(
+                settings=settings,
+                logs_dir=directories.logs_dir,
+                temp_dir=directories.temp_dir,
+                states_dir=directories.states_dir,
+                html_dir=directories.html_dir,
+                screenshot_dir=directories.screenshot_dir,
+                reports_dir=directories.reports_dir,
+                profiles_dir=directories.profiles_dir,
+                output_file=output_file,
+            )
+
+            start_time, now = time(), datetime.now()
+            full_start_time = now.strftime("%H:%M:%S %p")
+
+            await crawl_market(bot, settings)
+
+            end_time, now = time(), datetime.now()
+            save_report(
+                reports_dir=directories.reports_dir,
+                products_file=output_file,
+                date=settings.DATE,
+                full_start_time=full_start_time,
+                full_end_time=now.strftime("%H:%M:%S %p"),
+                time_took=end_time - start_time,
+            )
+
+            # ? Finalizing is CPU bound (pandas and openpyxl), so it shouldn't block the other markets
+            await asyncio.to_thread(
+                finalize,
+                config=config,
+                settings=settings,
+                market_dir=directories.market_dir,
+                temp_dir=directories.temp_dir,
+                output_file=output_file,
+                column_mapping=settings.COLUMN_MAPPING,
+            )
+            append_report(reports_dir=directories.reports_dir, date=settings.DATE)
+        finally:
+            logger.remove(handler_id)
+
+
+def run_workers(
+    bot: Callable[..., Any], config: Config, settings: Settings, logs_dir: str
+):
+    """
+    Run the market crawler in multiple processes, each with its own event loop and browser
+
+    Categories are partitioned between the processes by crawl_categories() (see shard_categories()), so every process writes its own temporary files and state files in the same date directories, which are then merged by finalize()
+    """
+    logger.log(
+        "ACTION",
+        f"Running <light-cyan>{settings.WORKERS}</> worker processes ...",
+    )
+
+    # ? Command line arguments overwrite the values in config.py, but child processes import config.py again (i.e., "spawn" on Windows), so we need to send them
+    config_overrides = {
+        name: getattr(config, name) for name in dir(config) if name.isupper()
+    }
+
+    with ProcessPoolExecutor(max_workers=settings.WORKERS) as executor:
+        futures = [
+            executor.submit(
+                run_worker,
+                bot,
+                config.SITENAME,
+                config_overrides,
+                replace(settings, WORKER_INDEX=worker_index),
+                os.path.join(logs_dir, f"{settings.DATE}-worker{worker_index + 1}.log"),
+            )
+            for worker_index in range(settings.WORKERS)
+        ]
+
+        for worker, future in enumerate(futures, start=1):
+            for section, lines in future.result().items():
+                for line in lines:
+                    get_run_report().add(f"{section} (Worker process # {worker})", line)
+
+
+def run_worker(
+    bot: Callable[..., Any],
+    sitename: str,
+    config_overrides: dict[str, Any],
+    settings: Settings,
+    log_file: str,
+) -> dict[str, list[str]]:
+    config = import_module(f"market_crawler.{sitename}.config")
+    for name, value in config_overrides.items():
+        setattr(config, name, value)
+
+    configure_logger(settings, log_file)
+    info(
+        f"Worker process # {settings.WORKER_INDEX + 1} of {settings.WORKERS} (PID: {os.getpid()})"
+    )
+
+    asyncio.run(crawl_market(bot, settings))
+    report_rate_limiters()
+    report_readiness()
+    report_coalescing()
+    report_product_registries(settings.WORKERS)
+    report_state_stores()
+    close_state_stores()
+
+    return get_run_report().collect()
 
 
 def initialize(
@@ -292,6 +514,9 @@ def initialize(
         if os.path.exists(os.path.join(states_dir, settings.DATE)):
             shutil.rmtree(os.path.join(states_dir, settings.DATE))
 
+        get_state_store(states_dir).delete_date(settings.DATE)
+        close_state_store(states_dir)
+
     os.makedirs(logs_dir, exist_ok=True)
     os.makedirs(
         os.path.join(temp_dir, settings.DATE),
@@ -309,7 +534,7 @@ def initialize(
         exist_ok=True,
     )
     os.makedirs(
-        os.path.join(states_dir, settings.DATE),
+        states_dir,
         exist_ok=True,
     )
     os.makedirs(
@@ -336,60 +561,28 @@ def initialize(
 
         last_date = find_last(datetime.now(), found_dates).strftime("%Y%m%d")
 
-        copy_last_date_directories(
+        chain_last_date_directories(
             settings.DATE, last_date, temp_dir, states_dir, html_dir
         )
 
 
-def copy_last_date_directories(
+def chain_last_date_directories(
     date: str, last_date: str, temp_dir: str, states_dir: str, html_dir: str
 ):
+    """
+    Chain the directories of the date to the directories of the last date instead of copying their files (see market_crawler.resume)
+    """
     logger.log(
         "ACTION",
-        f"Copying files from <light-cyan>{last_date}</> directories ...",
+        f"Resuming files from <light-cyan>{last_date}</> directories ...",
     )
 
-    for file in os.listdir(os.path.join(temp_dir, last_date)):
-        src = os.path.join(temp_dir, last_date, file)
-        dst = os.path.join(temp_dir, date)
+    chain_directory(os.path.join(temp_dir, date), last_date)
+    chain_directory(os.path.join(html_dir, date), last_date)
 
-        with suppress(OSError):
-            shutil.copy(
-                src,
-                dst,
-            )
-
-    states_last_date_dir = os.path.join(states_dir, last_date)
-    if os.path.exists(states_last_date_dir):
-        for file in os.listdir(states_last_date_dir):
-            src = os.path.join(states_last_date_dir, file)
-            dst = os.path.join(states_dir, date)
-
-            with suppress(OSError):
-                shutil.copy(
-                    src,
-                    dst,
-                )
-
-    html_last_date_dir = os.path.join(html_dir, last_date)
-    if os.path.exists(states_last_date_dir):
-        for file in os.listdir(html_last_date_dir):
-            src = os.path.join(html_last_date_dir, file)
-            dst = os.path.join(html_dir, date)
-
-            if os.path.isdir(src):
-                with suppress(OSError):
-                    shutil.copytree(
-                        src,
-                        dst,
-                        dirs_exist_ok=True,
-                    )
-            else:
-                with suppress(OSError):
-                    shutil.copy(
-                        src,
-                        dst,
-                    )
+    # ? States are copied inside the state store (see market_crawler.statestore), it is closed so that the worker processes don't inherit its connection
+    get_state_store(states_dir).copy_date(last_date, date)
+    close_state_store(states_dir)
 
 
 def finalize(
@@ -413,9 +606,7 @@ def finalize(
             pd.read_csv(
                 os.path.join(save_dir, filename), encoding="utf-8-sig", dtype="str"
             )
-            for filename in sorted(
-                glob(os.path.join(save_dir, "*_CUSTOM_URLS_temporary.csv"))
-            )
+            for filename in chained_files(save_dir, "*_CUSTOM_URLS_temporary.csv")
         ]
         dfs.extend(
             [
@@ -424,11 +615,18 @@ def finalize(
                     engine="openpyxl",
                     dtype="str",
                 )
-                for filename in sorted(
-                    glob(os.path.join(save_dir, "*_CUSTOM_URLS_temporary.xlsx"))
-                )
+                for filename in chained_files(save_dir, "*_CUSTOM_URLS_temporary.xlsx")
             ]
         )
+    elif settings.STREAM_FINALIZE:
+        return finalize_streaming(
+            config=config,
+            settings=settings,
+            market_dir=market_dir,
+            save_dir=save_dir,
+            output_file=output_file,
+            column_mapping=column_mapping,
+        )
     else:
         logger.log(
             "ACTION",
@@ -457,45 +655,34 @@ def finalize(
             f" |__ Concatenating all the <light-magenta>*_temporary.csv</> and <light-magenta>*_temporary.xlsx</> files from <light-cyan>{Path(save_dir).relative_to(market_dir)}</> folder ...",
         )
 
+    if deduplicator := row_deduplicator(settings, column_mapping):
+        logger.log(
+            "ACTION",
+            f" |__ Removing duplicated rows by columns <light-cyan>{', '.join([''.join(col.split()) + ' (' + name + ')' for col, name in zip(deduplicator.compare_cols, ['Product Name', 'Option1', 'Price2', 'Price3', 'Category', 'Product URL', 'Model Name'])])}</> ...",
+        )
+
+        # ? The temporary files are already read into one table (see read_temporary_files()), so the whole table is in memory while it is deduplicated; only --stream_finalize (see finalize_streaming()) keeps the memory bounded, by deduplicating one file at a time as it is read
+        dfs = [deduplicator.drop_duplicates(df) for df in dfs]
+        deduplicator.report()
+
     df: pd.Series[Any] | pd.DataFrame = pd.concat(dfs)
 
     # ? We need to remove the already existing file if present, otherwise shutil.copy fails
     if os.path.exists(output_file):
         os.remove(output_file)
 
-    if settings.REMOVE_DUPLICATED_DATA:
-        compare_cols = [
-            column_mapping[data_column]
-            for data_column in settings.REMOVE_DUPLICATED_DATA
-        ]
-
-        logger.log(
-            "ACTION",
-            f" |__ Removing duplicated rows by columns <light-cyan>{', '.join([''.join(col.split()) + ' (' + name + ')' for col, name in zip(compare_cols, ['Product Name', 'Option1', 'Price2', 'Price3', 'Category', 'Product URL', 'Model Name'])])}</> ...",
-        )
-
-        df = df.drop_duplicates(subset=compare_cols)
-
     logger.log("ACTION", f" |__ Saving <light-cyan>{Path(output_file).name}</> ...")
 
-    # ? In case of illegal character in dataframe, we need to remove it first before saving dataframe into .xlsx format
+    # ? Illegal characters (i.e., control characters) can't be saved in .xlsx format, so they are removed before the DataFrame is saved
     # ? See: https://stackoverflow.com/questions/42306755/how-to-remove-illegal-characters-so-a-dataframe-can-write-to-excel
-    try:
-        df.to_excel(  # type: ignore
-            output_file,
-            index=False,
-            engine="openpyxl",
-        )
-    except IllegalCharacterError:
-        ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
-        df = df.applymap(
-            lambda x: ILLEGAL_CHARACTERS_RE.sub(r"", x) if isinstance(x, str) else x
-        )
-        df.to_excel(  # type: ignore
-            output_file,
-            index=False,
-            engine="openpyxl",
-        )
+    df, cleaned = remove_illegal_characters(df)
+    report_illegal_characters(cleaned)
+
+    df.to_excel(  # type: ignore
+        output_file,
+        index=False,
+        engine="openpyxl",
+    )
 
     if settings.TEMPLATE_FILE:
         logger.log(
@@ -516,6 +703,64 @@ def finalize(
     )
 
 
+def finalize_streaming(
+    *,
+    config: Config,
+    settings: Settings,
+    market_dir: str,
+    save_dir: str,
+    output_file: str,
+    column_mapping: dict[str, str],
+):
+    """
+    Create the output file (formatted with the template, if any) in one pass from the temporary files, only one temporary file is in memory at a time (see save_streaming_workbook())
+    """
+    logger.log(
+        "ACTION",
+        f" |__ Writing the files from <light-cyan>{Path(save_dir).relative_to(market_dir)}</> folder to <light-cyan>{Path(output_file).name}</> ...",
+    )
+
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+    rows = save_streaming_workbook(
+        dataframes=iter_temporary_dataframes(save_dir),
+        output_file=output_file,
+        columns=list(column_mapping.values()),
+        deduplicator=(deduplicator := row_deduplicator(settings, column_mapping)),
+        column_mapping=column_mapping,
+        template_file=settings.TEMPLATE_FILE,
+        crawl_data=(
+            get_market_data(config.SITENAME) if settings.TEMPLATE_FILE else None
+        ),
+    )
+
+    if deduplicator:
+        deduplicator.report()
+
+    if not rows:
+        warning(f"There are no rows in the files of {settings.DATE} folder")
+
+    success(
+        f"File <light-cyan>{Path(output_file).relative_to(market_dir)}</> has been created ({rows} rows)",
+    )
+
+
+def row_deduplicator(
+    settings: Settings, column_mapping: dict[str, str]
+) -> RowDeduplicator | None:
+    if not settings.REMOVE_DUPLICATED_DATA:
+        return None
+
+    return RowDeduplicator(
+        compare_cols=[
+            column_mapping[data_column]
+            for data_column in settings.REMOVE_DUPLICATED_DATA
+        ],
+        category_col=column_mapping.get("category", ""),
+    )
+
+
 def find_last(mydate: datetime, dates: list[datetime]):
     return min(dates, key=lambda x: abs(x - mydate))  # type: ignore
 
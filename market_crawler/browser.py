@@ -0,0 +1,453 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+
+from collections import Counter, deque
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from market_crawler import error
+from market_crawler.log import logger
+from market_crawler.readiness import cancel_measurement
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+    from typing import Any, Final
+
+    from playwright.async_api import Request, Route
+
+    from dunia.playwright import PlaywrightBrowser, PlaywrightPage
+    from market_crawler.report import RunReport
+
+
+# ? We only read the image URLs from the DOM, so the image bytes (and fonts, videos) are never needed
+BLOCKED_RESOURCE_TYPES: Final = frozenset({"image", "media", "font"})
+
+# ? Analytics, ads and chat widgets that are loaded on every page
+TRACKER_HOSTS: Final = frozenset(
+    {
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googleadservices.com",
+        "googlesyndication.com",
+        "doubleclick.net",
+        "facebook.net",
+        "wcs.naver.net",
+        "acecounter.com",
+        "criteo.com",
+        "criteo.net",
+        "hotjar.com",
+        "clarity.ms",
+        "channel.io",
+        "happytalk.io",
+    }
+)
+
+# ? Average response size (in bytes) of the blocked requests, as the aborted requests are never downloaded, we can only estimate the bandwidth saved
+ESTIMATED_RESPONSE_SIZES: Final = {
+    "image": 80_000,
+    "media": 1_000_000,
+    "font": 50_000,
+    "tracker": 40_000,
+}
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class PageSettings:
+    """
+    Listeners (i.e., {"dialog": accept_dialog}) and default timeouts (in milliseconds) of the borrowed page, see borrow_page()
+    """
+
+    listeners: Mapping[str, Callable[..., Any]] = field(default_factory=dict)
+    timeout: float | None = None
+    navigation_timeout: float | None = None
+
+    def set_timeouts(self, page: PlaywrightPage) -> bool:
+        """
+        Set the default timeouts of the page, return True if any of them is set
+        """
+        if self.timeout is not None:
+            page.set_default_timeout(self.timeout)
+        if self.navigation_timeout is not None:
+            page.set_default_navigation_timeout(self.navigation_timeout)
+
+        return self.timeout is not None or self.navigation_timeout is not None
+
+
+@dataclass(slots=True, kw_only=True)
+class PooledPage:
+    page: PlaywrightPage
+    uses: int = 0
+    listeners: list[tuple[str, Callable[..., Any]]] = field(default_factory=list)
+    timeouts_changed: bool = False
+
+    def configure(self, settings: PageSettings) -> None:
+        """
+        Add the listeners and set the default timeouts of the borrowed page, and remember them so that they don't leak to the next user of the page
+        """
+        for event, listener in settings.listeners.items():
+            self.page.on(event, listener)  # type: ignore
+            self.listeners.append((event, listener))
+
+        if settings.set_timeouts(self.page):
+            self.timeouts_changed = True
+
+    def restore(self) -> None:
+        """
+        Remove the listeners that were added by borrow_page() (i.e., borrow_page(browser, listeners={"dialog": accept_dialog}))
+        """
+        while self.listeners:
+            event, listener = self.listeners.pop()
+            self.page.remove_listener(event, listener)  # type: ignore
+
+
+@dataclass(kw_only=True)
+class PagePool:
+    """
+    Reuse the browser pages (tabs) instead of creating and closing a new page for every product
+
+    Creating a page pays the renderer setup and init scripts (i.e., stealth) every time, so the pages are checked in back to the pool after use, and are reset to "about:blank"
+
+    Pages are retired (closed) after max_reuse uses or when they fail the health check, and at most max_idle pages are kept open while waiting
+    """
+
+    browser: PlaywrightBrowser
+    max_reuse: int = 50
+    max_idle: int = 20
+    health_check_timeout: float = 5.0
+    idle: deque[PooledPage] = field(init=False, default_factory=deque)
+    checked_out: dict[int, PooledPage] = field(init=False, default_factory=dict)
+    created: int = field(init=False, default=0)
+    reused: int = field(init=False, default=0)
+    retired: int = field(init=False, default=0)
+
+    async def checkout(self, settings: PageSettings = PageSettings()) -> PlaywrightPage:
+        while self.idle:
+            pooled = self.idle.popleft()
+            if await self.is_healthy(pooled.page):
+                self.reused += 1
+                break
+
+            await self.retire(pooled)
+        else:
+            pooled = PooledPage(page=await self.browser.new_page())
+            self.created += 1
+
+        pooled.uses += 1
+        pooled.configure(settings)
+        self.checked_out[id(pooled.page)] = pooled
+        return pooled.page
+
+    async def checkin(self, page: PlaywrightPage, *, healthy: bool = True) -> None:
+        if not (pooled := self.checked_out.pop(id(page), None)):
+            raise ValueError("Page was not checked out from this pool")
+
+        # ? Time saved by the readiness conditions is measured until the page is returned, as its next user navigates it
+        cancel_measurement(page)
+
+        if (
+            not healthy
+            or pooled.uses >= self.max_reuse
+            or len(self.idle) >= self.max_idle
+            or page.is_closed()
+            # ? Playwright can't tell the default timeouts of the page, so the page with the changed timeouts can't be reset to the timeouts of the browser context
+            or pooled.timeouts_changed
+        ):
+            return await self.retire(pooled)
+
+        try:
+            # ? Routes (i.e., request blockers), listeners and the loaded document must not leak to the next user of the page
+            pooled.restore()
+            await page.unroute_all(behavior="ignoreErrors")
+            await page.goto("about:blank")
+        except error.PlaywrightError:
+            return await self.retire(pooled)
+
+        self.idle.append(pooled)
+
+    async def is_healthy(self, page: PlaywrightPage) -> bool:
+        if page.is_closed():
+            return False
+
+        try:
+            return (
+                await asyncio.wait_for(
+                    page.evaluate("() => 1"), timeout=self.health_check_timeout
+                )
+                == 1
+            )
+        except (error.PlaywrightError, TimeoutError):
+            return False
+
+    async def retire(self, pooled: PooledPage) -> None:
+        self.retired += 1
+        with suppress(error.PlaywrightError):
+            await pooled.page.close()
+
+    @asynccontextmanager
+    async def page(
+        self, settings: PageSettings = PageSettings()
+    ) -> AsyncIterator[PlaywrightPage]:
+        page = await self.checkout(settings)
+        healthy = False
+        try:
+            yield page
+            healthy = True
+        finally:
+            await self.checkin(page, healthy=healthy)
+
+    async def close(self) -> None:
+        while self.idle:
+            await self.retire(self.idle.popleft())
+
+        text = f"{self.created} pages created | {self.reused} pages reused | {self.retired} pages retired"
+        logger.info(f"Page pool: {text}")
+        get_run_report().add("Page pool", text)
+
+
+# ? Page pool of the currently running crawl (if any)
+current_page_pool: ContextVar[PagePool | None] = ContextVar(
+    "current_page_pool", default=None
+)
+
+
+@asynccontextmanager
+async def use_page_pool(
+    browser: PlaywrightBrowser, *, max_reuse: int, max_idle: int = 20
+) -> AsyncIterator[PagePool | None]:
+    """
+    Let borrow_page() take the pages from a PagePool inside this context
+
+    If max_reuse is 0, then borrow_page() creates a new page every time (as before)
+    """
+    if max_reuse <= 0:
+        yield None
+        return
+
+    pool = PagePool(browser=browser, max_reuse=max_reuse, max_idle=max_idle)
+    token = current_page_pool.set(pool)
+    try:
+        yield pool
+    finally:
+        current_page_pool.reset(token)
+        await pool.close()
+
+
+@asynccontextmanager
+async def borrow_page(
+    browser: PlaywrightBrowser,
+    *,
+    listeners: Mapping[str, Callable[..., Any]] | None = None,
+    timeout: float | None = None,
+    navigation_timeout: float | None = None,
+) -> AsyncIterator[PlaywrightPage]:
+    """
+    Borrow a page from the current PagePool (see use_page_pool()), otherwise create a new page that is closed after use
+
+    The listeners and the default timeouts of the page must be given here instead of setting them on the page, so that the pool removes them before the page is reused (the page with the changed timeouts is closed instead)
+
+    Usage:
+        async with borrow_page(browser, listeners={"dialog": accept_dialog}) as page:
+            await visit_link(page, product_url, wait_until="load")
+    """
+    settings = PageSettings(
+        listeners=listeners or {},
+        timeout=timeout,
+        navigation_timeout=navigation_timeout,
+    )
+
+    if (pool := current_page_pool.get()) and pool.browser is browser:
+        async with pool.page(settings) as page:
+            yield page
+        return
+
+    page = await browser.new_page()
+    try:
+        PooledPage(page=page).configure(settings)
+        yield page
+    finally:
+        with suppress(error.PlaywrightError):
+            await page.close()
+
+
+@dataclass(slots=True, kw_only=True)
+class PageLoad:
+    start: float
+    blocking: bool
+
+
+@dataclass(slots=True, kw_only=True)
+class LoadTimes:
+    pages: int = 0
+    total: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.pages += 1
+        self.total += elapsed
+
+    def __str__(self) -> str:
+        return f"{self.total / self.pages if self.pages else 0:.2f}s avg ({self.pages} pages)"
+
+
+@dataclass(kw_only=True)
+class ResourceBlocker:
+    """
+    Abort the requests that are not needed for crawling (i.e., images, fonts, videos, trackers) in every page of the browser (context)
+
+    Routes of the page (i.e., page.route() in the market) take precedence, and the requests which are not blocked fall back to them
+
+    If unblocked_sample_rate is set, then every unblocked_sample_rate-th page navigation is not blocked, and the load time (i.e., from the document request to the "load" event) of those pages is compared with the blocked pages in the run report, it is only for the benchmarks and diagnosis (see benchmarks/resource_blocking.py), as the sampled pages download everything (0 blocks every page)
+
+    Note that Playwright disables the HTTP cache of the browser when the requests are routed, so the requests that are not blocked (i.e., stylesheets and scripts shared by all the pages) are downloaded again for every page instead of being served from the cache, the blocked images are usually far larger than them, but the run report shows both counts so that it can be checked for the market
+    """
+
+    blocked_resource_types: frozenset[str]
+    blocked_hosts: frozenset[str]
+    allowed_urls: tuple[str, ...]
+    unblocked_sample_rate: int = 0
+    requests: int = field(init=False, default=0)
+    blocked: Counter[str] = field(init=False, default_factory=Counter)
+    navigations: int = field(init=False, default=0)
+    loading: dict[PlaywrightPage, PageLoad] = field(init=False, default_factory=dict)
+    blocked_loads: LoadTimes = field(init=False, default_factory=LoadTimes)
+    unblocked_loads: LoadTimes = field(init=False, default_factory=LoadTimes)
+
+    def reason(self, request: Request) -> str | None:
+        """
+        Reason of blocking the request (resource type or "tracker"), None if it is not blocked
+        """
+        url = request.url
+        if any(allowed_url in url for allowed_url in self.allowed_urls):
+            return None
+
+        if request.resource_type in self.blocked_resource_types:
+            return request.resource_type
+
+        host = urlparse(url).hostname or ""
+        if any(
+            host == blocked_host or host.endswith(f".{blocked_host}")
+            for blocked_host in self.blocked_hosts
+        ):
+            return "tracker"
+
+        return None
+
+    def is_blocking(self, request: Request) -> bool:
+        """
+        Whether the requests of the page are blocked, the page load starts with the document request of the main frame (redirects belong to the same load)
+        """
+        try:
+            frame = request.frame
+            page = frame.page
+        except error.PlaywrightError:
+            # ? Requests of the service workers don't belong to any page
+            return True
+
+        if (
+            request.is_navigation_request()
+            and frame.parent_frame is None
+            and request.redirected_from is None
+        ):
+            self.navigations += 1
+            self.loading[page] = PageLoad(
+                start=perf_counter(),
+                blocking=not (
+                    self.unblocked_sample_rate
+                    and self.navigations % self.unblocked_sample_rate == 0
+                ),
+            )
+
+        return load.blocking if (load := self.loading.get(page)) else True
+
+    def watch(self, page: PlaywrightPage) -> None:
+        page.on("load", self.loaded)
+        page.on("close", self.closed)
+
+    def loaded(self, page: PlaywrightPage) -> None:
+        if not (load := self.loading.pop(page, None)):
+            return None
+
+        # ? Page was navigated to "about:blank" (i.e., checked in to the page pool) before its load, so it wasn't loaded at all
+        if page.url == "about:blank":
+            return None
+
+        loads = self.blocked_loads if load.blocking else self.unblocked_loads
+        loads.add(perf_counter() - load.start)
+
+    def closed(self, page: PlaywrightPage) -> None:
+        self.loading.pop(page, None)
+
+    async def handle(self, route: Route) -> None:
+        self.requests += 1
+
+        with suppress(error.PlaywrightError):
+            if self.is_blocking(route.request) and (
+                reason := self.reason(route.request)
+            ):
+                self.blocked[reason] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.fallback()
+
+    @property
+    def bytes_saved(self) -> int:
+        return sum(
+            ESTIMATED_RESPONSE_SIZES.get(reason, 0) * count
+            for reason, count in self.blocked.items()
+        )
+
+    def report(self, run_report: RunReport) -> None:
+        blocked = ", ".join(
+            f"{reason}: {count}" for reason, count in self.blocked.most_common()
+        )
+        text = f"{self.blocked.total()} of {self.requests} requests blocked ({blocked or 'none'}) | ~{self.bytes_saved / 1_000_000:.1f} MB saved (estimated) | {self.requests - self.blocked.total()} requests not blocked, without the HTTP cache"
+        logger.info(f"Resource blocking: {text}")
+        run_report.add("Resource blocking", text)
+
+        if self.blocked_loads.pages or self.unblocked_loads.pages:
+            text = f"Page load time: {self.blocked_loads} blocked | {self.unblocked_loads} not blocked (every {self.unblocked_sample_rate}th page)"
+            logger.info(f"Resource blocking: {text}")
+            run_report.add("Resource blocking", text)
+
+
+async def block_resources(
+    browser: PlaywrightBrowser,
+    *,
+    allowed_resource_types: Iterable[str] = (),
+    allowed_hosts: Iterable[str] = (),
+    allowed_urls: Iterable[str] = (),
+    unblocked_sample_rate: int = 0,
+) -> ResourceBlocker:
+    """
+    Block the images, fonts, videos and trackers in all the pages of the browser
+
+    Blocking is opt-in: the market calls it from its run() right after the browser is created, and only when a measurement (i.e., unblocked_sample_rate or benchmarks/resource_blocking.py) shows that it is faster for that website, because routing the requests disables Playwright's HTTP cache
+
+    The market can allow some of them (i.e., allowed_resource_types=["image"] if the website only shows the product detail images after they are loaded)
+
+    The number of blocked requests, the estimated bandwidth saved and the requests that lost the HTTP cache (see ResourceBlocker) are added to the run report, and the page load time with and without blocking if unblocked_sample_rate is set
+    """
+    blocker = ResourceBlocker(
+        blocked_resource_types=BLOCKED_RESOURCE_TYPES
+        - frozenset(allowed_resource_types),
+        blocked_hosts=TRACKER_HOSTS - frozenset(allowed_hosts),
+        allowed_urls=tuple(allowed_urls),
+        unblocked_sample_rate=unblocked_sample_rate,
+    )
+    for page in browser.pages:
+        blocker.watch(page)
+    browser.on("page", blocker.watch)
+    await browser.route("**/*", blocker.handle)
+    get_run_report().add_collector(blocker.report)
+    return blocker
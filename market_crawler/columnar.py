@@ -0,0 +1,272 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+from contextlib import suppress
+from dataclasses import dataclass, field
+from glob import glob
+from time import time_ns
+from typing import TYPE_CHECKING
+
+from market_crawler.csvwriter import CsvWriter
+from market_crawler.resume import chained_directories
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import Any, Final, Self
+
+    import pandas as pd
+
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa = ds = pq = None
+
+
+# ? Directory of the Parquet segments of all the temporary files of the date directory (see ParquetWriter)
+TEMPORARY_PARQUET: Final = "products_temporary.parquet"
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def parquet_directory(filename: str) -> str:
+    """
+    Directory of the Parquet segments of the temporary .CSV file, it is shared by all the temporary files of the date directory (i.e., "temp/<date>/products_temporary.parquet")
+    """
+    return os.path.join(os.path.dirname(filename), TEMPORARY_PARQUET)
+
+
+@dataclass(slots=True, kw_only=True)
+class Segment:
+    """
+    Parquet segment of a temporary file, named "<temporary file>.<first write>-<last write>-<process ID>.parquet"
+
+    Segment of a single write has the same first and last write time, the compacted segment (see ParquetWriter.compact()) covers the segments of the same process that are written between its first and last write
+    """
+
+    path: str
+    source: str
+    first: int
+    last: int
+    pid: int
+
+    @classmethod
+    def parse(cls, path: str) -> Self | None:
+        source, _, name = (
+            os.path.basename(path).removesuffix(".parquet").rpartition(".")
+        )
+
+        try:
+            first, last, pid = map(int, name.split("-"))
+        except ValueError:
+            return None
+
+        return cls(path=path, source=source, first=first, last=last, pid=pid)
+
+    def covers(self, other: Segment) -> bool:
+        return (
+            self is not other
+            and self.pid == other.pid
+            and self.first <= other.first
+            and other.last <= self.last
+        )
+
+
+def segment_path(filename: str, first: int, last: int) -> str:
+    source = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(
+        parquet_directory(filename), f"{source}.{first}-{last}-{os.getpid()}.parquet"
+    )
+
+
+@dataclass(kw_only=True)
+class ParquetWriter(CsvWriter):
+    """
+    Write the buffered rows of the temporary file as append-only Parquet segments in the directory of its date (one per batch, so that the rows are complete on the disk when the states of their products are committed), the segments are compacted into one when the writer is closed
+
+    The integer-only columns (i.e., prices) are saved as int64 and the other columns as strings, the repeated values (i.e., category, delivery fee, detailed images HTML) are dictionary encoded by Parquet
+
+    The repeated column names (i.e., several fields are mapped to "반품지구분" in column_mapping.json) are saved with the same suffixes that pandas gives them when it reads the temporary .CSV file (see unique_columns())
+    """
+
+    segments: list[str] = field(init=False, default_factory=list)
+
+    def write(self, rows: list[list[Any]]) -> None:
+        assert pa and pq, "pyarrow is not installed"
+
+        table = pa.Table.from_arrays(
+            [column_array(values) for values in zip(*rows)],
+            names=unique_columns(self.columns),
+        )
+
+        now = time_ns()
+        self.save(table, segment_path(self.filename, now, now))
+
+        self.written += len(rows)
+        self.writes += 1
+
+    def save(self, table: pa.Table, segment: str) -> None:
+        assert pq
+
+        os.makedirs(os.path.dirname(segment), exist_ok=True)
+
+        # ? Segment is renamed when it is complete, so that finalize() never reads the half written segment
+        pq.write_table(table, f"{segment}.tmp", compression="zstd")
+        os.replace(f"{segment}.tmp", segment)
+        self.segments.append(segment)
+
+    async def close(self) -> None:
+        await super().close()
+
+        if len(self.segments) > 1:
+            await asyncio.to_thread(self.compact)
+
+    def compact(self) -> None:
+        """
+        Write the segments of this writer as a single segment, the segments are ignored by the readers (see temporary_segments()) as soon as the compacted segment is renamed, so they can be removed afterwards
+        """
+        assert ds and pq
+
+        segments = [
+            segment for path in self.segments if (segment := Segment.parse(path))
+        ]
+        table = ds.dataset(
+            self.segments,
+            schema=segments_schema(self.segments),
+            format="parquet",
+        ).to_table()
+
+        self.segments = []
+        self.save(
+            table, segment_path(self.filename, segments[0].first, segments[-1].last)
+        )
+
+        for segment in segments:
+            with suppress(FileNotFoundError):
+                os.remove(segment.path)
+
+
+def unique_columns(columns: list[str]) -> list[str]:
+    """
+    Rename the repeated columns the same way as pandas' read_csv() (i.e., "반품지구분", "반품지구분.1", "반품지구분.2"), so that the Parquet segments have the same columns as the temporary .CSV files
+    """
+    counts: dict[str, int] = {}
+    names: list[str] = []
+
+    for column in columns:
+        name, count = column, counts.get(column, 0)
+        while count:
+            counts[column] = count + 1
+            name = f"{column}.{count}"
+            count = count + 1 if name in columns else counts.get(name, 0)
+
+        names.append(name)
+        counts[name] = counts.get(name, 0) + 1
+
+    return names
+
+
+def column_array(values: tuple[Any, ...]) -> pa.Array:
+    assert pa
+
+    if any(value is not None for value in values) and all(
+        value is None or (isinstance(value, int) and not isinstance(value, bool))
+        for value in values
+    ):
+        return pa.array(values, type=pa.int64())
+
+    return pa.array(
+        [None if value is None else str(value) for value in values], type=pa.string()
+    )
+
+
+def temporary_segments(directory: str) -> list[str]:
+    """
+    Parquet segments of the temporary files in the date directory and the previous dates of the chain (see market_crawler.resume), in the order of the temporary files and their writes
+
+    Same as chained_files(), the temporary file that has segments in the date directory shadows its segments in the previous dates, and the segments that are covered by a compacted segment are skipped
+    """
+    sources: dict[str, list[Segment]] = {}
+
+    for chained_directory in chained_directories(directory):
+        found: dict[str, list[Segment]] = {}
+        for path in glob(
+            os.path.join(chained_directory, TEMPORARY_PARQUET, "*.parquet")
+        ):
+            if segment := Segment.parse(path):
+                found.setdefault(segment.source, []).append(segment)
+
+        for source, segments in found.items():
+            sources.setdefault(source, segments)
+
+    return [
+        segment.path
+        for source in sorted(sources)
+        for segment in sorted(sources[source], key=lambda segment: segment.first)
+        if not any(other.covers(segment) for other in sources[source])
+    ]
+
+
+def segments_schema(segments: list[str], *, strings: bool = False) -> pa.Schema:
+    """
+    Schema of the segments with the columns of all of them (in the order they first appear), because the columns of the temporary files may not be the same
+
+    The column is int64 only if every segment that has it saves it as int64 (i.e., the price is text such as "품절" in some batches), otherwise it is a string
+    """
+    assert pa and pq
+
+    types: dict[str, pa.DataType] = {}
+
+    # ? Only the footers of the segments are read for their schemas
+    for segment in segments:
+        for column in pq.read_schema(segment):
+            if strings or types.get(column.name, column.type) != column.type:
+                types[column.name] = pa.string()
+            else:
+                types.setdefault(column.name, column.type)
+
+    return pa.schema(list(types.items()))
+
+
+def segments_dataset(segments: list[str]) -> ds.Dataset:
+    """
+    Dataset of the segments, all the columns are read as strings (see segments_schema()), same as the temporary .CSV files, so that they are concatenated with the temporary files of the other formats (i.e., resume chain of the dates that are crawled with --temp_format csv)
+    """
+    if not (pa and ds and pq):
+        raise ModuleNotFoundError(
+            "pyarrow is required to read the temporary Parquet files (i.e., --temp_format parquet)"
+        )
+
+    schema = segments_schema(segments, strings=True)
+    return ds.dataset(segments, schema=schema, format="parquet")
+
+
+def read_parquet_segments(segments: list[str]) -> pd.DataFrame:
+    """
+    Read the segments (see temporary_segments()) into a single DataFrame, in the order of the segments
+    """
+    return segments_dataset(segments).to_table().to_pandas()
+
+
+def iter_parquet_segments(segments: list[str]) -> Iterator[pd.DataFrame]:
+    """
+    Read the segments one batch at a time (see read_parquet_segments()), i.e., for the streaming finalize()
+    """
+    if not segments:
+        return
+
+    for batch in segments_dataset(segments).to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
@@ -33,6 +33,7 @@ class Config(Protocol):
     MAX_PRODUCTS_CHUNK_SIZE: int
     USE_CATEGORY_SAVE_STATES: bool
     USE_PRODUCT_SAVE_STATES: bool
+    PRELOAD_PRODUCT_STATES: bool
     SAVE_HTML: bool
     START_CATEGORY: str
     END_CATEGORY: str
@@ -7,17 +7,43 @@ from __future__ import annotations
 
 import asyncio
 
-from dataclasses import dataclass
+from collections import deque
+from collections.abc import Generator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
 from functools import singledispatch
+from itertools import islice
+from time import perf_counter
 from typing import TYPE_CHECKING, Protocol
 
+from market_crawler.csvwriter import use_csv_writers
+from market_crawler.fetching import use_http_fetcher
 from market_crawler.helpers import chunks
+from market_crawler.log import logger
+from market_crawler.prefetching import use_prefetcher
+from market_crawler.report import get_run_report
 
 
 if TYPE_CHECKING:
+    from collections.abc import (
+        AsyncIterator,
+        Awaitable,
+        Callable,
+        Coroutine,
+        Iterable,
+        Iterator,
+    )
+    from typing import Any
+
     from dunia.playwright import PlaywrightBrowser
     from market_crawler.initialization import Category
     from market_crawler.settings import Settings
+    from market_crawler.state import CategoryState
+
+    type CrawlPage = Callable[[CategoryState], Awaitable[int | None]]
+    type Count = Callable[[], Awaitable[int | None]]
 
 
 class Crawl(Protocol):
@@ -36,15 +62,48 @@ class SequentialCrawler:
     start_category: str
     end_category: str
     crawl: Crawl
+    max_open_pages: int = 0
+    prefetch: bool = False
 
 
 @dataclass(slots=True, frozen=True, kw_only=True)
 class ConcurrentCrawler:
+    """
+    Crawl the categories concurrently
+
+    With "chunks" scheduler, categories are crawled in the chunks of chunk_size, and the next chunk only starts when every category of the current chunk has been crawled
+
+    With "queue" scheduler, chunk_size workers are created that pick the next category as soon as they finish their current one
+
+    The products of all the categories are crawled through a single ProductPool, if max_open_pages is set, then at most that many products are crawled at the same time, otherwise every category page crawls up to its chunk size of products at the same time (see crawl_products())
+
+    If prefetch is set, the market can load the next category page in the background while the products of the current page are crawled (see market_crawler.extraction.prefetch_content())
+    """
+
     categories: list[Category]
     start_category: str
     end_category: str
     chunk_size: int
     crawl: Crawl
+    scheduler: str = "chunks"
+    max_open_pages: int = 0
+    prefetch: bool = False
+
+    def __post_init__(self):
+        if self.scheduler not in ("chunks", "queue"):
+            raise ValueError(
+                f"Unknown categories scheduler: '{self.scheduler}' (it must be either 'chunks' or 'queue')"
+            )
+
+
+@dataclass(slots=True, kw_only=True)
+class WorkerUtilization:
+    worker: int
+    categories: int = 0
+    busy: float = 0.0
+
+    def utilization(self, elapsed: float) -> float:
+        return self.busy / elapsed if elapsed else 0.0
 
 
 def categories_range(
@@ -61,6 +120,18 @@ def categories_range(
     return start_category_index, end_category_index
 
 
+def shard_categories(categories: list[Category], settings: Settings) -> list[Category]:
+    """
+    Categories that will be crawled by the current worker process (see --workers)
+
+    Categories are distributed in round-robin order, so that the large categories (which are usually next to each other) are spread between the processes
+    """
+    if settings.WORKERS <= 1:
+        return categories
+
+    return categories[settings.WORKER_INDEX :: settings.WORKERS]
+
+
 @singledispatch
 async def crawl_categories(
     crawler: SequentialCrawler | ConcurrentCrawler,
@@ -80,8 +151,17 @@ async def _(
     start_category_index, end_category_index = categories_range(
         crawler.categories, crawler.start_category, crawler.end_category
     )
-    for category in crawler.categories[start_category_index : end_category_index + 1]:
-        await crawler.crawl(category, browser, settings, columns)
+    categories_subset = shard_categories(
+        crawler.categories[start_category_index : end_category_index + 1], settings
+    )
+    async with (
+        use_product_pool(crawler.max_open_pages),
+        use_http_fetcher(),
+        use_prefetcher(crawler.prefetch),
+        use_csv_writers(),
+    ):
+        for category in categories_subset:
+            await crawler.crawl(category, browser, settings, columns)
 
 
 @crawl_categories.register(ConcurrentCrawler)
@@ -94,21 +174,382 @@ async def _(
     start_category_index, end_category_index = categories_range(
         crawler.categories, crawler.start_category, crawler.end_category
     )
-    categories_subset = crawler.categories[
-        start_category_index : end_category_index + 1
-    ]
-    range_chunks = chunks(range(len(categories_subset)), crawler.chunk_size)
-    for categories_chunk in range_chunks:
-        tasks = (
-            asyncio.create_task(
-                crawler.crawl(
-                    categories_subset[idx],
-                    browser,
-                    settings,
-                    columns,
+    categories_subset = shard_categories(
+        crawler.categories[start_category_index : end_category_index + 1], settings
+    )
+
+    async with (
+        use_product_pool(crawler.max_open_pages),
+        use_http_fetcher(),
+        use_prefetcher(crawler.prefetch),
+        use_csv_writers(),
+    ):
+        if crawler.scheduler == "queue":
+            return await crawl_categories_queue(
+                categories_subset,
+                crawler.chunk_size,
+                crawler.crawl,
+                browser,
+                settings,
+                columns,
+            )
+
+        range_chunks = chunks(range(len(categories_subset)), crawler.chunk_size)
+        for categories_chunk in range_chunks:
+            tasks = (
+                asyncio.create_task(
+                    crawler.crawl(
+                        categories_subset[idx],
+                        browser,
+                        settings,
+                        columns,
+                    )
                 )
+                for idx in categories_chunk
             )
-            for idx in categories_chunk
+
+            await asyncio.gather(*tasks)
+
+
+async def crawl_categories_queue(
+    categories: list[Category],
+    number_of_workers: int,
+    crawl: Crawl,
+    browser: PlaywrightBrowser,
+    settings: Settings,
+    columns: list[str],
+):
+    """
+    Crawl the categories with long-lived workers that pull the next category from the queue as soon as they are free
+
+    This way a single slow category doesn't keep the other workers idle (as it happens with the chunks)
+    """
+    queue: asyncio.Queue[Category] = asyncio.Queue()
+    for category in categories:
+        queue.put_nowait(category)
+
+    workers = [
+        WorkerUtilization(worker=worker)
+        for worker in range(1, max(number_of_workers, 1) + 1)
+    ]
+
+    start_time = perf_counter()
+    await asyncio.gather(
+        *(
+            category_worker(queue, worker, crawl, browser, settings, columns)
+            for worker in workers
         )
+    )
+    elapsed = perf_counter() - start_time
+
+    for worker in workers:
+        text = f"Worker # {worker.worker}: {worker.categories} categories | Busy: {timedelta(seconds=round(worker.busy))} | Utilization: {worker.utilization(elapsed):.1%}"
+        logger.info(text)
+        get_run_report().add("Category workers", text)
+
+
+async def category_worker(
+    queue: asyncio.Queue[Category],
+    worker: WorkerUtilization,
+    crawl: Crawl,
+    browser: PlaywrightBrowser,
+    settings: Settings,
+    columns: list[str],
+):
+    while True:
+        try:
+            category = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+        start_time = perf_counter()
+        try:
+            await crawl(category, browser, settings, columns)
+        finally:
+            worker.busy += perf_counter() - start_time
+            worker.categories += 1
+            queue.task_done()
+
+
+# ? Product pool of the currently running crawl (if any)
+# ? ContextVar is used instead of a global so that category tasks created inside crawl_categories() inherit it
+current_product_pool: ContextVar[ProductPool | None] = ContextVar(
+    "current_product_pool", default=None
+)
+
+
+@dataclass(slots=True, kw_only=True)
+class ProductLane:
+    """
+    Product jobs submitted by one crawl_products() call (i.e., usually a page of the category)
+    """
+
+    jobs: Iterator[Coroutine[Any, Any, Any]]
+    done: asyncio.Future[None]
+    limit: int = 0
+    running: int = 0
+    exhausted: bool = False
+
+    @property
+    def full(self) -> bool:
+        return bool(self.limit) and self.running >= self.limit
+
+    def finish(self, err: BaseException | None = None) -> None:
+        if self.done.done():
+            return None
+
+        if err is not None:
+            self.done.set_exception(err)
+        elif self.exhausted and not self.running:
+            self.done.set_result(None)
+
+    def discard(self) -> None:
+        """
+        Close the jobs that were not started, so that their coroutines don't raise "coroutine was never awaited" warnings
+        """
+        if isinstance(self.jobs, Generator):
+            # ? Generator creates the coroutines lazily, so closing it is enough
+            self.jobs.close()
+            return None
+
+        for job in self.jobs:
+            job.close()
+
+
+@dataclass(slots=True, kw_only=True)
+class ProductPool:
+    """
+    Crawl-wide pool of product workers that is shared by every category
+
+    At most max_open_pages product jobs run at the same time, and the workers pick the jobs from the categories in round-robin order, so that a category with a lot of products doesn't starve the others
+
+    If max_open_pages is 0, then every lane runs at most its limit (i.e., chunk size) of jobs at the same time, and the next job starts as soon as one of them is finished instead of waiting for the whole chunk
+    """
+
+    max_open_pages: int
+    lanes: deque[ProductLane] = field(init=False, default_factory=deque)
+    workers: list[asyncio.Task[None]] = field(init=False, default_factory=list)
+    wakeup: asyncio.Event = field(init=False, default_factory=asyncio.Event)
+    capacity: int = field(init=False, default=0)
+    products: int = field(init=False, default=0)
+
+    def start(self) -> None:
+        self.add_workers(self.max_open_pages)
+
+    def add_workers(self, count: int) -> None:
+        self.workers.extend(
+            asyncio.create_task(self.worker()) for _ in range(max(count, 0))
+        )
+
+    async def stop(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+
+    async def run(
+        self, jobs: Iterable[Coroutine[Any, Any, Any]], *, limit: int
+    ) -> None:
+        lane = ProductLane(
+            jobs=iter(jobs),
+            done=asyncio.get_running_loop().create_future(),
+            limit=0 if self.max_open_pages else max(limit, 1),
+        )
+        self.lanes.append(lane)
+
+        # ? Without the crawl-wide limit, there are as many workers as the jobs that the running lanes can open at the same time
+        self.capacity += lane.limit
+        self.add_workers(self.capacity - len(self.workers))
+        self.wakeup.set()
+
+        try:
+            await lane.done
+        finally:
+            self.capacity -= lane.limit
+            self.remove(lane)
+            lane.discard()
+
+    def remove(self, lane: ProductLane) -> None:
+        if lane in self.lanes:
+            self.lanes.remove(lane)
+
+    def fail(self, lane: ProductLane, err: BaseException) -> None:
+        self.remove(lane)
+        lane.finish(err)
+        lane.discard()
+
+    def next_job(self) -> tuple[ProductLane, Coroutine[Any, Any, Any]] | None:
+        for _ in range(len(self.lanes)):
+            lane = self.lanes[0]
+            self.lanes.rotate(-1)
+
+            if lane.full:
+                continue
+
+            try:
+                job = next(lane.jobs)
+            except StopIteration:
+                lane.exhausted = True
+                self.remove(lane)
+                lane.finish()
+            except Exception as err:
+                self.fail(lane, err)
+            else:
+                return lane, job
+
+        return None
+
+    async def worker(self) -> None:
+        while True:
+            if not (next_job := self.next_job()):
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            lane, job = next_job
+            lane.running += 1
+            try:
+                await job
+            except Exception as err:
+                self.fail(lane, err)
+            else:
+                self.products += 1
+            finally:
+                lane.running -= 1
+                lane.finish()
+
+
+@asynccontextmanager
+async def use_product_pool(max_open_pages: int) -> AsyncIterator[ProductPool | None]:
+    """
+    Share a single ProductPool between all the categories crawled inside this context
+
+    If max_open_pages is 0, then there is no crawl-wide limit, and every category page crawls up to its chunk size of products at the same time (see ProductPool)
+    """
+    pool = ProductPool(max_open_pages=max(max_open_pages, 0))
+    pool.start()
+    token = current_product_pool.set(pool)
+    try:
+        yield pool
+    finally:
+        current_product_pool.reset(token)
+        await pool.stop()
+        get_run_report().add(
+            "Product pool",
+            (
+                f"{pool.products} products crawled with {max_open_pages} open pages"
+                if pool.max_open_pages
+                else f"{pool.products} products crawled with chunk size open pages per category page"
+            ),
+        )
+
+
+async def crawl_products(
+    jobs: Iterable[Coroutine[Any, Any, Any]], *, chunk_size: int
+) -> None:
+    """
+    Crawl the product jobs (i.e., extract_product() coroutines) of the category page
+
+    The jobs should be passed as a generator so that the coroutines are only created when there is a free slot for them
+
+    If the crawl has a ProductPool (i.e., inside crawl_categories()), the jobs are submitted to it, otherwise they are gathered in the chunks of chunk_size
+    """
+    if pool := current_product_pool.get():
+        return await pool.run(jobs, limit=chunk_size)
+
+    iterator = iter(jobs)
+    while chunk := list(islice(iterator, max(chunk_size, 1))):
+        await asyncio.gather(*chunk)
+
+
+async def count_pages(
+    total_pages: Count | None,
+    total_products: Count | None,
+    products_per_page: int | None,
+) -> int | None:
+    """
+    Number of the pages of the category, None if it is not known up front
+    """
+    if total_pages and (pages := await total_pages()) is not None:
+        return pages
+
+    if total_products and products_per_page:
+        if (products := await total_products()) is not None:
+            return -(-products // products_per_page)
+
+    return None
+
+
+async def crawl_pages(
+    category_state: CategoryState,
+    crawl_page: CrawlPage,
+    *,
+    total_pages: Count | None = None,
+    total_products: Count | None = None,
+    products_per_page: int | None = None,
+    max_concurrent_pages: int = 1,
+    save_states: bool = True,
+) -> None:
+    """
+    Crawl the pages of the category from category_state.pageno, crawl_page() gets the state of the page (i.e., "pageno" is the page number) and returns the number of products on the page
+
+    If the number of pages is known up front (i.e., total pages or total products on the first page), then the pages are crawled concurrently (up to max_concurrent_pages), otherwise they are crawled one by one until the page has no products (as before)
+
+    Every crawled page is saved in the category state, so that the resumed crawl skips it even if the pages before it were not crawled
+    """
+    last_page = await count_pages(total_pages, total_products, products_per_page)
+    if last_page is not None:
+        logger.debug(f"Total pages of {category_state.name}: {last_page}")
+
+    lock = asyncio.Lock()
+
+    async def page_crawled(page_no: int) -> None:
+        category_state.done_pages.add(page_no)
+        while category_state.pageno in category_state.done_pages:
+            category_state.done_pages.discard(category_state.pageno)
+            category_state.pageno += 1
+
+        if save_states:
+            async with lock:
+                await category_state.save()
+
+    if last_page is None or max_concurrent_pages <= 1:
+        page_no = category_state.pageno
+        while last_page is None or page_no <= last_page:
+            # ? Done pages behind "pageno" are already removed from "done_pages" by page_crawled()
+            if (
+                page_no >= category_state.pageno
+                and page_no not in category_state.done_pages
+            ):
+                if not await crawl_page(replace(category_state, pageno=page_no)):
+                    break
+                await page_crawled(page_no)
+            page_no += 1
+    else:
+        pages = deque(
+            page_no
+            for page_no in range(category_state.pageno, last_page + 1)
+            if page_no not in category_state.done_pages
+        )
+
+        async def page_worker() -> None:
+            while pages:
+                page_no = pages.popleft()
+                # ? Empty page (i.e., total is not exact) is also saved, so that it isn't visited again on resume
+                await crawl_page(replace(category_state, pageno=page_no))
+                await page_crawled(page_no)
+
+        workers = [
+            asyncio.create_task(page_worker())
+            for _ in range(min(max_concurrent_pages, len(pages)))
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
 
-        await asyncio.gather(*tasks)
+    category_state.done = True
+    if save_states:
+        await category_state.save()
@@ -0,0 +1,239 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import csv
+import math
+import os
+
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from market_crawler.log import logger
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable
+    from typing import Any, Final, Literal
+
+    # ? Writers of the files, keyed by the absolute path of the file
+    type CsvWriters = dict[str, CsvWriter]
+
+
+# ? Rows are written when this many rows are buffered, or after the interval (in seconds) since the last write
+MAX_BUFFERED_ROWS: Final = 500
+FLUSH_INTERVAL: Final = 2.0
+
+# ? Callers wait for the write when the writer falls this far behind, so that the buffer doesn't grow without limit
+MAX_PENDING_ROWS: Final = 4 * MAX_BUFFERED_ROWS
+
+
+@dataclass(kw_only=True)
+class CsvWriter:
+    """
+    Buffer the rows of the output file (i.e., temporary .CSV file of the category page) and append them in batches from its own task
+
+    Rows are written in the order they are added, and a single task writes the file, so the rows of the concurrent products never interleave
+
+    The file is written the same way as pandas' to_csv(mode="a", encoding="utf-8-sig", index=False) (header if the file doesn't exist, empty cells for the missing values)
+    """
+
+    filename: str
+    columns: list[str]
+    max_buffered_rows: int = MAX_BUFFERED_ROWS
+    flush_interval: float = FLUSH_INTERVAL
+    rows: list[list[Any]] = field(init=False, default_factory=list)
+    wakeup: asyncio.Event = field(init=False, default_factory=asyncio.Event)
+    lock: asyncio.Lock = field(init=False, default_factory=asyncio.Lock)
+    task: asyncio.Task[None] | None = field(init=False, default=None)
+    closed: bool = field(init=False, default=False)
+    written: int = field(init=False, default=0)
+    writes: int = field(init=False, default=0)
+
+    def add(self, series: dict[str, Any], columns: Iterable[str]) -> None:
+        self.rows.append([cell(series.get(column)) for column in columns])
+
+        if not self.task or self.task.done():
+            if self.task and self.task.get_loop() is not asyncio.get_running_loop():
+                # ? Writer is left by the previous event loop (i.e., tests), its event and lock can't be used in this loop
+                self.wakeup, self.lock = asyncio.Event(), asyncio.Lock()
+            self.task = asyncio.create_task(self.run())
+
+        if len(self.rows) >= self.max_buffered_rows:
+            self.wakeup.set()
+
+    async def run(self) -> None:
+        while not self.closed:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                # ? No rows were added for the whole interval (i.e., the category page is finished), so the task exits instead of waking up until the market is closed, add() starts it again for the next row
+                if not self.rows:
+                    return None
+            self.wakeup.clear()
+
+            await self.flush()
+
+    async def flush(self) -> None:
+        # ? Only one batch is written at a time, so the batches are written in the order they are taken
+        async with self.lock:
+            if not self.rows:
+                return
+
+            rows, self.rows = self.rows, []
+            await asyncio.to_thread(self.write, rows)
+
+    def write(self, rows: list[list[Any]]) -> None:
+        header = not os.path.exists(self.filename)
+
+        # ? "utf-8-sig" only writes the BOM at the start of the file, not when it is appended
+        with open(self.filename, "a", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            if header:
+                writer.writerow(self.columns)
+            writer.writerows(rows)
+
+        self.written += len(rows)
+        self.writes += 1
+
+    async def close(self) -> None:
+        self.closed = True
+        self.wakeup.set()
+
+        if self.task:
+            with suppress(asyncio.CancelledError):
+                await self.task
+
+        await self.flush()
+
+
+def cell(value: Any) -> Any:
+    # ? pandas writes the missing values (NaN) as empty cells
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+# ? Writers of the running market (see bot.crawl_market()), ContextVar is used so that every market running in the same process (see orchestrate.py --concurrent) only closes its own writers
+current_csv_writers: ContextVar[CsvWriters | None] = ContextVar(
+    "current_csv_writers", default=None
+)
+
+# ? Writers that are used outside of bot.crawl_market() (i.e., tests and benchmarks)
+csv_writers: CsvWriters = {}
+
+# ? Writers of every market that hasn't been closed yet, so that their rows are written at the exit of the program
+open_csv_writers: list[CsvWriters] = [csv_writers]
+
+
+# ? Format of the temporary files of the running market (see bot.crawl_market()), "parquet" needs pyarrow
+temp_format: ContextVar[Literal["csv", "parquet"]] = ContextVar(
+    "temp_format", default="csv"
+)
+
+
+def get_csv_writers() -> CsvWriters:
+    writers = current_csv_writers.get()
+    return csv_writers if writers is None else writers
+
+
+def get_csv_writer(filename: str, columns: list[str]) -> CsvWriter:
+    key = os.path.abspath(filename)
+    writers = get_csv_writers()
+    if not (writer := writers.get(key)):
+        writer_type = CsvWriter
+
+        # ? Only the temporary files that are read by finalize() (i.e., not the custom URLs or the market's own files)
+        if (
+            temp_format.get() == "parquet"
+            and key.endswith("_temporary.csv")
+            and "CUSTOM_URLS" not in key
+        ):
+            from market_crawler.columnar import ParquetWriter
+
+            writer_type = ParquetWriter
+
+        writer = writers[key] = writer_type(filename=key, columns=columns)
+    return writer
+
+
+async def write_row(series: dict[str, Any], columns: list[str], filename: str) -> None:
+    writer = get_csv_writer(filename, columns)
+    writer.add(series, columns)
+
+    if len(writer.rows) >= MAX_PENDING_ROWS:
+        await writer.flush()
+
+
+async def flush_csv_writers() -> None:
+    """
+    Write the buffered rows of all the files of the running market, i.e., before the files are read by the market (see yongsung's process_detail_files()) or before the states of the products are committed (see market_crawler.state)
+    """
+    for writer in list(get_csv_writers().values()):
+        await writer.flush()
+
+
+async def close_csv_writers() -> None:
+    """
+    Write the buffered rows and stop the writers of the running market, it must be called before the event loop is closed (see bot.run_bot())
+    """
+    writers = get_csv_writers()
+
+    written = writes = 0
+    while writers:
+        _, writer = writers.popitem()
+        await writer.close()
+        written, writes = written + writer.written, writes + writer.writes
+
+    if writes:
+        text = f"{written} rows written in {writes} writes"
+        logger.info(f"CSV writer: {text}")
+        get_run_report().add("CSV writer", text)
+
+
+@asynccontextmanager
+async def use_market_csv_writers() -> AsyncIterator[CsvWriters]:
+    """
+    Writers of a single market run (see bot.crawl_market()), they are closed when the context exits and the rows are counted in the report of that market
+    """
+    writers: CsvWriters = {}
+    open_csv_writers.append(writers)
+    token = current_csv_writers.set(writers)
+    try:
+        yield writers
+    finally:
+        try:
+            await close_csv_writers()
+        finally:
+            current_csv_writers.reset(token)
+            open_csv_writers.remove(writers)
+
+
+@asynccontextmanager
+async def use_csv_writers() -> AsyncIterator[None]:
+    """
+    Write the buffered rows when the context exits (i.e., crawl_categories()), so that the files are complete for the market's own processing after the crawl
+    """
+    try:
+        yield
+    finally:
+        await flush_csv_writers()
+
+
+@atexit.register
+def write_buffered_rows() -> None:
+    # ? Rows of the writers that weren't closed (i.e., the program is stopped by an exception)
+    for writer in (
+        writer for writers in open_csv_writers for writer in writers.values()
+    ):
+        if writer.rows:
+            rows, writer.rows = writer.rows, []
+            writer.write(rows)
@@ -21,7 +21,6 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, load_page, parse_document, visit_link
 from dunia.playwright import (
     AsyncPlaywrightBrowser,
     PlaywrightBrowser,
@@ -29,11 +28,17 @@ from dunia.playwright import (
     PlaywrightPage,
 )
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.cuscuz import config
 from market_crawler.cuscuz.data import CuscuzCrawlData
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import (
+    load_content,
+    load_page,
+    parse_document,
+    visit_link,
+)
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
@@ -162,13 +167,13 @@ async def crawl_urls(
         date=settings.DATE,
     )
 
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(idx, browser, urls[idx], filename, settings, columns)
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
 
 async def extract_url(
@@ -381,8 +386,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -393,10 +398,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
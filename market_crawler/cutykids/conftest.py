@@ -19,6 +19,7 @@ from dunia.playwright import AsyncPlaywrightBrowser
 from market_crawler.cutykids import config
 from market_crawler.cutykids.app import Login
 from market_crawler.log import logger
+from market_crawler.session import log_in
 
 
 def pytest_collection_modifyitems(items: list[pytest.Function]):
@@ -59,8 +60,12 @@ async def browser():
         browser = await AsyncPlaywrightBrowser(
             browser_config=browser_config, playwright=playwright
         ).create()
-        login = Login(login_info)
-        await login(browser)
+        await log_in(
+            browser,
+            login_info,
+            sitename=config.SITENAME,
+            login=Login(login_info),
+        )
         yield browser
 
 
@@ -84,6 +89,10 @@ async def browser_headed():
         browser = await AsyncPlaywrightBrowser(
             browser_config=browser_config, playwright=playwright
         ).create()
-        login = Login(login_info)
-        await login(browser)
+        await log_in(
+            browser,
+            login_info,
+            sitename=config.SITENAME,
+            login=Login(login_info),
+        )
         yield browser
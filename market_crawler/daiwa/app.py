@@ -9,7 +9,7 @@ import asyncio
 import os
 
 from contextlib import suppress
-from functools import cache
+from functools import cache, partial
 from urllib.parse import urljoin
 
 import backoff
@@ -19,18 +19,25 @@ import playwright.async_api as playwright
 from playwright.async_api import async_playwright
 
 from dunia.browser import BrowserConfig
-from dunia.extraction import load_page, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import AsyncPlaywrightBrowser, PlaywrightBrowser, PlaywrightPage
+from dunia.playwright import PlaywrightBrowser, PlaywrightPage
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import (
+    ConcurrentCrawler,
+    crawl_categories,
+    crawl_pages,
+    crawl_products,
+)
+from market_crawler.csvwriter import temp_format
 from market_crawler.daiwa import config
 from market_crawler.daiwa.data import DaiwaCrawlData
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_page, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import ProductHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state
 from robustify.result import Err, Ok, Result, returns_future
@@ -45,6 +52,9 @@ async def read_page_data(page_no: int) -> pd.DataFrame:
 
 
 async def run(settings: Settings):
+    # ? translate.py and reconstruct.py read the temporary .CSV files
+    temp_format.set("csv")
+
     browser_config = BrowserConfig(
         headless=config.HEADLESS,
         default_navigation_timeout=config.DEFAULT_NAVIGATION_TIMEOUT,
@@ -59,9 +69,12 @@ async def run(settings: Settings):
         login_button_query="form button:has-text('로그인')",
     )
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
         categories = await get_categories(sitename=config.SITENAME)
 
         log.detail.total_categories(len(categories))
@@ -136,6 +149,22 @@ async def crawl(
     ):
         return None
 
+    await crawl_pages(
+        category_state,
+        partial(
+            crawl_page,
+            category=category,
+            browser=browser,
+            settings=settings,
+            columns=columns,
+        ),
+        total_pages=get_category_total_pages,
+        max_concurrent_pages=config.MAX_CONCURRENT_PAGES,
+        save_states=config.USE_CATEGORY_SAVE_STATES,
+    )
+
+
+async def get_category_total_pages() -> int:
     # ? Let's just hardcode total pages for now
     # page = await browser.context.new_page()
     # await page.goto(category_url, wait_until="networkidle")
@@ -145,45 +174,51 @@ async def crawl(
     total_pages = 15
     log.detail.total_pages(total_pages)
 
-    while category_state.pageno <= total_pages:
-        page_data = await read_page_data(category_state.pageno)
-        number_of_products = len(page_data)
-
-        log.detail.total_products_on_page(number_of_products, category_state.pageno)
+    return total_pages
 
-        filename: str = temporary_csv_file(
-            sitename=config.SITENAME,
-            date=settings.DATE,
-            category_name=category.name,
-            page_no=category_state.pageno,
-        )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
-                extract_product(
-                    idx,
-                    browser,
-                    page_data,
-                    category_state,
-                    filename,
-                    columns,
-                    settings,
-                )
-                for idx in chunk
-            )
+async def crawl_page(
+    category_state: CategoryState,
+    *,
+    category: Category,
+    browser: PlaywrightBrowser,
+    settings: Settings,
+    columns: list[str],
+) -> int:
+    """
+    Crawl the products of the page (category_state.pageno) from its URLs file, see market_crawler.crawling.crawl_pages()
+    """
+    page_data = await read_page_data(category_state.pageno)
+    number_of_products = len(page_data)
 
-            await asyncio.gather(*tasks)
+    log.detail.total_products_on_page(number_of_products, category_state.pageno)
 
-        log.action.category_page_crawled(category_state.name, category_state.pageno)
+    filename: str = temporary_csv_file(
+        sitename=config.SITENAME,
+        date=settings.DATE,
+        category_name=category.name,
+        page_no=category_state.pageno,
+    )
 
-        category_state.pageno += 1
+    await crawl_products(
+        (
+            extract_product(
+                idx,
+                browser,
+                page_data,
+                category_state,
+                filename,
+                columns,
+                settings,
+            )
+            for idx in range(number_of_products)
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
-        if config.USE_CATEGORY_SAVE_STATES:
-            await category_state.save()
+    log.action.category_page_crawled(category_state.name, category_state.pageno)
 
-    category_state.done = True
-    if config.USE_CATEGORY_SAVE_STATES:
-        await category_state.save()
+    return number_of_products
 
 
 @cache
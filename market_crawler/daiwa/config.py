@@ -21,9 +21,11 @@ DEFAULT_RATE_LIMIT: Final[int] = 5
 CATEGORIES_CHUNK_SIZE: Final[int] = 1
 MIN_PRODUCTS_CHUNK_SIZE: Final[int] = 10
 MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 10
+MAX_CONCURRENT_PAGES: Final[int] = 3
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "ALL"
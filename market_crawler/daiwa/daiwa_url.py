@@ -20,7 +20,6 @@ from aiofile import AIOFile
 
 from dunia.browser import BrowserConfig
 from dunia.login import LoginInfo
-from dunia.playwright import AsyncPlaywrightBrowser
 from market_crawler import error
 from market_crawler.daiwa import config
 from market_crawler.daiwa.app import (
@@ -31,6 +30,7 @@ from market_crawler.daiwa.app import (
     log,
     visit_link,
 )
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from robustify.result import Err, Ok
 
@@ -63,11 +63,12 @@ async def main():
         settings.DETAILED_IMAGES_HTML_SOURCE_BOTTOM,
     )
     async with playwright.async_playwright() as async_playwright:
-        browser = await AsyncPlaywrightBrowser(
+        browser = await create_browser(
             browser_config=browser_config,
             playwright=async_playwright,
+            sitename=config.SITENAME,
             login_info=login_info,
-        ).create()
+        )
 
         page = await browser.new_page()
 
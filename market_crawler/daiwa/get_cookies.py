@@ -13,9 +13,9 @@ from multiprocessing import freeze_support
 from playwright.async_api import async_playwright
 
 from dunia.login import LoginInfo
-from dunia.playwright import AsyncPlaywrightBrowser
 from market_crawler.daiwa import config
 from market_crawler.daiwa.app import BrowserConfig
+from market_crawler.session import create_browser
 
 
 sys.path.insert(0, "..")
@@ -37,9 +37,12 @@ async def main():
         login_button_query="form button:has-text('로그인')",
     )
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
         context = browser
         await context.storage_state(path="cookies.json")
 
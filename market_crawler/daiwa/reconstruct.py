@@ -9,17 +9,16 @@ import asyncio
 import os
 import sys
 
-from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from glob import glob
-from multiprocessing import cpu_count, freeze_support
-from typing import Any, cast
+from multiprocessing import freeze_support
+from typing import Any
 
 import pandas as pd
 
 from market_crawler import log
 from market_crawler.daiwa.app import get_productid
 from market_crawler.excel import get_column_mapping
+from market_crawler.tempreader import read_temporary_files
 
 
 sys.path.insert(0, "..")
@@ -31,7 +30,7 @@ async def main():
     temp = os.path.join(os.path.dirname(__file__), "temp", date)
     save_dir = os.path.join(temp, "constructed")
 
-    dfs = await concat_df_from_dir2(temp)
+    dfs = read_temporary_files(temp, ("*_temporary.csv",), exclude="")
     df: pd.Series[Any] = pd.concat(dfs)  # type: ignore
 
     column_mapping = get_column_mapping(
@@ -65,21 +64,6 @@ async def main():
     df.to_excel("reconstructed_temporary.xlsx", index=False)
 
 
-async def concat_df_from_dir2(directory: str):
-    with ProcessPoolExecutor(max_workers=cpu_count()) as executor:
-        results = [
-            executor.submit(
-                cast(Any, pd.read_csv),
-                os.path.join(directory, filename),  # type: ignore
-                dtype=str,
-                encoding="utf-8-sig",
-            )
-            for filename in sorted(glob(os.path.join(directory, "*_temporary.csv")))
-        ]
-
-    return [r.result() for r in results]
-
-
 if __name__ == "__main__":
     freeze_support()
     asyncio.run(main())
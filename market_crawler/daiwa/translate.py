@@ -9,12 +9,10 @@ import asyncio
 import os
 import sys
 
-from concurrent.futures import ProcessPoolExecutor
 from contextlib import suppress
 from datetime import datetime
-from glob import glob
-from multiprocessing import cpu_count, freeze_support
-from typing import Any, cast
+from multiprocessing import freeze_support
+from typing import Any
 
 import lxml.html as lxml
 import pandas as pd
@@ -34,6 +32,7 @@ from market_crawler.daiwa.app import (
     google_translate_element,
 )
 from market_crawler.excel import get_column_mapping
+from market_crawler.tempreader import read_temporary_files
 
 
 sys.path.insert(0, "..")
@@ -104,7 +103,7 @@ async def main():
         os.makedirs(save_dir, exist_ok=True)
 
         column_mapping = get_column_mapping("column_mapping.json")
-        df: pd.Series[Any] = pd.concat(await concat_df_from_dir(temp_folder))  # type: ignore
+        df: pd.Series[Any] = pd.concat(read_temporary_files(temp_folder, ("*_temporary.csv",), exclude=""))  # type: ignore
         df = df.drop_duplicates(subset=[column_mapping.PRODUCT_URL_COLUMN])  # type: ignore
         urls: list[str] = list(df[column_mapping.PRODUCT_URL_COLUMN])  # type: ignore
         images: list[str] = list(df[column_mapping.DETAILED_IMAGES_HTML_SOURCE_COLUMN])  # type: ignore
@@ -139,22 +138,6 @@ async def translate_detailed_images(
     await page.close()
 
 
-# ? This doesn't use pyarrow for read_csv() which gives error for some data present in DAIWA files
-async def concat_df_from_dir(directory: str):
-    with ProcessPoolExecutor(max_workers=cpu_count()) as executor:
-        results = [
-            executor.submit(
-                cast(Any, pd.read_csv),
-                os.path.join(directory, filename),  # type: ignore
-                encoding="utf-8-sig",
-                dtype=str,
-            )
-            for filename in sorted(glob(os.path.join(directory, "*_temporary.csv")))
-        ]
-
-    return [r.result() for r in results]
-
-
 if __name__ == "__main__":
     freeze_support()
     asyncio.run(main())
@@ -0,0 +1,85 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from market_crawler.log import logger
+from market_crawler.report import get_run_report
+
+
+@dataclass(slots=True, kw_only=True)
+class RowDeduplicator:
+    """
+    Remove the duplicated rows by the compared columns (i.e., --remove_duplicated_data) from the DataFrames as they are read, the same as drop_duplicates(subset=compare_cols) on the concatenated DataFrame (the first row is kept), but only the 64-bit hashes of the kept rows are in memory
+
+    The memory is bounded only when the DataFrames are read one at a time (i.e., --stream_finalize, see save_streaming_workbook()), finalize() passes it the whole table of the temporary files
+
+    Removed rows are counted by their category (i.e., which categories list the same products)
+    """
+
+    compare_cols: list[str]
+    category_col: str = ""
+    seen: set[int] = field(default_factory=set)
+    duplicates: Counter[str] = field(default_factory=Counter)
+
+    def drop_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        # ? Columns are taken by position (first one), because the output columns may have the same name more than once (see column_mapping.json)
+        columns: list[str] = df.columns.tolist()
+        keys = pd.DataFrame(
+            {
+                idx: (
+                    df.iloc[:, columns.index(column)].to_numpy(dtype=object)
+                    if column in columns
+                    else np.full(len(df), None, dtype=object)
+                )
+                for idx, column in enumerate(self.compare_cols)
+            }
+        )
+
+        # ? Missing values are None in the Parquet segments and NaN in the other files, they must be the same for the hashes
+        keys = keys.where(keys.notna(), None)
+
+        seen = self.seen
+        hashes: list[int] = pd.util.hash_pandas_object(keys, index=False).tolist()
+        keep = np.fromiter(
+            (not (key in seen or seen.add(key)) for key in hashes),
+            dtype=bool,
+            count=len(hashes),
+        )
+
+        if keep.all():
+            return df
+
+        if self.category_col in columns:
+            categories = df.iloc[:, columns.index(self.category_col)].to_numpy(
+                dtype=object
+            )[~keep]
+            self.duplicates.update(
+                "" if pd.isna(category) else str(category) for category in categories
+            )
+        else:
+            self.duplicates[""] += int((~keep).sum())
+
+        return df[keep]
+
+    @property
+    def removed(self) -> int:
+        return sum(self.duplicates.values())
+
+    def report(self) -> None:
+        if not self.duplicates:
+            return
+
+        logger.info(f"Duplicated rows: {self.removed} rows are removed")
+        for category, count in self.duplicates.most_common():
+            get_run_report().add(
+                "Duplicated rows", f"{category or '(No category)'}: {count}"
+            )
@@ -21,18 +21,19 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import AsyncPlaywrightBrowser, PlaywrightBrowser, PlaywrightPage
+from dunia.playwright import PlaywrightBrowser, PlaywrightPage
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.domejjim import config
 from market_crawler.domejjim.data import DomejjimCrawlData
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_content, parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.template import build_detailed_images_html
@@ -69,9 +70,12 @@ async def run(settings: Settings):
     )
     login_info = get_login_info()
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
         columns = list(settings.COLUMN_MAPPING.values())
 
@@ -101,8 +105,8 @@ async def crawl_urls(
     urls: list[str], browser: PlaywrightBrowser, settings: Settings, columns: list[str]
 ):
     series: list[dict[str, str | int]] = []
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(
                 idx,
                 browser,
@@ -110,10 +114,10 @@ async def crawl_urls(
                 urls[idx],
                 series,
             )
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
     filename: str = temporary_custom_urls_csv_file(
         sitename=config.SITENAME,
@@ -272,10 +276,6 @@ async def crawl(
 
         log.detail.total_products_on_page(number_of_products, category_state.pageno)
 
-        products_chunk = chunks(
-            range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE
-        )
-
         filename: str = temporary_csv_file(
             sitename=config.SITENAME,
             date=settings.DATE,
@@ -283,8 +283,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in products_chunk:
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -295,10 +295,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_name, category_state.pageno)
 
@@ -11,6 +11,7 @@ from typing import TYPE_CHECKING
 from colorama import Fore, init
 from playwright.async_api import Error, TimeoutError
 
+from dunia.error import TimeoutException as DuniaTimeoutException
 from market_crawler.log import warning
 
 
@@ -87,10 +88,6 @@ class MarketNotFound(BasicError):
     pass
 
 
-class TimeoutException(BasicError):
-    pass
-
-
 class LoginInputNotFound(BasicError):
     pass
 
@@ -250,6 +247,9 @@ class HTMLParsingError(BasicError):
 PlaywrightTimeoutError = TimeoutError
 PlaywrightError = Error
 
+# ? Same exception as dunia's, so that the markets catch the timeouts of market_crawler.extraction the same as the timeouts of dunia.extraction (i.e., "from dunia.error import TimeoutException")
+TimeoutException = DuniaTimeoutException
+
 
 def backoff_hdlr(details: dict[str, int | float]):
     from market_crawler.helpers import compile_regex
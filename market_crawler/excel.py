@@ -7,27 +7,39 @@ from __future__ import annotations
 
 import asyncio
 import json
-import os
 
-from concurrent.futures import ProcessPoolExecutor
-from functools import partial
-from glob import glob
-from multiprocessing import cpu_count
-from pathlib import Path
-from typing import TYPE_CHECKING, Any, NamedTuple
+from typing import TYPE_CHECKING, Any
 
 import numpy as np
 import pandas as pd
 
-from openpyxl import load_workbook  # type: ignore
+from openpyxl import Workbook  # type: ignore
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
-from excelsheet import col_to_excel, write_to_excel_template_cell_openpyxl
+from market_crawler.columnar import (
+    iter_parquet_segments,
+    read_parquet_segments,
+    temporary_segments,
+)
+from market_crawler.csvwriter import write_row
 from market_crawler.log import logger
 from market_crawler.path import temporary_csv_file
+from market_crawler.report import get_run_report
+from market_crawler.resume import chained_files
+from market_crawler.sheetwriter import SheetTemplate, SheetWriter
+from market_crawler.tempreader import read_file, read_temporary_files
 
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import Final
+
     from market_crawler.data import CrawlData
+    from market_crawler.deduplication import RowDeduplicator
+
+
+# ? Rows of the column that are listed in the run report when the illegal characters are removed from them
+MAX_REPORTED_ROWS: Final = 20
 
 
 def get_column_mapping(filename: str):
@@ -62,17 +74,10 @@ def to_series(crawl_data: CrawlData, column_mapping: dict[str, str]):
 async def save_series_csv(
     series: dict[str, str | int], columns: list[str], filename: str
 ):
-    exists = await asyncio.to_thread(os.path.exists, filename)
-
-    # ? Append mode writing can't be done concurrently
-    # ? asyncio.to_thread() requires waiting for other threads to finish, so it doesn't make sense to use asyncio.to_thread()
-    pd.DataFrame([series], columns=columns).to_csv(
-        filename,  # type: ignore
-        mode="a",  # type: ignore
-        header=not exists,
-        encoding="utf-8-sig",
-        index=False,
-    )
+    """
+    Append the row to the .CSV file, the rows are buffered and written in batches by the writer of the file (see market_crawler.csvwriter)
+    """
+    await write_row(series, columns, filename)
 
 
 async def save_temporary_csv(
@@ -120,13 +125,7 @@ def copy_dataframe_cells_to_excel_template(
             encoding="utf-8-sig",
         )
 
-    df = df.dropna(subset=[column_mapping["product_name"]], how="all")
-    df = (
-        df.replace(np.nan, "", regex=True)
-        .replace("None", "", regex=True)
-        .replace("nan", "", regex=True)
-        .replace("NaN", "", regex=True)
-    )
+    df = clean_template_rows(df, column_mapping)
 
     copy_to_openpyxl_template(
         df=df,
@@ -137,6 +136,18 @@ def copy_dataframe_cells_to_excel_template(
     )
 
 
+def clean_template_rows(
+    df: pd.DataFrame, column_mapping: dict[str, str]
+) -> pd.DataFrame:
+    """
+    Drop the rows without the product name and write the missing values (i.e., NaN or the "None", "nan" and "NaN" strings of the crawled values) as empty cells of the template
+
+    Only the whole cells are replaced, so that the values that only contain these words (i.e., "Banana", "Nonesuch") are kept
+    """
+    df = df.dropna(subset=[column_mapping["product_name"]], how="all")
+    return df.fillna("").replace(["None", "nan", "NaN"], "")
+
+
 def copy_to_openpyxl_template(
     *,
     df: pd.DataFrame,
@@ -145,79 +156,146 @@ def copy_to_openpyxl_template(
     column_mapping: dict[str, str],
     crawl_data: CrawlData,
 ):
-    wb: Any = load_workbook(template_file)
-    ws = wb.active
+    """
+    Write the DataFrame below the header of the template in one pass, the columns of the crawl data are written as whole columns into the template's active worksheet and the rest of the template is copied as it is (see SheetWriter and SheetTemplate)
 
-    columns: tuple[str] = tuple(df.columns)
+    The output is always saved as .xlsx (i.e., "....csv" -> "....xlsx")
+    """
+    writer = SheetWriter(
+        columns=list(df.columns),
+        filled={
+            column for _, column in data_column_mapping(column_mapping, crawl_data)
+        },
+        template=SheetTemplate.read(template_file),
+    )
+    writer.append(df)
+    writer.save_template(output_file.replace(".csv", ".xlsx"))
 
-    col_dict: dict[str, str] = {
-        columns[x - 1]: col_to_excel(x) for x in range(1, len(columns) + 1)
-    }
 
-    write_df_column_to_excel_template_cell_openpyxl = partial(
-        write_to_excel_template_cell_openpyxl, worksheet=ws, df=df
-    )
+def save_streaming_workbook(
+    *,
+    dataframes: Iterable[pd.DataFrame],
+    output_file: str,
+    columns: list[str],
+    deduplicator: RowDeduplicator | None,
+    column_mapping: dict[str, str],
+    template_file: str = "",
+    crawl_data: CrawlData | None = None,
+) -> int:
+    """
+    Write the rows of the DataFrames (i.e., temporary files, see iter_temporary_dataframes()) to the output file in one pass (see SheetWriter), so that only one DataFrame is in memory at a time
+
+    The rows are processed the same way as finalize() and copy_dataframe_cells_to_excel_template() do with the whole DataFrame: the duplicates are removed (see RowDeduplicator), and if the template is given, then the rows are cleaned (see clean_template_rows()) and only the columns of the crawl data are filled
 
-    for _, column in data_column_mapping(column_mapping, crawl_data):
-        write_df_column_to_excel_template_cell_openpyxl(
-            name=column,
-            alphabet=col_dict[column],
+    Return the number of rows written
+    """
+    wb: Any = Workbook(write_only=True)
+
+    if template_file:
+        assert crawl_data, "Crawl data is required to fill the template"
+        writer = SheetWriter(
+            columns=columns,
+            filled={
+                column for _, column in data_column_mapping(column_mapping, crawl_data)
+            },
+            template=SheetTemplate.read(template_file),
         )
+    else:
+        wb.create_sheet().append(columns)
+        writer = SheetWriter(columns=columns, filled=set(columns))
+    cleaned: dict[str, list[int]] = {}
+
+    for df in dataframes:
+        df = df.reindex(columns=columns)
 
-    wb.save(output_file.replace(".csv", ".xlsx"))
+        if deduplicator:
+            df = deduplicator.drop_duplicates(df)
 
+        if template_file:
+            df = clean_template_rows(df, column_mapping)
 
-class DataFrameFromDir(NamedTuple):
-    filename: str
-    dataframe: pd.DataFrame
+        df, cleaned_rows = remove_illegal_characters(
+            df, first_row=writer.start_row + writer.rows
+        )
+        for column, rows in cleaned_rows.items():
+            cleaned.setdefault(column, []).extend(rows)
 
+        writer.append(df)
 
-def concat_df_from_dir(directory: str):
-    with ProcessPoolExecutor(max_workers=cpu_count()) as executor:
-        results = [
-            DataFrameFromDir(
-                filename,
-                executor.submit(
-                    pd.read_csv,  # type: ignore
-                    os.path.join(directory, filename),  # type: ignore
-                    encoding="utf-8-sig",
-                    dtype="str",
-                ),
+    if writer.template:
+        writer.save_template(output_file.replace(".csv", ".xlsx"))
+    else:
+        writer.save(wb, output_file.replace(".csv", ".xlsx"))
+    report_illegal_characters(cleaned)
+
+    return writer.rows
+
+
+def remove_illegal_characters(
+    df: pd.DataFrame, *, first_row: int = 2
+) -> tuple[pd.DataFrame, dict[str, list[int]]]:
+    """
+    Remove the characters that can't be saved in the .xlsx file (see openpyxl's ILLEGAL_CHARACTERS_RE) from the string columns before it is written, only the cells that have them are replaced
+
+    Return the DataFrame and the rows (as numbered in the worksheet, the first row of the DataFrame is "first_row") that were cleaned in every column
+    """
+    cleaned: dict[str, list[int]] = {}
+
+    for position, column in enumerate(df.columns):
+        values = df.iloc[:, position]
+        if not (
+            pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)
+        ):
+            continue
+
+        try:
+            found = values.str.contains(ILLEGAL_CHARACTERS_RE, na=False).to_numpy(
+                dtype=bool
             )
-            for filename in sorted(glob(os.path.join(directory, "*_temporary.csv")))
-            if "CUSTOM_URLS" not in filename
-        ]
-
-        # ? Let's also read all the .xlsx files in case we choose to save the temporary files in .xlsx format
-        results.extend(
-            [
-                DataFrameFromDir(
-                    filename,
-                    executor.submit(
-                        pd.read_excel,  # type: ignore
-                        os.path.join(directory, filename),  # type: ignore
-                        engine="openpyxl",
-                        dtype="str",
-                    ),
-                )
-                for filename in sorted(
-                    glob(os.path.join(directory, "*_temporary.xlsx"))
-                )
-                if "CUSTOM_URLS" not in filename
-            ]
+        except AttributeError:
+            # ? Object column without any strings (i.e., only the missing values)
+            continue
+
+        if not found.any():
+            continue
+
+        if not cleaned:
+            df = df.copy()
+
+        df.iloc[found, position] = (
+            values[found].str.replace(ILLEGAL_CHARACTERS_RE, "", regex=True).to_numpy()
         )
+        cleaned[column] = (np.flatnonzero(found) + first_row).tolist()
+
+    return df, cleaned
+
+
+def report_illegal_characters(cleaned: dict[str, list[int]]) -> None:
+    for column, rows in cleaned.items():
+        text = f"{column}: {len(rows)} rows ({', '.join(map(str, rows[:MAX_REPORTED_ROWS]))}{', ...' if len(rows) > MAX_REPORTED_ROWS else ''})"
+        logger.warning(f"Illegal characters are removed from {text}")
+        get_run_report().add("Illegal characters", text)
+
+
+def iter_temporary_dataframes(directory: str) -> Iterator[pd.DataFrame]:
+    """
+    Read the temporary files one at a time, in the same order as concat_df_from_dir()
+    """
+    for pattern in ("*_temporary.csv", "*_temporary.xlsx"):
+        for filename in chained_files(directory, pattern):
+            if "CUSTOM_URLS" not in filename:
+                yield read_file(filename)
+
+    yield from iter_parquet_segments(temporary_segments(directory))
+
+
+def concat_df_from_dir(directory: str):
+    # ? .xlsx files are also read in case we choose to save the temporary files in .xlsx format
+    result = read_temporary_files(directory)
 
-        result: list[pd.DataFrame] = []
-        for r in results:
-            try:
-                df: pd.DataFrame = r.dataframe.result()
-            except pd.errors.EmptyDataError:
-                logger.error(
-                    f"Data is empty in <light-cyan>{Path(r.filename).name}</> without any columns"
-                )
-                raise
-            else:
-                result.append(df)
+    # ? Temporary Parquet files (see market_crawler.columnar) are read at once
+    if segments := temporary_segments(directory):
+        result.append(read_parquet_segments(segments))
 
     return result
 
@@ -0,0 +1,388 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+
+from contextlib import nullcontext, suppress
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, cast
+
+import backoff
+
+from market_crawler.browser import borrow_page
+from market_crawler.error import (
+    PlaywrightError,
+    PlaywrightTimeoutError,
+    TimeoutException,
+    backoff_hdlr,
+)
+from market_crawler.fetching import current_http_fetcher, decode_content
+from market_crawler.log import debug
+from market_crawler.prefetching import current_prefetcher
+from market_crawler.ratelimit import rate_limited
+from market_crawler.readiness import cancel_measurement, wait_until_ready
+from market_crawler.singleflight import get_document_cache, single_flight
+
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Sequence
+    from typing import Literal
+
+    from dunia.document import Document
+    from dunia.html import HTML
+    from dunia.playwright import PlaywrightBrowser, PlaywrightPage
+    from market_crawler.fetching import Validate
+    from market_crawler.readiness import Condition, WaitUntil
+    from market_crawler.singleflight import Engine
+
+    type OnFailure = Literal["fetch", "visit", "fetch_first", "visit_first"]
+
+
+# ? Same navigation and fetching functions as dunia.extraction, but every request waits for the (process-wide) rate limiter of the host, see market_crawler.ratelimit
+# ? Concurrent loads of the same URL share one request, and the same content is parsed once, see market_crawler.singleflight
+__all__ = [
+    "fetch_content",
+    "load_content",
+    "load_page",
+    "parse_document",
+    "prefetch_content",
+    "visit_link",
+]
+
+
+@backoff.on_exception(
+    backoff.expo,
+    TimeoutException,
+    max_tries=5,
+    on_backoff=backoff_hdlr,  # type: ignore
+)
+async def visit_link(
+    page: PlaywrightPage,
+    url: str,
+    *,
+    timeout: int | None = None,
+    wait_until: WaitUntil = "load",
+    rate_limit: int | None = None,
+    ready: Sequence[Condition] = (),
+) -> None:
+    """
+    Visit the page (url) and retry for 5 times if the navigation has been failed within the configured timeout
+
+    If the readiness conditions are given (see market_crawler.readiness), then it returns as soon as they hold, and "wait_until" is only the fallback
+    """
+    # ? Load state of the previous navigation of the page can't be measured anymore
+    cancel_measurement(page)
+    start_time = perf_counter()
+
+    async with rate_limited(url, rate_limit) as request:
+        try:
+            response = await page.goto(
+                url,
+                timeout=timeout,
+                wait_until="domcontentloaded" if ready else wait_until,
+            )
+        except (PlaywrightTimeoutError, PlaywrightError) as err:
+            raise TimeoutException(err) from err
+
+        if response:
+            request.status = response.status
+
+    if ready:
+        await wait_until_ready(page, url, ready, wait_until, start_time)
+
+
+@single_flight(
+    key=lambda browser, url, rate_limit=None, encoding=None: (
+        id(browser),
+        url,
+        encoding,
+    )
+)
+@backoff.on_exception(
+    backoff.expo,
+    TimeoutException,
+    max_tries=5,
+    on_backoff=backoff_hdlr,  # type: ignore
+)
+async def fetch_content(
+    browser: PlaywrightBrowser,
+    url: str,
+    rate_limit: int | None = None,
+    encoding: str | None = None,
+) -> str:
+    """
+    Use the Browser to send HTTP's GET request and receive the content response
+
+    If encoding is not provided, then it will be taken from the Content-Type header, otherwise detected from the content body
+    """
+    async with rate_limited(url, rate_limit) as request:
+        try:
+            response: Any = await browser.request.get(url)
+        except (PlaywrightTimeoutError, PlaywrightError) as err:
+            raise TimeoutException(err) from err
+
+        request.status = response.status
+        body = cast(bytes, await response.body())
+
+    return await decode_content(
+        body, response.headers.get("content-type", ""), encoding
+    )
+
+
+def load_key(
+    *,
+    browser: PlaywrightBrowser,
+    url: str,
+    on_failure: OnFailure | None = None,
+    fetch_mode: str = "browser",
+    validate: Validate | None = None,
+    ready: Sequence[Condition] = (),
+    **_: Any,
+) -> Hashable:
+    """
+    Key of the load_content() call for the single flight and the prefetch, the arguments that change what is loaded are in the key, so that the call that only fetches never shares the content of the call that needs it visited, validated or ready
+    """
+    return (id(browser), url, on_failure, fetch_mode, validate, tuple(ready))
+
+
+@single_flight(key=load_key)
+async def load_content(
+    *,
+    browser: PlaywrightBrowser,
+    url: str,
+    html: HTML,
+    on_failure: OnFailure | None = None,
+    wait_until: WaitUntil = "load",
+    async_timeout: int = 600,
+    rate_limit: int = 10,
+    fetch_mode: str = "browser",
+    validate: Validate | None = None,
+    ready: Sequence[Condition] = (),
+) -> str:
+    """
+    Load HTML content from the file if it exists on disk, otherwise fetch/visit the URL (same as dunia.extraction.load_content())
+
+    If fetch_mode is "http" (see market_crawler.fetching.fetch_mode()), then the URL is fetched with the HTTP GET request first, and the browser is only used if the request fails or validate() returns False for the content (i.e., required selectors are missing)
+
+    If the readiness conditions are given, then the URL is visited with them (see visit_link()) when on_failure is "visit" or "visit_first"
+
+    Concurrent calls for the same URL (and browser) with the same on_failure, fetch_mode, validate and ready share the same load, and the page which has been prefetched (see prefetch_content()) is not loaded again
+    """
+    if (prefetcher := current_prefetcher.get()) and (
+        content := prefetcher.take(
+            load_key(
+                browser=browser,
+                url=url,
+                on_failure=on_failure,
+                fetch_mode=fetch_mode,
+                validate=validate,
+                ready=ready,
+            )
+        )
+    ) is not None:
+        return content
+
+    if await html.exists():
+        debug(f"Loading content from existing HTML: {html.file}")
+        return await html.load()
+
+    if (
+        fetch_mode == "http"
+        and (fetcher := current_http_fetcher.get())
+        and (
+            content := await fetcher.fetch(
+                url, rate_limit=rate_limit, validate=validate
+            )
+        )
+        is not None
+    ):
+        return content
+
+    return await request_content(
+        browser=browser,
+        url=url,
+        on_failure=on_failure,
+        wait_until=wait_until,
+        async_timeout=async_timeout,
+        rate_limit=rate_limit,
+        ready=ready,
+    )
+
+
+async def request_content(
+    *,
+    browser: PlaywrightBrowser,
+    url: str,
+    on_failure: OnFailure | None,
+    wait_until: WaitUntil,
+    async_timeout: int,
+    rate_limit: int,
+    ready: Sequence[Condition] = (),
+    page: PlaywrightPage | None = None,
+) -> str:
+    """
+    Fetch or visit the URL in the order of on_failure (same as dunia.extraction.load_content() when the HTML content is not present on disk)
+
+    Every request goes through fetch_content() or visit_link(), so the rate limiter of the host gets the response status (i.e., it backs off on 429/5xx)
+    """
+    match on_failure:
+        case None:
+            raise FileNotFoundError("HTML content is not present on disk")
+        case "fetch" | "fetch_first":
+            try:
+                debug(
+                    f"HTML content is not present on disk. Fetching content from URL: {url}"
+                )
+                return await fetch_content(browser, url, rate_limit)
+            except UnicodeDecodeError as err:
+                if on_failure == "fetch":
+                    raise
+
+                # ? In the case of "fetch_first"
+                debug(
+                    f"Fetching failed due to an error ({err}). Visiting the URL ({url}) ..."
+                )
+
+            return await visit_content(
+                browser=browser,
+                url=url,
+                wait_until=wait_until,
+                async_timeout=async_timeout,
+                rate_limit=rate_limit,
+                ready=ready,
+                page=page,
+            )
+        case "visit" | "visit_first":
+            debug(f"HTML content is not present on disk. Visiting the URL ({url}) ...")
+
+            try:
+                return await visit_content(
+                    browser=browser,
+                    url=url,
+                    wait_until=wait_until,
+                    async_timeout=async_timeout,
+                    rate_limit=rate_limit,
+                    ready=ready,
+                    page=page,
+                )
+            except TimeoutException as err:
+                if on_failure == "visit":
+                    raise
+
+                # ? In the case of "visit_first"
+                debug(
+                    f"Visiting failed due to an error ({err}). Fetching the URL ({url}) ..."
+                )
+
+            return await fetch_content(browser, url, rate_limit)
+
+
+async def visit_content(
+    *,
+    browser: PlaywrightBrowser,
+    url: str,
+    wait_until: WaitUntil,
+    async_timeout: int,
+    rate_limit: int,
+    ready: Sequence[Condition] = (),
+    page: PlaywrightPage | None = None,
+) -> str:
+    """
+    Visit the URL in the page (borrowed from the page pool if it isn't given, see market_crawler.browser.borrow_page()) within async_timeout seconds and return its content
+    """
+    try:
+        async with (
+            asyncio.timeout(async_timeout),
+            nullcontext(page) if page else borrow_page(browser) as visited,
+        ):
+            await visit_link(
+                visited, url, wait_until=wait_until, rate_limit=rate_limit, ready=ready
+            )
+            return await visited.content()
+    except TimeoutError as err:
+        raise TimeoutException(f"{err}: {url}") from err
+
+
+def prefetch_content(
+    *,
+    browser: PlaywrightBrowser,
+    url: str,
+    html: HTML,
+    engine: Engine | None = None,
+    **kwargs: Any,
+) -> None:
+    """
+    Start loading the page (i.e., next category page) in the background with the same arguments as load_content(), and parse it with the engine if it is given
+
+    It does nothing if the crawler doesn't prefetch (see market_crawler.prefetching.use_prefetcher()), so it is safe to call it from any market
+
+    Usage:
+        prefetch_content(
+            browser=browser,
+            url=page_url(current_url=category_page_url, next_page_no=category_state.pageno + 1),
+            html=replace(category_html, pageno=category_state.pageno + 1),
+            engine="lxml",
+            on_failure="fetch",
+            rate_limit=config.DEFAULT_RATE_LIMIT,
+        )
+    """
+    if not (prefetcher := current_prefetcher.get()):
+        return
+
+    prefetcher.prefetch(
+        load_key(browser=browser, url=url, **kwargs),
+        lambda: load_content(browser=browser, url=url, html=html, **kwargs),
+        engine,
+    )
+
+
+async def load_page(
+    *,
+    browser: PlaywrightBrowser,
+    url: str,
+    html: HTML,
+    on_failure: OnFailure | None = None,
+    wait_until: WaitUntil = "load",
+    async_timeout: int = 600,
+    rate_limit: int = 10,
+) -> PlaywrightPage:
+    """
+    Create a new page in the browser and load the HTML content from the file if it exists on disk, otherwise fetch/visit the URL (same as dunia.extraction.load_page())
+
+    The page is closed if the content is not loaded
+    """
+    page = await browser.new_page()
+
+    try:
+        if await html.exists():
+            debug(f"Loading content from existing HTML: {html.file}")
+            content = await html.load()
+        else:
+            content = await request_content(
+                browser=browser,
+                url=url,
+                on_failure=on_failure,
+                wait_until=wait_until,
+                async_timeout=async_timeout,
+                rate_limit=rate_limit,
+                page=page,
+            )
+
+        await page.set_content(content, wait_until=wait_until)
+    except BaseException:
+        with suppress(PlaywrightError):
+            await page.close()
+        raise
+
+    return page
+
+
+async def parse_document(content: str, *, engine: Engine = "lxml") -> Document | None:
+    """
+    Parse the HTML content using the specified parser (see dunia.extraction.parse_document()), the document of the same content is reused for a short time (see market_crawler.singleflight.DocumentCache)
+    """
+    return await get_document_cache().parse(content, engine)
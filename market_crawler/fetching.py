@@ -0,0 +1,203 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import json
+import os
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import cache
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+from dunia.extraction import detect_encoding
+from market_crawler.log import debug, logger
+from market_crawler.ratelimit import rate_limited
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable
+    from typing import Any, Final
+
+    from market_crawler.extraction import OnFailure
+    from market_crawler.initialization import Category
+    from market_crawler.readiness import WaitUntil
+
+    type Validate = Callable[[str], Awaitable[bool]]
+    type Load = Callable[[str], Awaitable[str]]
+
+
+# ? Result of calibrate.py, present in the market's directory
+FETCH_MODES_FILE: Final = "fetch_modes.json"
+
+# ? Some websites reject the requests without the browser's User-Agent
+USER_AGENT: Final = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class PageType:
+    """
+    Type of the page (i.e., category, product) checked by calibrate.py
+
+    "urls" gives the sample URLs from the categories (it can load the pages with the browser, i.e., to get the product URLs from the category page), and "extract" gives the crawled data from the page content (i.e., CrawlData or the data it is built from), which must be the same for both HTTP and browser
+
+    "on_failure" and "wait_until" must be the same as the crawler passes to load_content() for the page type, so that calibrate.py compares the HTTP content with the content that the crawler gets from the browser
+    """
+
+    name: str
+    urls: Callable[[list[Category], Load], Awaitable[list[str]]]
+    extract: Callable[[str, str], Awaitable[Any]]
+    on_failure: OnFailure
+    wait_until: WaitUntil
+
+
+@cache
+def fetch_modes(sitename: str) -> dict[str, Any]:
+    filepath = os.path.join(os.path.dirname(__file__), sitename, FETCH_MODES_FILE)
+    if not os.path.exists(filepath):
+        return {}
+
+    with open(filepath, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fetch_mode(sitename: str, page_type: str) -> str:
+    """
+    Fetch mode of the market's page type ("http" or "browser") recorded by calibrate.py, it is "browser" if the page type is not calibrated
+    """
+    return fetch_modes(sitename).get(page_type, {}).get("mode", "browser")
+
+
+def save_fetch_modes(sitename: str, modes: dict[str, Any]) -> str:
+    filepath = os.path.join(os.path.dirname(__file__), sitename, FETCH_MODES_FILE)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(modes, f, indent=4, ensure_ascii=False)
+
+    fetch_modes.cache_clear()
+    return filepath
+
+
+async def decode_content(body: bytes, content_type: str, encoding: str | None) -> str:
+    """
+    Decode the response body with the given encoding, otherwise with the charset in Content-Type header, otherwise with the detected encoding
+    """
+    if not encoding:
+        if "charset=" in content_type:
+            encoding = content_type.split("charset=")[-1].strip()
+        else:
+            encoding = await detect_encoding(body)
+            debug(f"Detected encoding: {encoding}")
+
+    return body.decode(encoding)  # type: ignore
+
+
+@dataclass(kw_only=True)
+class HTTPFetcher:
+    """
+    Fetch the pages with plain HTTP GET requests (without the browser) using a single pooled aiohttp session
+
+    The content is only used if the required selectors are present in it (see "validate" in fetch()), otherwise the caller falls back to the browser
+    """
+
+    limit: int = 100
+    timeout: float = 60.0
+    session: aiohttp.ClientSession | None = field(init=False, default=None)
+    fetched: int = field(init=False, default=0)
+    fallbacks: int = field(init=False, default=0)
+    failed: int = field(init=False, default=0)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if not self.session:
+            # ? Ignore if the SSL certificiation is failed
+            # ? See: https://github.com/aio-libs/aiohttp/issues/955
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, ssl=False),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self.session
+
+    async def get(
+        self, url: str, *, rate_limit: int | None = None, encoding: str | None = None
+    ) -> str | None:
+        """
+        Return the content of the page, or None if the request is failed (i.e., 4xx/5xx, timeout, connection error)
+        """
+        try:
+            async with rate_limited(url, rate_limit) as request:
+                async with self.get_session().get(url) as response:
+                    request.status = response.status
+                    if response.status >= 400:
+                        debug(f"HTTP GET failed ({response.status}): {url}")
+                        return None
+
+                    body = await response.read()
+                    content_type = response.headers.get("Content-Type", "")
+        except (TimeoutError, aiohttp.ClientError) as err:
+            debug(f"HTTP GET failed ({err!r}): {url}")
+            return None
+
+        try:
+            return await decode_content(body, content_type, encoding)
+        except (UnicodeDecodeError, LookupError) as err:
+            debug(f"HTTP content is not decoded ({err}): {url}")
+            return None
+
+    async def fetch(
+        self, url: str, *, rate_limit: int | None = None, validate: Validate | None
+    ) -> str | None:
+        """
+        Return the content of the page if the request is successful and the required selectors are present in it (i.e., validate() returns True)
+        """
+        if (content := await self.get(url, rate_limit=rate_limit)) is None:
+            self.failed += 1
+            return None
+
+        if validate and not await validate(content):
+            debug(f"Required selectors are not present in HTTP content: {url}")
+            self.fallbacks += 1
+            return None
+
+        self.fetched += 1
+        return content
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+        if self.fetched or self.fallbacks or self.failed:
+            text = f"{self.fetched} pages fetched | {self.fallbacks} fallbacks to browser (selectors not present) | {self.failed} fallbacks to browser (request failed)"
+            logger.info(f"HTTP fetch: {text}")
+            get_run_report().add("HTTP fetch", text)
+
+
+# ? HTTP fetcher of the currently running crawl (if any)
+current_http_fetcher: ContextVar[HTTPFetcher | None] = ContextVar(
+    "current_http_fetcher", default=None
+)
+
+
+@asynccontextmanager
+async def use_http_fetcher(limit: int = 100) -> AsyncIterator[HTTPFetcher]:
+    """
+    Let load_content() fetch the pages over HTTP (when fetch_mode="http") inside this context
+
+    The aiohttp session is only created if there is any HTTP request
+    """
+    fetcher = HTTPFetcher(limit=limit)
+    token = current_http_fetcher.set(fetcher)
+    try:
+        yield fetcher
+    finally:
+        current_http_fetcher.reset(token)
+        await fetcher.close()
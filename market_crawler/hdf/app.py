@@ -5,9 +5,8 @@
 
 from __future__ import annotations
 
-import asyncio
-
 from contextlib import suppress
+from dataclasses import replace
 from functools import cache, singledispatch
 from typing import NamedTuple, overload
 from urllib.parse import urljoin
@@ -18,7 +17,6 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.playwright import (
     AsyncPlaywrightBrowser,
     PlaywrightBrowser,
@@ -26,11 +24,18 @@ from dunia.playwright import (
     PlaywrightPage,
 )
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.browser import borrow_page, use_page_pool
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
+from market_crawler.extraction import (
+    load_content,
+    parse_document,
+    prefetch_content,
+    visit_link,
+)
 from market_crawler.hdf import config
 from market_crawler.hdf.data import HDFCrawlData
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file
@@ -75,9 +80,13 @@ async def run(settings: Settings) -> None:
             start_category=config.START_CATEGORY,
             end_category=config.END_CATEGORY,
             chunk_size=config.CATEGORIES_CHUNK_SIZE,
+            scheduler=config.CATEGORIES_SCHEDULER,
+            max_open_pages=config.MAX_OPEN_PAGES,
+            prefetch=config.PREFETCH_NEXT_PAGE,
             crawl=crawl,
         )
-        await crawl_categories(crawler, browser, settings, columns)
+        async with use_page_pool(browser, max_reuse=config.MAX_PAGE_REUSE):
+            await crawl_categories(crawler, browser, settings, columns)
 
 
 async def crawl(
@@ -141,6 +150,19 @@ async def crawl(
 
         log.detail.total_products_on_page(number_of_products, category_state.pageno)
 
+        prefetch_content(
+            browser=browser,
+            url=page_url(
+                current_url=category_page_url, next_page_no=category_state.pageno + 1
+            ),
+            html=replace(category_html, pageno=category_state.pageno + 1),
+            engine="lexbor",
+            on_failure="fetch",
+            wait_until="networkidle",
+            async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
+            rate_limit=config.DEFAULT_RATE_LIMIT,
+        )
+
         filename: str = temporary_csv_file(
             sitename=config.SITENAME,
             date=settings.DATE,
@@ -148,8 +170,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -160,10 +182,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -215,13 +237,12 @@ async def extract_product(
             raise error.ProductsNotFound(err, url=category_page_url)
 
     if not (product_url := (await get_product_link(product, category_page_url)).ok()):
-        page = await browser.new_page()
-        await visit_link(page, category_page_url, wait_until="networkidle")
+        async with borrow_page(browser) as page:
+            await visit_link(page, category_page_url, wait_until="networkidle")
+            content = await page.content()
 
-        content = await page.content()
         if config.SAVE_HTML and not await category_html.exists():
             await category_html.save(content)
-        await page.close()
         if not (document := await parse_document(content, engine="lxml")):
             raise HTMLParsingError(
                 "Document is not parsed correctly", url=category_page_url
@@ -253,119 +274,116 @@ async def extract_product(
     ):
         return None
 
-    page = await browser.new_page()
-    await visit_link(page, product_url, wait_until="load")
+    async with borrow_page(browser) as page:
+        await visit_link(page, product_url, wait_until="load")
 
-    if not (document := await parse_document(await page.content(), engine="lxml")):
-        raise HTMLParsingError("Document is not parsed correctly", url=product_url)
+        if not (document := await parse_document(await page.content(), engine="lxml")):
+            raise HTMLParsingError("Document is not parsed correctly", url=product_url)
 
-    match await extract_product_name(document):
-        case Ok(name):
-            product_name = name
-        case Err(err):
-            raise error.ProductNameNotFound(err, url=category_page_url)
+        match await extract_product_name(document):
+            case Ok(name):
+                product_name = name
+            case Err(err):
+                raise error.ProductNameNotFound(err, url=category_page_url)
 
-    match await extract_thumbnail_image(document, product_url):
-        case Ok(thumbnail_image_url):
-            pass
-        case Err(err):
-            raise error.ThumbnailNotFound(err, url=product_url)
+        match await extract_thumbnail_image(document, product_url):
+            case Ok(thumbnail_image_url):
+                pass
+            case Err(err):
+                raise error.ThumbnailNotFound(err, url=product_url)
 
-    match await extract_model_name(document):
-        case Ok(model_name):
-            pass
-        case Err(err):
-            # ? Some products don't have model name: https://shop.ihdf.co.kr/shop_goods/goods_view.htm?category=03080300&goods_idx=8484&goods_bu_id=
-            log.warning(f"Model name is not found: {product_url}")
-            model_name = ""
-
-    if not (delivery_fee := (await extract_delivery_fee(document)).ok()):
-        raise error.DeliveryFeeNotFound(product_url)
-
-    match await extract_images(document, product_url):
-        case Ok(detailed_images_html_source):
-            pass
-
-        case Err(error.QueryNotFound(err)):
-            log.debug(f"{err}: <yellow>{product_url}</>")
-            detailed_images_html_source = "NOT PRESENT"
-
-        case Err(error.InvalidImageURL(err)):
-            # ? Use Playwright's Page for parsing in case of Base64
-            match await extract_images(page, product_url, html_top, html_bottom):
-                case Ok(detailed_images_html_source):
-                    pass
-                case Err(error.QueryNotFound(err)):
-                    log.debug(f"{err}: <yellow>{product_url}</>")
-                    detailed_images_html_source = "NOT PRESENT"
-                case Err(err):
-                    raise error.ProductDetailImageNotFound(err, product_url)
+        match await extract_model_name(document):
+            case Ok(model_name):
+                pass
+            case Err(err):
+                # ? Some products don't have model name: https://shop.ihdf.co.kr/shop_goods/goods_view.htm?category=03080300&goods_idx=8484&goods_bu_id=
+                log.warning(f"Model name is not found: {product_url}")
+                model_name = ""
 
-        case Err(err):
-            raise error.ProductDetailImageNotFound(err, product_url)
-
-    if await is_options_changing_prices_present(page):
-        all_price3_option1 = await extract_options2(page)
-
-        for price3, option1 in all_price3_option1:
-            crawl_data = HDFCrawlData(
-                category=category_state.name,
-                product_url=product_url,
-                product_name=product_name,
-                thumbnail_image_url=thumbnail_image_url,
-                model_name=model_name,
-                delivery_fee=delivery_fee,
-                detailed_images_html_source=detailed_images_html_source,
-                price3=price3,
-                option1=option1,
-            )
-            await save_series_csv(
-                to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
+        if not (delivery_fee := (await extract_delivery_fee(document)).ok()):
+            raise error.DeliveryFeeNotFound(product_url)
+
+        match await extract_images(document, product_url):
+            case Ok(detailed_images_html_source):
+                pass
+
+            case Err(error.QueryNotFound(err)):
+                log.debug(f"{err}: <yellow>{product_url}</>")
+                detailed_images_html_source = "NOT PRESENT"
+
+            case Err(error.InvalidImageURL(err)):
+                # ? Use Playwright's Page for parsing in case of Base64
+                match await extract_images(page, product_url, html_top, html_bottom):
+                    case Ok(detailed_images_html_source):
+                        pass
+                    case Err(error.QueryNotFound(err)):
+                        log.debug(f"{err}: <yellow>{product_url}</>")
+                        detailed_images_html_source = "NOT PRESENT"
+                    case Err(err):
+                        raise error.ProductDetailImageNotFound(err, product_url)
+
+            case Err(err):
+                raise error.ProductDetailImageNotFound(err, product_url)
+
+        if await is_options_changing_prices_present(page):
+            all_price3_option1 = await extract_options2(page)
+
+            for price3, option1 in all_price3_option1:
+                crawl_data = HDFCrawlData(
+                    category=category_state.name,
+                    product_url=product_url,
+                    product_name=product_name,
+                    thumbnail_image_url=thumbnail_image_url,
+                    model_name=model_name,
+                    delivery_fee=delivery_fee,
+                    detailed_images_html_source=detailed_images_html_source,
+                    price3=price3,
+                    option1=option1,
+                )
+                await save_series_csv(
+                    to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
+                )
+
+            log.action.product_crawled_with_options(
+                idx,
+                category_state.name,
+                category_state.pageno,
+                product_url,
+                len(all_price3_option1),
             )
+            product_state.done = True
+            if config.USE_PRODUCT_SAVE_STATES:
+                await product_state.save()
+            return None
+
+        match await extract_price3(document):
+            case Ok(price3):
+                pass
+            case Err(err):
+                raise error.Price3NotFound(err, url=product_url)
+
+        crawl_data = HDFCrawlData(
+            category=category_state.name,
+            product_url=product_url,
+            product_name=product_name,
+            thumbnail_image_url=thumbnail_image_url,
+            model_name=model_name,
+            delivery_fee=delivery_fee,
+            detailed_images_html_source=detailed_images_html_source,
+            price3=price3,
+            option1="",
+        )
 
-        log.action.product_crawled_with_options(
-            idx,
-            category_state.name,
-            category_state.pageno,
-            product_url,
-            len(all_price3_option1),
+        log.action.product_crawled(
+            idx, crawl_data.category, category_state.pageno, crawl_data.product_url
         )
-        await page.close()
+        await save_series_csv(
+            to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
+        )
+
         product_state.done = True
         if config.USE_PRODUCT_SAVE_STATES:
             await product_state.save()
-        return None
-
-    match await extract_price3(document):
-        case Ok(price3):
-            pass
-        case Err(err):
-            raise error.Price3NotFound(err, url=product_url)
-
-    crawl_data = HDFCrawlData(
-        category=category_state.name,
-        product_url=product_url,
-        product_name=product_name,
-        thumbnail_image_url=thumbnail_image_url,
-        model_name=model_name,
-        delivery_fee=delivery_fee,
-        detailed_images_html_source=detailed_images_html_source,
-        price3=price3,
-        option1="",
-    )
-
-    log.action.product_crawled(
-        idx, crawl_data.category, category_state.pageno, crawl_data.product_url
-    )
-    await save_series_csv(
-        to_series(crawl_data, settings.COLUMN_MAPPING), columns, filename
-    )
-
-    product_state.done = True
-    if config.USE_PRODUCT_SAVE_STATES:
-        await product_state.save()
-
-    await page.close()
 
 
 @cache
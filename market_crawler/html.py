@@ -13,6 +13,8 @@ from typing import cast
 
 from aiofile import AIOFile
 
+from market_crawler.resume import resolve_file
+
 
 @dataclass(slots=True, kw_only=True)
 class CategoryHTML:
@@ -48,9 +50,17 @@ class CategoryHTML:
         ) as afp:
             await afp.write(content)
 
+    async def resolve(self) -> str | None:
+        """
+        Path of the HTML file in the date directory, or in the previous dates that it is chained to on resume (see market_crawler.resume)
+        """
+        return await asyncio.to_thread(
+            resolve_file, self.directory, os.path.basename(self.file)
+        )
+
     async def load(self, encoding: str = "utf-8-sig") -> str:
         async with AIOFile(
-            self.file,
+            await self.resolve() or self.file,
             "r",
             encoding=encoding,
         ) as afp:
@@ -59,7 +69,7 @@ class CategoryHTML:
         return html
 
     async def exists(self) -> bool:
-        return await asyncio.to_thread(os.path.exists, self.file)
+        return await self.resolve() is not None
 
 
 @dataclass(slots=True, kw_only=True)
@@ -103,9 +113,21 @@ class ProductHTML:
         ) as afp:
             await afp.write(content)
 
+    async def resolve(self) -> str | None:
+        """
+        Path of the HTML file in the date directory, or in the previous dates that it is chained to on resume (see market_crawler.resume)
+        """
+        return await asyncio.to_thread(
+            resolve_file,
+            os.path.join(os.path.dirname(__file__), self.sitename, "html", self.date),
+            os.path.join(
+                self.category_name, str(self.pageno), f"{self.productid}.html"
+            ),
+        )
+
     async def load(self, encoding: str = "utf-8-sig") -> str:
         async with AIOFile(
-            self.file,
+            await self.resolve() or self.file,
             "r",
             encoding=encoding,
         ) as afp:
@@ -114,4 +136,4 @@ class ProductHTML:
         return html
 
     async def exists(self) -> bool:
-        return await asyncio.to_thread(os.path.exists, self.file)
+        return await self.resolve() is not None
@@ -15,11 +15,14 @@ DEFAULT_ASYNC_TIMEOUT: Final[int] = 600
 DEFAULT_RATE_LIMIT: Final[int] = 10
 
 CATEGORIES_CHUNK_SIZE: Final[int] = 5
+CATEGORIES_SCHEDULER: Final[str] = "queue"
 MIN_PRODUCTS_CHUNK_SIZE: Final[int] = 10
 MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 10
+MAX_OPEN_PAGES: Final[int] = 50
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "웻슈트"
@@ -15,11 +15,11 @@ from typing import cast
 import backoff
 
 from aiofile import AIOFile, LineReader
-from throttler import Throttler
 
 from market_crawler.cache import async_diskcache
 from market_crawler.error import InvalidURL, TimeoutException, backoff_hdlr
 from market_crawler.log import success
+from market_crawler.ratelimit import rate_limited
 
 
 @dataclass(slots=True, frozen=True)
@@ -49,8 +49,9 @@ async def verify_url(url: str, name: str, rate_limit: int) -> tuple[str, str]:
         connector=aiohttp.TCPConnector(ssl=False)
     ) as session:
         try:
-            async with Throttler(rate_limit, period=1.0):
+            async with rate_limited(url, rate_limit) as request:
                 async with session.get(url) as response:
+                    request.status = response.status
                     try:
                         response.raise_for_status()
                     except aiohttp.ClientResponseError as err:
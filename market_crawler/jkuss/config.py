@@ -26,6 +26,7 @@ MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 6
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "신상>카멜레온"
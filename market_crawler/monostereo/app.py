@@ -9,7 +9,7 @@ import asyncio
 import os
 import re
 
-from functools import cache
+from functools import cache, partial
 from typing import Any
 from urllib.parse import urljoin
 
@@ -22,20 +22,26 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError, LoginInputNotFound, PasswordInputNotFound
-from dunia.extraction import load_content, load_page, parse_document, visit_link
 from dunia.login import LoginInfo
 from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from dunia.playwright.browser import AsyncPlaywrightBrowser
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex
+from market_crawler.extraction import (
+    load_content,
+    load_page,
+    parse_document,
+    visit_link,
+)
+from market_crawler.helpers import compile_regex
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.memory import MemoryOptimizer
 from market_crawler.monostereo import config
 from market_crawler.monostereo.data import MonostereoCrawlData
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
+from market_crawler.session import log_in
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from playwright_stealth import stealth_async
@@ -231,7 +237,12 @@ async def run(settings: Settings):
             browser_config=browser_config,
             playwright=playwright,
         ).create()
-        await login(login_info, browser)
+        await log_in(
+            browser,
+            login_info,
+            sitename=config.SITENAME,
+            login=partial(login, login_info),
+        )
 
         columns = list(settings.COLUMN_MAPPING.values())
 
@@ -271,13 +282,13 @@ async def crawl_urls(
         date=settings.DATE,
     )
 
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(idx, browser, urls[idx], filename, settings, columns)
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
 
 async def extract_url(
@@ -461,8 +472,8 @@ async def crawl(
             browser, category_chunk_size, products_chunk_size
         )
 
-        for chunk in chunks(range(number_of_products), products_chunk_size):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -473,10 +484,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=products_chunk_size,
+        )
 
         log.action.category_page_crawled(
             category_name.replace("<", r"\<"), category_state.pageno
@@ -9,6 +9,8 @@ import asyncio
 import os
 import sys
 
+from functools import partial
+
 import pytest
 
 from playwright.async_api import async_playwright
@@ -17,6 +19,7 @@ from dunia.browser import BrowserConfig
 from market_crawler import log
 from market_crawler.monostereo import config
 from market_crawler.monostereo.app import AsyncPlaywrightBrowser, get_login_info, login
+from market_crawler.session import log_in
 
 
 def pytest_collection_modifyitems(items: list[pytest.Function]):
@@ -52,7 +55,12 @@ async def browser():
             browser_config=browser_config,
             playwright=playwright,
         ).create()
-        await login(login_info, browser)
+        await log_in(
+            browser,
+            login_info,
+            sitename=config.SITENAME,
+            login=partial(login, login_info),
+        )
         yield browser
 
 
@@ -72,5 +80,10 @@ async def browser_headed():
             browser_config=browser_config,
             playwright=playwright,
         ).create()
-        await login(login_info, browser)
+        await log_in(
+            browser,
+            login_info,
+            sitename=config.SITENAME,
+            login=partial(login, login_info),
+        )
         yield browser
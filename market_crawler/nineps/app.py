@@ -5,11 +5,10 @@
 
 from __future__ import annotations
 
-import asyncio
 import re
 
 from contextlib import suppress
-from functools import cache
+from functools import cache, partial
 from urllib.parse import urljoin
 
 from playwright.async_api import async_playwright
@@ -19,23 +18,24 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import (
-    AsyncPlaywrightBrowser,
-    PlaywrightBrowser,
-    PlaywrightElementHandle,
-    PlaywrightPage,
-)
+from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import (
+    ConcurrentCrawler,
+    crawl_categories,
+    crawl_pages,
+    crawl_products,
+)
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_content, parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.nineps import config
 from market_crawler.nineps.data import NinepsCrawlData
 from market_crawler.path import temporary_csv_file
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.template import build_detailed_images_html
@@ -75,9 +75,12 @@ async def run(settings: Settings):
         login_button_strategy=login_button_strategy,
     )
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
         categories = await get_categories(
             sitename=config.SITENAME, filename="categories.txt"
@@ -125,6 +128,26 @@ async def crawl(
 
     log.action.visit_category(category_name, category_page_url)
 
+    await crawl_pages(
+        category_state,
+        partial(
+            crawl_page,
+            category=category,
+            browser=browser,
+            settings=settings,
+            columns=columns,
+        ),
+        total_pages=partial(
+            get_category_total_pages, browser, category_page_url, category_html
+        ),
+        max_concurrent_pages=config.MAX_CONCURRENT_PAGES,
+        save_states=config.USE_CATEGORY_SAVE_STATES,
+    )
+
+
+async def get_category_total_pages(
+    browser: PlaywrightBrowser, category_page_url: str, category_html: CategoryHTML
+) -> int:
     content = await load_content(
         browser=browser,
         url=category_page_url,
@@ -144,78 +167,83 @@ async def crawl(
     total_pages = await get_total_pages(document)
     log.detail.total_pages(total_pages)
 
-    while True:
-        if category_state.pageno > total_pages:
-            log.action.products_not_present_on_page(
-                category_page_url, category_state.pageno
-            )
-            break
-
-        category_page_url = page_url(
-            current_url=category_page_url, next_page_no=category_state.pageno
-        )
-        log.detail.page_url(category_page_url)
+    return total_pages
 
-        content = await load_content(
-            browser=browser,
-            url=category_page_url,
-            html=category_html,
-            on_failure="fetch",
-            wait_until="networkidle",
-            async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
-            rate_limit=config.DEFAULT_RATE_LIMIT,
-        )
-        if config.SAVE_HTML and not await category_html.exists():
-            await category_html.save(content)
 
-        if not (document := await parse_document(content, engine="lexbor")):
-            raise HTMLParsingError(
-                "Document is not parsed correctly", url=category_page_url
-            )
-
-        if not (number_of_products := await has_products(document)):
-            log.action.products_not_present_on_page(
-                category_page_url, category_state.pageno
-            )
-            break
+async def crawl_page(
+    category_state: CategoryState,
+    *,
+    category: Category,
+    browser: PlaywrightBrowser,
+    settings: Settings,
+    columns: list[str],
+) -> int | None:
+    """
+    Crawl the products of the category page (category_state.pageno), see market_crawler.crawling.crawl_pages()
+    """
+    category_html = CategoryHTML(
+        name=category.name,
+        pageno=category_state.pageno,
+        date=settings.DATE,
+        sitename=config.SITENAME,
+    )
+    category_page_url = page_url(
+        current_url=category.url, next_page_no=category_state.pageno
+    )
+    log.detail.page_url(category_page_url)
 
-        log.detail.total_products_on_page(number_of_products, category_state.pageno)
+    content = await load_content(
+        browser=browser,
+        url=category_page_url,
+        html=category_html,
+        on_failure="fetch",
+        wait_until="networkidle",
+        async_timeout=config.DEFAULT_ASYNC_TIMEOUT,
+        rate_limit=config.DEFAULT_RATE_LIMIT,
+    )
+    if config.SAVE_HTML and not await category_html.exists():
+        await category_html.save(content)
 
-        filename: str = temporary_csv_file(
-            sitename=config.SITENAME,
-            date=settings.DATE,
-            category_name=category.name,
-            page_no=category_state.pageno,
+    if not (document := await parse_document(content, engine="lexbor")):
+        raise HTMLParsingError(
+            "Document is not parsed correctly", url=category_page_url
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
-                extract_product(
-                    idx,
-                    browser,
-                    category_page_url,
-                    category_state,
-                    category_html,
-                    filename,
-                    columns,
-                    settings,
-                )
-                for idx in chunk
-            )
+    if not (number_of_products := await has_products(document)):
+        log.action.products_not_present_on_page(
+            category_page_url, category_state.pageno
+        )
+        return None
 
-            await asyncio.gather(*tasks)
+    log.detail.total_products_on_page(number_of_products, category_state.pageno)
 
-        log.action.category_page_crawled(category_state.name, category_state.pageno)
+    filename: str = temporary_csv_file(
+        sitename=config.SITENAME,
+        date=settings.DATE,
+        category_name=category.name,
+        page_no=category_state.pageno,
+    )
 
-        category_state.pageno += 1
-        category_html.pageno = category_state.pageno
+    await crawl_products(
+        (
+            extract_product(
+                idx,
+                browser,
+                category_page_url,
+                category_state,
+                category_html,
+                filename,
+                columns,
+                settings,
+            )
+            for idx in range(number_of_products)
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
-        if config.USE_CATEGORY_SAVE_STATES:
-            await category_state.save()
+    log.action.category_page_crawled(category_state.name, category_state.pageno)
 
-    category_state.done = True
-    if config.USE_CATEGORY_SAVE_STATES:
-        await category_state.save()
+    return number_of_products
 
 
 def get_productid(url: str) -> Result[str, str]:
@@ -10,7 +10,7 @@ import os
 
 from dataclasses import dataclass
 from functools import cache
-from typing import cast
+from typing import Final, cast
 from urllib.parse import urljoin
 
 import pandas as pd
@@ -22,22 +22,31 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import parse_document, visit_link
 from dunia.playwright import AsyncPlaywrightBrowser, PlaywrightBrowser, PlaywrightPage
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.initialization import Category, get_categories
 from market_crawler.nsrod import config
 from market_crawler.nsrod.data import NSrodCrawlData
 from market_crawler.path import temporary_csv_file
+from market_crawler.readiness import SelectorPresent, TextNonEmpty
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.template import build_detailed_images_html
 from robustify.result import Err, Ok, Result, returns_future
 
 
+# ? Pages are ready as soon as these are present, instead of waiting for "networkidle" (see market_crawler.readiness)
+CATEGORY_PAGE_READY: Final = (SelectorPresent("table.goodsDisplayItemWrap"),)
+PRODUCT_PAGE_READY: Final = (
+    TextNonEmpty("#goods_view span[class='goods_name']"),
+    SelectorPresent("#goods_view > div.goods_description"),
+)
+
+
 @cache
 def page_url(*, current_url: str, next_page_no: int) -> str:
     if "?page" in current_url:
@@ -202,12 +211,18 @@ async def crawl(
             page,
             category_page_url,
             wait_until="networkidle",
+            ready=CATEGORY_PAGE_READY,
         )
 
         # ? Sometimes website block access if there are a lot of requests at once
         while await page.query_selector("body:has-text('초동안 접속차단')"):
             await asyncio.sleep(1)
-            await visit_link(page, category_page_url, wait_until="networkidle")
+            await visit_link(
+                page,
+                category_page_url,
+                wait_until="networkidle",
+                ready=CATEGORY_PAGE_READY,
+            )
 
         content = await page.content()
         await page.close()
@@ -232,8 +247,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -243,10 +258,10 @@ async def crawl(
                     settings,
                     columns,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -274,11 +289,15 @@ async def extract_product(
         settings.DETAILED_IMAGES_HTML_SOURCE_BOTTOM,
     )
     page = await browser.new_page()
-    await visit_link(page, category_page_url, wait_until="networkidle")
+    await visit_link(
+        page, category_page_url, wait_until="networkidle", ready=CATEGORY_PAGE_READY
+    )
 
     while await page.query_selector("body:has-text('초동안 접속차단')"):
         await asyncio.sleep(1)
-        await visit_link(page, category_page_url, wait_until="networkidle")
+        await visit_link(
+            page, category_page_url, wait_until="networkidle", ready=CATEGORY_PAGE_READY
+        )
 
     content = await page.content()
 
@@ -289,11 +308,18 @@ async def extract_product(
 
     if not (products := (await get_products(document)).ok()):
         await asyncio.sleep(1)
-        await visit_link(page, category_page_url, wait_until="networkidle")
+        await visit_link(
+            page, category_page_url, wait_until="networkidle", ready=CATEGORY_PAGE_READY
+        )
 
         while await page.query_selector("body:has-text('초동안 접속차단')"):
             await asyncio.sleep(1)
-            await visit_link(page, category_page_url, wait_until="networkidle")
+            await visit_link(
+                page,
+                category_page_url,
+                wait_until="networkidle",
+                ready=CATEGORY_PAGE_READY,
+            )
 
         if not (document := await parse_document(content, engine="lxml")):
             raise HTMLParsingError(
@@ -310,7 +336,9 @@ async def extract_product(
         product = products[idx]
 
     if not (product_url := (await get_product_link(product, category_page_url)).ok()):
-        await visit_link(page, category_page_url, wait_until="networkidle")
+        await visit_link(
+            page, category_page_url, wait_until="networkidle", ready=CATEGORY_PAGE_READY
+        )
 
         content = await page.content()
 
@@ -345,11 +373,15 @@ async def extract_product(
     ):
         return None
 
-    await visit_link(page, product_url, wait_until="networkidle")
+    await visit_link(
+        page, product_url, wait_until="networkidle", ready=PRODUCT_PAGE_READY
+    )
 
     while await page.query_selector("body:has-text('초동안 접속차단')"):
         await asyncio.sleep(1)
-        await visit_link(page, product_url, wait_until="networkidle")
+        await visit_link(
+            page, product_url, wait_until="networkidle", ready=PRODUCT_PAGE_READY
+        )
 
     content = await page.content()
     if not (document := await parse_document(content, engine="lxml")):
@@ -475,7 +507,9 @@ async def extract_data(
             f"Product name is not found. Visiting the link ({product_url}) for second attempt"
         )
 
-        await visit_link(page, product_url, wait_until="networkidle")
+        await visit_link(
+            page, product_url, wait_until="networkidle", ready=PRODUCT_PAGE_READY
+        )
         if not (document2 := await parse_document(await page.content(), engine="lxml")):
             raise HTMLParsingError("Document is not parsed correctly", url=product_url)
 
@@ -0,0 +1,319 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from market_crawler.log import logger
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterable, Callable, Iterable
+    from typing import Any, Final, Self
+
+
+# ? Marks the end of the items in the queue
+DONE: Final = object()
+
+# ? Event loop of the pipeline's thread, it is created once per thread and reused for every item (see run_in_thread_loop())
+thread_state: Final = threading.local()
+
+
+@dataclass(slots=True, kw_only=True)
+class Stage:
+    """
+    Single stage of the pipeline (i.e., fetch, parse, extract, write)
+
+    The function receives the output of the previous stage, and its return value is passed to the next stage
+
+    If the function returns None, then the item is dropped (i.e., product has already been crawled)
+
+    Executor decides where the function is run:
+        - "async": Coroutine function awaited on the event loop (i.e., Playwright navigation)
+        - "thread": Normal function run in the thread pool (i.e., parsing, pandas writes), the coroutine function is run on the event loop of the thread (see run_in_thread_loop())
+        - "process": Normal function run in the process pool, its arguments and return value must be picklable (i.e., parse and extract in a single function that returns the plain data)
+    """
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    executor: str = "async"
+    processed: int = field(init=False, default=0)
+    dropped: int = field(init=False, default=0)
+    busy: float = field(init=False, default=0.0)
+
+    def __post_init__(self):
+        if self.executor not in ("async", "thread", "process"):
+            raise ValueError(
+                f"Unknown executor for stage {self.name}: '{self.executor}' (it must be 'async', 'thread' or 'process')"
+            )
+
+        if self.executor == "async" and not inspect.iscoroutinefunction(self.fn):
+            raise TypeError(
+                f"Stage {self.name} must be a coroutine function when using 'async' executor"
+            )
+
+
+def run_in_thread_loop(fn: Callable[[Any], Any], item: Any) -> Any:
+    """
+    Run the coroutine function until it is complete on the event loop of the current pipeline's thread, instead of creating a new event loop for every item (i.e., asyncio.run())
+    """
+    return thread_state.loop.run_until_complete(fn(item))
+
+
+@dataclass(slots=True, kw_only=True)
+class QueueDepth:
+    maxsize: int
+    current: int = 0
+    peak: int = 0
+    samples: int = 0
+    total: int = 0
+
+    def sample(self, depth: int) -> None:
+        self.current = depth
+        self.peak = max(self.peak, depth)
+        self.samples += 1
+        self.total += depth
+
+    @property
+    def average(self) -> float:
+        return self.total / self.samples if self.samples else 0.0
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class StageMetrics:
+    name: str
+    processed: int
+    dropped: int
+    busy: float
+    throughput: float
+    queue: QueueDepth
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.processed} items ({self.dropped} dropped) | {self.throughput:.2f} items/s | Busy: {self.busy:.1f}s | Queue depth: {self.queue.current} (avg: {self.queue.average:.1f}, peak: {self.queue.peak}/{self.queue.maxsize})"
+
+
+@dataclass(kw_only=True)
+class Pipeline:
+    """
+    Run the stages concurrently, connected by bounded asyncio queues
+
+    When a slow stage fills its input queue, the previous stages wait (i.e., back-pressure), so fetches keep going while the pages are parsed in the thread/process pool without piling up in the memory
+
+    Usage:
+        async with Pipeline(
+            stages=[
+                Stage(name="fetch", fn=fetch, workers=10),
+                Stage(name="extract", fn=extract, workers=4, executor="thread"),
+                Stage(name="write", fn=write),
+            ],
+        ) as pipeline:
+            await pipeline.run(product_jobs)
+
+    The metrics (i.e., queue depth and throughput of every stage) are logged and added to the run report when the pipeline is closed
+    """
+
+    stages: list[Stage]
+    queue_size: int = 100
+    max_thread_workers: int | None = None
+    max_process_workers: int | None = None
+    thread_pool: ThreadPoolExecutor | None = field(init=False, default=None)
+    thread_loops: list[asyncio.AbstractEventLoop] = field(
+        init=False, default_factory=list
+    )
+    process_pool: ProcessPoolExecutor | None = field(init=False, default=None)
+    depths: list[QueueDepth] = field(init=False, default_factory=list)
+    running: int = field(init=False, default=0)
+    started: float = field(init=False, default=0.0)
+    elapsed: float = field(init=False, default=0.0)
+
+    def __post_init__(self):
+        if not self.stages:
+            raise ValueError("Pipeline must have at least one stage")
+
+        self.depths = [QueueDepth(maxsize=self.queue_size) for _ in self.stages]
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.thread_pool:
+            self.thread_pool.shutdown(wait=False, cancel_futures=True)
+            self.thread_pool = None
+        # ? Loop that is still running the last item of its thread is closed by the garbage collector instead
+        for loop in self.thread_loops:
+            if not loop.is_running():
+                loop.close()
+        self.thread_loops = []
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+            self.process_pool = None
+
+        self.report()
+
+    def executor(self, stage: Stage) -> Executor | None:
+        match stage.executor:
+            case "thread":
+                if not self.thread_pool:
+                    self.thread_pool = ThreadPoolExecutor(
+                        self.max_thread_workers,
+                        thread_name_prefix="pipeline",
+                        initializer=self.start_thread_loop,
+                    )
+                return self.thread_pool
+            case "process":
+                if not self.process_pool:
+                    self.process_pool = ProcessPoolExecutor(self.max_process_workers)
+                return self.process_pool
+            case _:
+                return None
+
+    def start_thread_loop(self) -> None:
+        thread_state.loop = asyncio.new_event_loop()
+        self.thread_loops.append(thread_state.loop)
+
+    async def run(self, items: Iterable[Any] | AsyncIterable[Any]) -> None:
+        """
+        Pass all the items through the stages and wait until the last stage is finished
+
+        It can be called multiple times, even concurrently (i.e., once per category page of the concurrent categories), every call has its own queues and the metrics of the stages are shared
+        """
+        queues: list[asyncio.Queue[Any]] = [
+            asyncio.Queue(self.queue_size) for _ in self.stages
+        ]
+
+        # ? Throughput is measured over the time that at least one run() was in progress, so that the concurrent runs are not counted twice
+        if not self.running:
+            self.started = perf_counter()
+        self.running += 1
+
+        tasks = [asyncio.create_task(self.feed(queues, items))]
+        for idx, stage in enumerate(self.stages):
+            executor = self.executor(stage)
+            stage_tasks = [
+                asyncio.create_task(self.worker(queues, idx, stage, executor))
+                for _ in range(max(stage.workers, 1))
+            ]
+            tasks.append(
+                asyncio.create_task(self.close_stage(queues, idx, stage_tasks))
+            )
+            tasks.extend(stage_tasks)
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.running -= 1
+            if not self.running:
+                self.elapsed += perf_counter() - self.started
+
+    async def put(self, queues: list[asyncio.Queue[Any]], idx: int, item: Any) -> None:
+        await queues[idx].put(item)
+        self.depths[idx].sample(queues[idx].qsize())
+
+    async def feed(
+        self,
+        queues: list[asyncio.Queue[Any]],
+        items: Iterable[Any] | AsyncIterable[Any],
+    ) -> None:
+        if hasattr(items, "__aiter__"):
+            async for item in items:  # type: ignore
+                await self.put(queues, 0, item)
+        else:
+            for item in items:  # type: ignore
+                await self.put(queues, 0, item)
+
+        for _ in range(max(self.stages[0].workers, 1)):
+            await queues[0].put(DONE)
+
+    async def close_stage(
+        self,
+        queues: list[asyncio.Queue[Any]],
+        idx: int,
+        stage_tasks: list[asyncio.Task[None]],
+    ) -> None:
+        """
+        Signal the next stage when every worker of this stage is finished
+        """
+        await asyncio.gather(*stage_tasks)
+
+        if idx + 1 < len(self.stages):
+            for _ in range(max(self.stages[idx + 1].workers, 1)):
+                await queues[idx + 1].put(DONE)
+
+    async def worker(
+        self,
+        queues: list[asyncio.Queue[Any]],
+        idx: int,
+        stage: Stage,
+        executor: Executor | None,
+    ) -> None:
+        queue = queues[idx]
+        is_last_stage = idx + 1 == len(self.stages)
+
+        while (item := await queue.get()) is not DONE:
+            self.depths[idx].sample(queue.qsize())
+
+            start_time = perf_counter()
+            if executor is None:
+                result = await stage.fn(item)
+            elif stage.executor == "thread" and inspect.iscoroutinefunction(stage.fn):
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, partial(run_in_thread_loop, stage.fn, item)
+                )
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, partial(stage.fn, item)
+                )
+            stage.busy += perf_counter() - start_time
+            stage.processed += 1
+
+            if result is None:
+                stage.dropped += not is_last_stage
+                continue
+
+            if not is_last_stage:
+                await self.put(queues, idx + 1, result)
+
+    def metrics(self) -> list[StageMetrics]:
+        elapsed = self.elapsed + (
+            perf_counter() - self.started if self.running else 0.0
+        )
+        return [
+            StageMetrics(
+                name=stage.name,
+                processed=stage.processed,
+                dropped=stage.dropped,
+                busy=stage.busy,
+                throughput=stage.processed / elapsed if elapsed else 0.0,
+                queue=depth,
+            )
+            for stage, depth in zip(self.stages, self.depths)
+        ]
+
+    def report(self) -> None:
+        if not self.stages[0].processed:
+            return None
+
+        for metrics in self.metrics():
+            logger.info(f"Pipeline stage {metrics}")
+            get_run_report().add("Pipeline", str(metrics))
@@ -0,0 +1,149 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from market_crawler.log import debug, logger
+from market_crawler.report import get_run_report
+from market_crawler.singleflight import get_document_cache
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+
+    from dunia.document import Document
+    from market_crawler.singleflight import Engine
+
+
+@dataclass(slots=True, kw_only=True)
+class Prefetched:
+    content: str
+    engine: Engine | None
+    document: Document | None
+
+
+@dataclass(kw_only=True)
+class Prefetcher:
+    """
+    Load (and parse) the next category page in the background while the products of the current page are being crawled
+
+    The loads go through load_content(), so they wait for the rate limiter of the host, and the load of the page that is still being prefetched is shared with the crawler (see market_crawler.singleflight)
+    """
+
+    max_pages: int = 16
+    tasks: dict[Hashable, asyncio.Task[Prefetched]] = field(
+        init=False, default_factory=dict
+    )
+    prefetched: int = field(init=False, default=0)
+    used: int = field(init=False, default=0)
+    missed: int = field(init=False, default=0)
+    failed: int = field(init=False, default=0)
+
+    def prefetch(
+        self,
+        key: Hashable,
+        load: Callable[[], Awaitable[str]],
+        engine: Engine | None,
+    ) -> None:
+        if key in self.tasks:
+            return
+
+        async def run() -> Prefetched:
+            prefetching.set(True)
+            content = await load()
+            document = (
+                await get_document_cache().parse(content, engine) if engine else None
+            )
+            return Prefetched(content=content, engine=engine, document=document)
+
+        # ? Prefetch of the last page of the category is never used, so the oldest pages are dropped
+        while len(self.tasks) >= self.max_pages:
+            self.tasks.pop(next(iter(self.tasks))).cancel()
+
+        self.prefetched += 1
+        task = self.tasks[key] = asyncio.create_task(run())
+        task.add_done_callback(self.done)
+
+    def done(self, task: asyncio.Task[Prefetched]) -> None:
+        if task.cancelled():
+            return
+
+        if err := task.exception():
+            self.failed += 1
+            debug(f"Prefetch is failed: {err!r}")
+
+    def take(self, key: Hashable) -> str | None:
+        """
+        Content of the prefetched page if it has been loaded
+
+        The page which is still being loaded is left to its prefetch and counted as missed, its load_content() has the same key as the caller's, so the page is loaded once by whichever of them has started first (see market_crawler.singleflight), waiting for it here would deadlock when the prefetch has joined the caller's load
+        """
+        if prefetching.get() or not (task := self.tasks.get(key)):
+            return None
+
+        if not task.done():
+            self.missed += 1
+            return None
+
+        del self.tasks[key]
+        if task.cancelled() or task.exception():
+            return None
+
+        prefetched = task.result()
+        if prefetched.engine:
+            # ? Crawling the products of the current page may take longer than the TTL of the document cache
+            get_document_cache().store(
+                prefetched.content, prefetched.engine, prefetched.document
+            )
+
+        self.used += 1
+        return prefetched.content
+
+    async def close(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+
+        if self.prefetched:
+            text = f"{self.prefetched} pages prefetched | {self.used} used | {self.missed} missed | {self.failed} failed"
+            logger.info(f"Prefetch: {text}")
+            get_run_report().add("Prefetch", text)
+
+
+# ? It is only set inside the prefetch tasks, so that their own load_content() doesn't take the page that they are prefetching
+prefetching: ContextVar[bool] = ContextVar("prefetching", default=False)
+
+# ? Prefetcher of the currently running crawl (if any)
+current_prefetcher: ContextVar[Prefetcher | None] = ContextVar(
+    "current_prefetcher", default=None
+)
+
+
+@asynccontextmanager
+async def use_prefetcher(enabled: bool) -> AsyncIterator[Prefetcher | None]:
+    """
+    Let prefetch_content() load the next category pages in the background inside this context
+
+    If it is not enabled, then prefetch_content() does nothing
+    """
+    if not enabled:
+        yield None
+        return
+
+    prefetcher = Prefetcher()
+    token = current_prefetcher.set(prefetcher)
+    try:
+        yield prefetcher
+    finally:
+        current_prefetcher.reset(token)
+        await prefetcher.close()
@@ -0,0 +1,187 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from market_crawler import error
+from market_crawler.log import logger
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from typing import Final
+
+
+# ? The rate can grow up to this multiple of the configured rate limit (i.e., config.DEFAULT_RATE_LIMIT)
+RATE_LIMIT_HEADROOM: Final = 2.0
+
+# ? Rate limit of the hosts that are first requested without any rate limit (i.e., visit_link()), same as dunia's default
+DEFAULT_RATE_LIMIT: Final = 10
+
+# ? Requests slower than this (in seconds) don't increase the rate
+SLOW_LATENCY: Final = 10.0
+
+
+@dataclass(slots=True, kw_only=True)
+class Request:
+    """
+    Outcome of the request, set the status (if known) so that 429 and 5xx responses slow down the host
+    """
+
+    status: int | None = None
+
+
+@dataclass(kw_only=True)
+class AdaptiveRateLimiter:
+    """
+    Limit the requests per second to a single host, shared by every fetch path (i.e., load_content(), visit_link(), verify_url())
+
+    The rate is adjusted with AIMD (Additive Increase, Multiplicative Decrease):
+        - It is increased by "increase" after every second worth of healthy requests (i.e., no errors and faster than SLOW_LATENCY)
+        - It is multiplied by "decrease" on 429/5xx responses, timeouts or connection errors (at most once per "cooldown" seconds, so that a single burst of errors doesn't drop it to the minimum)
+    """
+
+    host: str
+    rate: float
+    min_rate: float = 0.5
+    max_rate: float
+    increase: float = 1.0
+    decrease: float = 0.5
+    cooldown: float = 1.0
+    next_slot: float = field(init=False, default=0.0)
+    last_backoff: float = field(init=False, default=float("-inf"))
+    healthy_streak: int = field(init=False, default=0)
+    waiting: int = field(init=False, default=0)
+    peak_waiting: int = field(init=False, default=0)
+    waited: float = field(init=False, default=0.0)
+    requests: int = field(init=False, default=0)
+    latency: float = field(init=False, default=0.0)
+    errors: int = field(init=False, default=0)
+    backoffs: int = field(init=False, default=0)
+
+    async def acquire(self) -> None:
+        """
+        Wait for the next free slot, the slots are 1/rate seconds apart
+        """
+        now = monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + 1 / self.rate
+
+        if (delay := slot - now) <= 0:
+            return
+
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+            self.waited += delay
+
+    def record(self, *, latency: float, status: int | None, failed: bool) -> None:
+        self.requests += 1
+        self.latency += latency
+
+        if failed or status == 429 or (status is not None and status >= 500):
+            self.errors += 1
+            self.healthy_streak = 0
+            self.slow_down()
+            return
+
+        if latency >= SLOW_LATENCY:
+            self.healthy_streak = 0
+            return
+
+        self.healthy_streak += 1
+        if self.healthy_streak >= self.rate and self.rate < self.max_rate:
+            self.healthy_streak = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            logger.debug(f"Rate limit of {self.host} is increased to {self.rate:.1f}/s")
+
+    def slow_down(self) -> None:
+        if (now := monotonic()) - self.last_backoff < self.cooldown:
+            return
+
+        self.last_backoff = now
+        self.backoffs += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        # ? Already scheduled slots are not pushed back, only the new requests use the lower rate
+        logger.debug(f"Rate limit of {self.host} is decreased to {self.rate:.1f}/s")
+
+    def __str__(self) -> str:
+        return f"{self.host}: {self.rate:.1f} requests/s (max: {self.max_rate:.1f}) | Waiting: {self.waiting} (peak: {self.peak_waiting}, total wait: {self.waited:.1f}s) | {self.requests} requests (avg latency: {self.latency / self.requests if self.requests else 0:.2f}s) | {self.errors} errors | {self.backoffs} back-offs"
+
+
+# ? Limiters are shared by the whole process (i.e., all the markets run by orchestrate.py), as the limit is about the host and not about the caller
+# ? Every market reports the limiters of the hosts it has requested (see market_crawler.report.RunReport.use())
+rate_limiters: dict[str, AdaptiveRateLimiter] = {}
+
+
+def get_rate_limiter(url: str, rate_limit: float | None) -> AdaptiveRateLimiter:
+    """
+    Get the rate limiter of the url's host, it is created with the given rate limit by the first caller
+    """
+    host = urlparse(url).netloc or url
+    if not (limiter := rate_limiters.get(host)):
+        rate_limit = rate_limit or DEFAULT_RATE_LIMIT
+        limiter = rate_limiters[host] = AdaptiveRateLimiter(
+            host=host,
+            rate=rate_limit,
+            max_rate=rate_limit * RATE_LIMIT_HEADROOM,
+        )
+    get_run_report().use("rate_limiters", host, limiter)
+    return limiter
+
+
+@asynccontextmanager
+async def rate_limited(url: str, rate_limit: float | None) -> AsyncIterator[Request]:
+    """
+    Wait for the url's host rate limiter, and record the latency and the outcome of the request
+
+    Usage:
+        async with rate_limited(url, config.DEFAULT_RATE_LIMIT) as request:
+            async with session.get(url) as response:
+                request.status = response.status
+    """
+    limiter = get_rate_limiter(url, rate_limit)
+    await limiter.acquire()
+
+    request = Request()
+    start_time = monotonic()
+    failed = False
+    try:
+        yield request
+    except (
+        TimeoutError,
+        error.PlaywrightTimeoutError,
+        error.TimeoutException,
+    ):
+        failed = True
+        raise
+    except Exception:
+        # ? Connection errors (i.e., aiohttp.ClientError, connection reset) have no response status, but the host didn't answer either
+        failed = request.status is None
+        raise
+    finally:
+        limiter.record(
+            latency=monotonic() - start_time,
+            status=request.status,
+            failed=failed,
+        )
+
+
+def report_rate_limiters() -> None:
+    for limiter in get_run_report().objects("rate_limiters"):
+        logger.info(f"Rate limiter: {limiter}")
+        get_run_report().add("Rate limiters", str(limiter))
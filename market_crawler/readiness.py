@@ -0,0 +1,191 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+
+from dataclasses import dataclass
+from functools import partial
+from time import perf_counter
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from market_crawler.error import PlaywrightError, TimeoutException
+from market_crawler.log import debug, logger
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Literal
+
+    from dunia.playwright import PlaywrightPage
+
+    type Condition = SelectorPresent | TextNonEmpty
+    type WaitUntil = Literal["commit", "domcontentloaded", "load", "networkidle"]
+
+
+@dataclass(slots=True, frozen=True)
+class SelectorPresent:
+    """
+    Page is ready when the selector is present in the DOM (i.e., product list)
+    """
+
+    selector: str
+
+    async def wait(self, page: PlaywrightPage) -> None:
+        await page.wait_for_selector(self.selector, state="attached")
+
+
+@dataclass(slots=True, frozen=True)
+class TextNonEmpty:
+    """
+    Page is ready when the element of the selector has a non-empty text (i.e., price filled by JavaScript)
+    """
+
+    selector: str
+
+    async def wait(self, page: PlaywrightPage) -> None:
+        await page.wait_for_function(
+            "selector => (document.querySelector(selector)?.textContent ?? '').trim().length > 0",
+            arg=self.selector,
+        )
+
+
+@dataclass(kw_only=True)
+class ReadinessStats:
+    host: str
+    ready: int = 0
+    fallbacks: int = 0
+    measured: int = 0
+    unsettled: int = 0
+    saved: float = 0.0
+
+    def __str__(self) -> str:
+        return f"{self.host}: {self.ready} pages ready before the load state ({self.fallbacks} waited for the load state) | {self.saved:.1f}s saved in {self.measured} measured pages (avg: {self.saved / self.measured if self.measured else 0:.2f}s) | {self.unsettled} pages never settled"
+
+
+# ? Load states that are still awaited in the background to measure the time saved, by the page
+measurements: dict[PlaywrightPage, asyncio.Task[None]] = {}
+
+
+def get_readiness_stats(url: str) -> ReadinessStats:
+    """
+    Statistics of the url's host, every market has its own (see market_crawler.report.RunReport.get_or_create())
+    """
+    host = urlparse(url).netloc or url
+    return get_run_report().get_or_create(
+        "readiness", host, lambda: ReadinessStats(host=host)
+    )
+
+
+async def wait_for_conditions(page: PlaywrightPage, ready: Sequence[Condition]):
+    await asyncio.gather(*(condition.wait(page) for condition in ready))
+
+
+async def wait_until_ready(
+    page: PlaywrightPage,
+    url: str,
+    ready: Sequence[Condition],
+    wait_until: WaitUntil,
+    start_time: float,
+) -> None:
+    """
+    Wait until all the readiness conditions hold, or the page reaches the load state (i.e., "networkidle"), whichever is first
+
+    If the conditions hold first, then the load state is still awaited in the background to log the time saved
+    """
+    stats = get_readiness_stats(url)
+
+    conditions = asyncio.create_task(wait_for_conditions(page, ready))
+    load_state = asyncio.create_task(page.wait_for_load_state(wait_until))
+
+    await asyncio.wait((conditions, load_state), return_when=asyncio.FIRST_COMPLETED)
+
+    if conditions.done() and not conditions.exception():
+        ready_time = perf_counter() - start_time
+        stats.ready += 1
+
+        if load_state.done():
+            # ? Both are finished at the same time, so nothing is saved
+            stats.measured += 1
+            load_state.exception()
+            return
+
+        task = asyncio.create_task(
+            measure_saved_time(load_state, url, wait_until, start_time, ready_time)
+        )
+        measurements[page] = task
+        task.add_done_callback(partial(measurement_done, page, url, load_state))
+        return
+
+    stats.fallbacks += 1
+    if not conditions.done():
+        conditions.cancel()
+    elif err := conditions.exception():
+        debug(f"Readiness conditions are not met ({err}), waiting for {wait_until}")
+
+    try:
+        await load_state
+    except PlaywrightError as err:
+        raise TimeoutException(f"{err}: {url}") from err
+
+
+async def measure_saved_time(
+    load_state: asyncio.Task[None],
+    url: str,
+    wait_until: WaitUntil,
+    start_time: float,
+    ready_time: float,
+) -> None:
+    stats = get_readiness_stats(url)
+
+    try:
+        await load_state
+    except PlaywrightError:
+        # ? Page is closed or navigated to another URL before the load state, or it never settles (i.e., long-polling widgets)
+        stats.unsettled += 1
+        debug(f"Page was ready in {ready_time:.2f}s, {wait_until} never reached: {url}")
+        return
+
+    saved = perf_counter() - start_time - ready_time
+    stats.measured += 1
+    stats.saved += saved
+    debug(
+        f"Page was ready in {ready_time:.2f}s, {wait_until} after {ready_time + saved:.2f}s (saved {saved:.2f}s): {url}"
+    )
+
+
+def measurement_done(
+    page: PlaywrightPage,
+    url: str,
+    load_state: asyncio.Task[None],
+    task: asyncio.Task[None],
+) -> None:
+    if measurements.get(page) is task:
+        del measurements[page]
+
+    if task.cancelled():
+        # ? Load state is cancelled as well if the measurement is cancelled before it awaits the load state
+        load_state.cancel()
+        get_readiness_stats(url).unsettled += 1
+        debug(
+            f"Page was reused before the load state, time saved is not measured: {url}"
+        )
+
+
+def cancel_measurement(page: PlaywrightPage) -> None:
+    """
+    Stop measuring the time saved of the last navigation of the page, it must be called before the page navigates again or is returned to the page pool, otherwise the load state of the next navigation would be measured
+    """
+    if task := measurements.pop(page, None):
+        task.cancel()
+
+
+def report_readiness() -> None:
+    for stats in get_run_report().objects("readiness"):
+        logger.info(f"Readiness: {stats}")
+        get_run_report().add("Readiness", str(stats))
@@ -0,0 +1,119 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from market_crawler.excel import save_series_csv, to_series
+from market_crawler.log import debug, logger
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from market_crawler.data import CrawlData
+
+
+@dataclass(kw_only=True)
+class ProductRegistry:
+    """
+    Products crawled in the current run, keyed by the product ID (or canonical URL, see canonical_url())
+
+    When the same product appears in another category (i.e., subcategories.txt), only the membership row (product name, model name, URL and the new category) is saved instead of visiting the product page again
+
+    Note that the registry is per process, so with --workers the product crawled by another worker process (i.e., its category is in another shard) is crawled again
+    """
+
+    sitename: str
+    products: dict[str, CrawlData] = field(init=False, default_factory=dict)
+    visits_avoided: int = field(init=False, default=0)
+
+    def add(self, key: str, crawl_data: CrawlData) -> None:
+        if key in self.products:
+            return
+
+        # ? Only the fields that identify the product are kept, so that the registry stays small for the whole run
+        self.products[key] = type(crawl_data)(
+            product_name=crawl_data.product_name,
+            model_name=crawl_data.model_name,
+            product_url=crawl_data.product_url,
+        )
+
+    def membership(self, key: str, category_name: str) -> CrawlData | None:
+        if not (crawl_data := self.products.get(key)):
+            return None
+
+        self.visits_avoided += 1
+        return replace(crawl_data, category=category_name)
+
+    def __str__(self) -> str:
+        return f"{self.sitename}: {len(self.products)} products registered | {self.visits_avoided} product page visits avoided"
+
+
+# ? Registries live for the whole run (process), every market has its own, they aren't shared between the worker processes (see --workers)
+product_registries: dict[str, ProductRegistry] = {}
+
+
+def get_product_registry(sitename: str) -> ProductRegistry:
+    if not (registry := product_registries.get(sitename)):
+        registry = product_registries[sitename] = ProductRegistry(sitename=sitename)
+    get_run_report().use("product_registries", sitename, registry)
+    return registry
+
+
+def canonical_url(url: str) -> str:
+    """
+    Product URL without the fragment and with the sorted query parameters, for the markets which don't have the product ID in the URL
+    """
+    parsed = urlparse(url)
+    return urlunparse(
+        parsed._replace(query=urlencode(sorted(parse_qsl(parsed.query))), fragment="")
+    )
+
+
+def register_product(sitename: str, key: str, crawl_data: CrawlData) -> None:
+    """
+    Register the crawled product, the market calls it only if it sets REUSE_DUPLICATE_PRODUCTS in its config.py
+    """
+    get_product_registry(sitename).add(key, crawl_data)
+
+
+async def save_product_membership(
+    *,
+    sitename: str,
+    key: str,
+    category_name: str,
+    filename: str,
+    columns: list[str],
+    column_mapping: dict[str, str],
+) -> bool:
+    """
+    Save the membership row of the product in the category if it has already been crawled under another category in this run
+
+    Return False if the product needs to be crawled (i.e., it isn't registered yet)
+
+    Only the markets which set REUSE_DUPLICATE_PRODUCTS in their config.py call it (i.e., allcap), the same as register_product()
+
+    Note that the product being crawled at the same time under another category isn't registered yet, so it is crawled again
+    """
+    if not (
+        crawl_data := get_product_registry(sitename).membership(key, category_name)
+    ):
+        return False
+
+    await save_series_csv(to_series(crawl_data, column_mapping), columns, filename)
+    debug(f"Product {key} was crawled under another category, membership row saved")
+    return True
+
+
+def report_product_registries(workers: int = 1) -> None:
+    for registry in get_run_report().objects("product_registries"):
+        if registry.products:
+            # ? Products crawled by the other worker processes aren't in the registry (see ProductRegistry)
+            text = f"{registry}{f' | not shared with the other {workers - 1} worker processes' if workers > 1 else ''}"
+            logger.info(f"Product registry: {text}")
+            get_run_report().add("Product registry", text)
@@ -0,0 +1,84 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+    from typing import Any
+
+
+@dataclass(slots=True)
+class RunReport:
+    """
+    Statistics collected while the crawler is running
+
+    They are appended to the report file (i.e., reports/<date>.txt) after the run is finished
+    """
+
+    sections: dict[str, list[str]] = field(default_factory=dict)
+    collectors: list[Callable[[RunReport], None]] = field(default_factory=list)
+    # ? Objects used by this run, keyed by their kind (i.e., "rate_limiters") and then by their key (i.e., host), see use()
+    used: dict[str, dict[Hashable, Any]] = field(default_factory=dict)
+
+    def add(self, section: str, line: str) -> None:
+        self.sections.setdefault(section, []).append(line)
+
+    def add_collector(self, collector: Callable[[RunReport], None]) -> None:
+        """
+        Add the statistics of the objects that live until the end of the run (i.e., browser) when the report is collected
+        """
+        self.collectors.append(collector)
+
+    def use(self, kind: str, key: Hashable, obj: Any) -> None:
+        """
+        Mark the object that is shared by the whole process (i.e., rate limiter of the host) as used by this run, so that only the objects used by the market are in its report (see orchestrate.py)
+        """
+        self.used.setdefault(kind, {})[key] = obj
+
+    def get_or_create[
+        ObjectType
+    ](self, kind: str, key: Hashable, create: Callable[[], ObjectType]) -> ObjectType:
+        """
+        Object that belongs to this run (i.e., statistics of the market), it is created when it's first used by the run and kept until the report is cleared
+        """
+        objects = self.used.setdefault(kind, {})
+        if (obj := objects.get(key)) is None:
+            obj = objects[key] = create()
+        return obj
+
+    def objects(self, kind: str) -> list[Any]:
+        return list(self.used.get(kind, {}).values())
+
+    def collect(self) -> dict[str, list[str]]:
+        while self.collectors:
+            self.collectors.pop(0)(self)
+        return self.sections
+
+    def render(self) -> str:
+        return "\n\n".join(
+            "\n".join([f"{section}:", *(f"  {line}" for line in lines)])
+            for section, lines in self.collect().items()
+        )
+
+    def clear(self) -> None:
+        self.sections.clear()
+        self.collectors.clear()
+        self.used.clear()
+
+
+# ? Every market has its own report when several markets are run in the same process (see orchestrate.py)
+current_run_report: ContextVar[RunReport] = ContextVar(
+    "current_run_report", default=RunReport()
+)
+
+
+def get_run_report() -> RunReport:
+    return current_run_report.get()
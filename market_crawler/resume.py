@@ -0,0 +1,139 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import json
+import os
+
+from glob import glob
+from typing import TYPE_CHECKING
+
+from market_crawler.log import warning
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from typing import Any, Final
+
+
+# ? Manifest in the date directory (i.e., "temp/<date>/") that chains it to the directory of the previous date
+RESUME_MANIFEST: Final = "resume.json"
+
+
+def chain_directory(directory: str, previous_date: str) -> None:
+    """
+    Chain the date directory to the directory of the previous date (i.e., resume), so that the files of the previous date are read through the chain instead of being copied
+
+    Files are never modified through the chain, the files that are written in the date directory shadow the files with the same name in the previous dates (copy-on-write)
+
+    Files that are already hidden in the date directory (see hide_chained_files()) stay hidden
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    hidden = (read_manifest(directory) or {}).get("hidden", [])
+    write_manifest(directory, {"previous": previous_date, "hidden": hidden})
+
+
+def hide_chained_files(directory: str, filenames: Iterable[str]) -> None:
+    """
+    Hide the files of the previous dates of the chain from the date directory (i.e., the files that are merged into a file of the date directory), so that they are not read again through the chain
+
+    The files that are written in the date directory with the same names are not hidden
+    """
+    if not (manifest := read_manifest(directory)):
+        return None
+
+    manifest["hidden"] = sorted({*manifest.get("hidden", []), *filenames})
+    write_manifest(directory, manifest)
+
+
+def read_manifest(directory: str) -> dict[str, Any] | None:
+    if not os.path.exists(manifest := os.path.join(directory, RESUME_MANIFEST)):
+        return None
+
+    try:
+        with open(manifest, encoding="utf-8") as f:
+            content: dict[str, Any] = json.load(f)
+        if not isinstance(content.get("previous"), str):
+            raise KeyError("previous")
+    except (OSError, ValueError, KeyError, AttributeError) as err:
+        warning(f"Resume manifest is not readable ({err}): {manifest}")
+        return None
+
+    return content
+
+
+def write_manifest(directory: str, content: dict[str, Any]) -> None:
+    with open(os.path.join(directory, RESUME_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(content, f)
+
+
+def hidden_files(directory: str) -> set[str]:
+    """
+    Names of the files of the previous dates that are hidden from the date directory (see hide_chained_files())
+    """
+    return set((read_manifest(directory) or {}).get("hidden", []))
+
+
+def chained_directories(directory: str) -> list[str]:
+    """
+    Date directory followed by the directories of the previous dates that it is chained to (see chain_directory())
+    """
+    directories = [directory]
+
+    while manifest := read_manifest(directories[-1]):
+        previous_date: str = manifest["previous"]
+
+        previous = os.path.join(os.path.dirname(directories[-1]), previous_date)
+
+        if previous in directories:
+            warning(
+                f"Resume manifest chains back to {previous}: {os.path.join(directories[-1], RESUME_MANIFEST)}"
+            )
+            break
+
+        if not os.path.isdir(previous):
+            warning(
+                f"Directory of the previous date is deleted, its files are not resumed: {previous}"
+            )
+            break
+
+        directories.append(previous)
+
+    return directories
+
+
+def resolve_file(directory: str, filename: str) -> str | None:
+    """
+    Path of the file (relative to the date directory) in the nearest date of the chain, None if it isn't present in any of them (or it is hidden, see hide_chained_files())
+    """
+    for chained_directory in chained_directories(directory):
+        if os.path.exists(path := os.path.join(chained_directory, filename)):
+            return path
+
+        if filename in hidden_files(chained_directory):
+            return None
+
+    return None
+
+
+def chained_files(directory: str, pattern: str) -> list[str]:
+    """
+    Files that match the pattern in the date directory and the previous dates of the chain, sorted by the file name
+
+    If the same file name is present in several dates, then only the nearest date's file is included, and the files hidden by a date (see hide_chained_files()) are not included from the dates before it
+    """
+    files: dict[str, str] = {}
+    hidden: set[str] = set()
+
+    for chained_directory in chained_directories(directory):
+        for path in glob(os.path.join(chained_directory, pattern)):
+            if (filename := os.path.basename(path)) not in hidden:
+                files.setdefault(filename, path)
+
+        hidden |= hidden_files(chained_directory)
+
+    return [files[filename] for filename in sorted(files)]
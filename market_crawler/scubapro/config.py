@@ -23,6 +23,7 @@ USE_CATEGORY_SAVE_STATES: Final[bool] = (
 )
 
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "호흡기"
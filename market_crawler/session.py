@@ -0,0 +1,217 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from dunia.login import Login
+from dunia.playwright import AsyncPlaywrightBrowser
+from market_crawler.error import PlaywrightError, TimeoutException
+from market_crawler.extraction import fetch_content, parse_document, visit_content
+from market_crawler.log import info, success, warning
+from market_crawler.ratelimit import DEFAULT_RATE_LIMIT
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+    from typing import Any, Final
+
+    import playwright.async_api as playwright
+
+    from dunia.browser import BrowserConfig
+    from dunia.login import LoginInfo
+    from dunia.playwright import PlaywrightBrowser
+
+
+# ? Storage states (cookies and local storage) of the logged in accounts, present in the market's directory (it is ignored by git)
+SESSIONS_DIR: Final = "sessions"
+
+# ? Timeout (in seconds) of the session probe that renders the page
+PROBE_TIMEOUT: Final = 60
+
+# ? Set the local storage of the saved session before any script of the page runs
+LOCAL_STORAGE_SCRIPT: Final = """
+(origins) => {
+    const origin = origins.find((origin) => origin.origin === window.location.origin);
+    if (origin && !window.sessionStorage.getItem("__session_restored__")) {
+        window.sessionStorage.setItem("__session_restored__", "1");
+        for (const { name, value } of origin.localStorage) {
+            window.localStorage.setItem(name, value);
+        }
+    }
+}
+"""
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class SessionProbe:
+    """
+    Cheap authenticated request to check if the saved session is still logged in
+
+    The session is logged in only if the "logged_in_query" (i.e., logout button, "My Page" link) is present in the content of the URL, absence of the login form is not enough, because the error page or the page that renders the login form with JavaScript doesn't have it either
+
+    If the logged in element is rendered with JavaScript, then set "render" so that the URL is visited in the page instead of being fetched
+
+    Markets without the probe log in on every run, and their session is not saved (see log_in())
+    """
+
+    url: str
+    logged_in_query: str
+    render: bool = False
+
+
+def session_file(sitename: str, user_id: str) -> str:
+    """
+    Storage state file of the market's account, the user ID is hashed so that it doesn't appear in the file name
+    """
+    account = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(
+        os.path.dirname(__file__), sitename, SESSIONS_DIR, f"{account}.json"
+    )
+
+
+async def read_session(filepath: str) -> dict[str, Any] | None:
+    if not await asyncio.to_thread(os.path.exists, filepath):
+        return None
+
+    try:
+        with open(filepath, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as err:
+        warning(f"Saved session is not readable ({err}): {filepath}")
+        return None
+
+
+async def save_session(browser: PlaywrightBrowser, filepath: str) -> None:
+    state = await browser.storage_state()
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    # ? Write to the temporary file first, so that the other processes (i.e., tests) never read the half written file
+    temporary_file = f"{filepath}.{os.getpid()}.tmp"
+    with open(temporary_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(temporary_file, filepath)
+
+
+async def restore_session(browser: PlaywrightBrowser, state: dict[str, Any]) -> None:
+    """
+    Add the cookies and the local storage of the saved session to the browser
+
+    Persistent contexts (see dunia.playwright.AsyncPlaywrightBrowser) can't be created with a storage state, so it is added after the creation
+    """
+    if cookies := state.get("cookies"):
+        await browser.add_cookies(cookies)
+
+    if origins := [
+        origin for origin in state.get("origins", []) if origin.get("localStorage")
+    ]:
+        await browser.add_init_script(
+            script=f"({LOCAL_STORAGE_SCRIPT})({json.dumps(origins, ensure_ascii=False)})"
+        )
+
+
+async def is_logged_in(browser: PlaywrightBrowser, probe: SessionProbe) -> bool:
+    """
+    Send the probe request with the cookies of the browser, without opening any page (unless the probe renders the page)
+    """
+    try:
+        if probe.render:
+            content = await visit_content(
+                browser=browser,
+                url=probe.url,
+                wait_until="load",
+                async_timeout=PROBE_TIMEOUT,
+                rate_limit=DEFAULT_RATE_LIMIT,
+            )
+        else:
+            content = await fetch_content(browser, probe.url)
+    except (TimeoutException, PlaywrightError) as err:
+        warning(f"Session probe is failed ({err}): {probe.url}")
+        return False
+
+    if not (document := await parse_document(content, engine="lxml")):
+        return False
+
+    return await document.query_selector(probe.logged_in_query) is not None
+
+
+async def log_in(
+    browser: PlaywrightBrowser,
+    login_info: LoginInfo,
+    *,
+    sitename: str,
+    probe: SessionProbe | None = None,
+    login: Callable[[PlaywrightBrowser], Awaitable[None]] | None = None,
+) -> None:
+    """
+    Reuse the saved session of the market's account if the probe confirms that it is still logged in (see SessionProbe), otherwise log in with dunia's Login (or the market's own "login") and save the session
+
+    It saves the login round trips on every run (and every test fixture), and the risk of the account being locked by repeated logins
+
+    If the market doesn't have the probe, then there is no way to tell the expired session from the valid one, so it always logs in fresh
+    """
+    if not probe:
+        await (login or Login(login_info))(browser)
+        get_run_report().add("Session", f"{sitename}: logged in (no session probe)")
+        return
+
+    filepath = session_file(sitename, login_info.user_id)
+
+    if state := await read_session(filepath):
+        await restore_session(browser, state)
+
+        if await is_logged_in(browser, probe):
+            success(
+                f"Reused the saved session <MAGENTA><w>(ID: {login_info.user_id})</></>"
+            )
+            get_run_report().add("Session", f"{sitename}: saved session reused")
+            return
+
+        info(f"Saved session is expired, logging in again (ID: {login_info.user_id})")
+        await browser.clear_cookies()
+
+    await (login or Login(login_info))(browser)
+
+    if not await is_logged_in(browser, probe):
+        # ? Don't save the session that the probe rejects, otherwise it will be restored and rejected on every run
+        warning(
+            f"Session probe doesn't confirm the login, session is not saved (ID: {login_info.user_id})"
+        )
+        get_run_report().add("Session", f"{sitename}: logged in (session not saved)")
+        return
+
+    await save_session(browser, filepath)
+    get_run_report().add("Session", f"{sitename}: logged in and session saved")
+
+
+async def create_browser(
+    *,
+    browser_config: BrowserConfig,
+    playwright: playwright.Playwright,
+    sitename: str,
+    login_info: LoginInfo | None = None,
+    probe: SessionProbe | None = None,
+    login: Callable[[PlaywrightBrowser], Awaitable[None]] | None = None,
+) -> PlaywrightBrowser:
+    """
+    Create the browser (see dunia.playwright.AsyncPlaywrightBrowser) and log in with the saved session of the market's account if possible (see log_in())
+    """
+    browser = await AsyncPlaywrightBrowser(
+        browser_config=browser_config, playwright=playwright
+    ).create()
+
+    if login_info:
+        await log_in(browser, login_info, sitename=sitename, probe=probe, login=login)
+
+    return browser
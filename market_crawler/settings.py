@@ -22,3 +22,10 @@ class Settings:
     REMOVE_DUPLICATED_DATA: list[str]
     DETAILED_IMAGES_HTML_SOURCE_TOP: str
     DETAILED_IMAGES_HTML_SOURCE_BOTTOM: str
+    # ? Number of processes that crawl the categories of the market, and the index of the current process
+    WORKERS: int = 1
+    WORKER_INDEX: int = 0
+    # ? Format of the temporary files ("csv" or "parquet"), see market_crawler.columnar
+    TEMP_FORMAT: str = "csv"
+    # ? Write the output file in one pass from the temporary files, without loading all of them in memory (see market_crawler.excel.save_streaming_workbook())
+    STREAM_FINALIZE: bool = False
@@ -0,0 +1,409 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import posixpath
+import re
+import shutil
+
+from dataclasses import dataclass, field
+from functools import partial
+from io import BytesIO
+from tempfile import TemporaryFile
+from typing import TYPE_CHECKING
+from xml.etree import ElementTree
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import numpy as np
+import pandas as pd
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+
+if TYPE_CHECKING:
+    from typing import IO, Any, Final
+
+
+# ? Rows are converted to XML in chunks, so that only the XML of one chunk is in memory at a time
+CHUNK_ROWS: Final = 50_000
+
+# ? Worksheet XML of the large output is most of the time spent in compression, and the lowest level is only slightly larger
+COMPRESS_LEVEL: Final = 1
+
+MAIN_NAMESPACE: Final = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIP_ID: Final = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+)
+
+# ? Elements of the worksheet can have a namespace prefix (i.e., <x:sheetData>) when the .xlsx file isn't written by Excel or openpyxl
+SHEET_DATA_RE: Final = re.compile(r"<(?:(\w+):)?sheetData\b([^>]*?)(/?)>")
+SHEET_DATA_END_RE: Final = re.compile(r"</(?:\w+:)?sheetData\s*>")
+ROW_RE: Final = re.compile(
+    r"<(?:\w+:)?row\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?row>)", re.DOTALL
+)
+CELL_RE: Final = re.compile(r"<(?:\w+:)?c\b([^>]*?)(?:/>|>.*?</(?:\w+:)?c>)", re.DOTALL)
+REFERENCE_RE: Final = re.compile(r'\sr="([A-Z]*)(\d*)"')
+STYLE_RE: Final = re.compile(r'\ss="\d+"')
+DIMENSION_RE: Final = re.compile(
+    r'<((?:\w+:)?)dimension ref="([A-Z]+\d+)(?::([A-Z]+)(\d+))?"'
+)
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class TemplateRow:
+    """
+    Row of the template below its header (i.e., pre-formatted row), the appended row of the same number is written into it
+    """
+
+    attributes: str
+    cells: dict[str, str]
+
+    def merge(self, row_number: str, cells: dict[str, str]) -> str:
+        """
+        XML of the row with the cells of the filled columns (letter -> cell XML, empty string for the missing value) written over the template's cells, the styles of the template's cells and the other columns of the template are kept (same as writing the cells into the loaded template)
+        """
+        merged: list[str] = []
+
+        for letter in sorted(
+            self.cells.keys() | cells.keys(), key=column_index_from_string
+        ):
+            if letter not in cells:
+                merged.append(self.cells[letter])
+                continue
+
+            reference = f'<c r="{letter}{row_number}"'
+            style = (
+                match.group()
+                if (match := STYLE_RE.search(self.cells.get(letter, "").split(">")[0]))
+                else ""
+            )
+
+            if cells[letter]:
+                merged.append(reference + style + cells[letter][len(reference) :])
+            elif style:
+                merged.append(f"{reference}{style}/>")
+
+        return f'<row r="{row_number}"{self.attributes}>{"".join(merged)}</row>'
+
+
+@dataclass(slots=True, kw_only=True)
+class SheetTemplate:
+    """
+    Worksheet XML of the template's active worksheet split where the rows are written, the rest of the template (i.e., other worksheets, styles, defined names, merged cells, data validations) is copied as it is (see SheetWriter.save_template())
+    """
+
+    filename: str
+    sheet: str
+    prefix: str
+    rows: dict[int, TemplateRow]
+    suffix: str
+
+    @classmethod
+    def read(cls, filename: str, *, start_row: int = 2) -> SheetTemplate:
+        """
+        Read the active worksheet of the template, its rows above "start_row" (i.e., header) are kept in the prefix and the rows below it are written into by the appended rows
+        """
+        with ZipFile(filename) as source:
+            sheet = active_sheet(source)
+            xml = source.read(sheet).decode()
+
+        head, sheet_data, tail = split_sheet_data(xml, filename=filename)
+
+        header: list[str] = []
+        rows: dict[int, TemplateRow] = {}
+        row_number = 0
+
+        for match in ROW_RE.finditer(sheet_data):
+            attributes, content = match.group(1), match.group(2) or ""
+            reference = REFERENCE_RE.search(attributes)
+            row_number = (
+                int(reference.group(2))
+                if reference and reference.group(2)
+                else row_number + 1
+            )
+
+            if row_number < start_row:
+                header.append(match.group())
+                continue
+
+            cells: dict[str, str] = {}
+            column = 0
+            for cell in CELL_RE.finditer(content):
+                reference = REFERENCE_RE.search(cell.group(1))
+                column = (
+                    column_index_from_string(reference.group(1))
+                    if reference and reference.group(1)
+                    else column + 1
+                )
+                cells[get_column_letter(column)] = cell.group()
+
+            rows[row_number] = TemplateRow(
+                attributes=REFERENCE_RE.sub("", attributes, count=1), cells=cells
+            )
+
+        return cls(
+            filename=filename,
+            sheet=sheet,
+            prefix=f"{head}{''.join(header)}",
+            rows=rows,
+            suffix=tail,
+        )
+
+
+@dataclass(kw_only=True)
+class SheetWriter:
+    """
+    Write the rows of the DataFrames below the header of the write-only workbook by converting the whole columns to the worksheet XML, instead of creating the cells one by one with openpyxl
+
+    The rows are written to a temporary file as they are appended, and the worksheet XML of the workbook (header) is completed with them when it is saved, so the workbook's header, styles, column widths and freeze panes are kept as openpyxl wrote them
+
+    If the template is given (see SheetTemplate), then the rows are written into the template's active worksheet instead, so the whole template (i.e., other worksheets, defined names, merged cells, data validations, row heights) is kept, and the appended rows that fall on the template's pre-formatted rows keep their styles
+
+    Strings are written as inline strings (the illegal characters are removed, the same as finalize() does before saving), numbers and booleans as they are, and the missing values (None, NaN, empty string) as empty cells; unlike openpyxl, strings beginning with "=" are not converted to formulas
+    """
+
+    columns: list[str]
+    filled: set[str]
+    start_row: int = 2
+    template: SheetTemplate | None = None
+    rows: int = field(init=False, default=0)
+    file: IO[bytes] = field(init=False, default_factory=TemporaryFile)
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Append the rows of the DataFrame in the order of the columns, the columns that are not filled (or not present in the DataFrame) are left empty
+        """
+        df = df.reindex(columns=self.columns)
+
+        for start in range(0, len(df), CHUNK_ROWS):
+            self.file.write(self.rows_xml(df.iloc[start : start + CHUNK_ROWS]).encode())
+
+    def rows_xml(self, df: pd.DataFrame) -> str:
+        first_row = self.start_row + self.rows
+        row_numbers = (
+            np.arange(first_row, first_row + len(df)).astype(str).astype(object)
+        )
+
+        cells = [
+            cells_xml(
+                df.iloc[:, position], get_column_letter(position + 1), row_numbers
+            )
+            for position, column in enumerate(self.columns)
+            if column in self.filled
+        ]
+
+        self.rows += len(df)
+
+        rows = [
+            f'<row r="{row_number}">{"".join(row)}</row>'
+            for row_number, *row in zip(row_numbers, *cells)
+        ]
+
+        if self.template:
+            letters = [
+                get_column_letter(position + 1)
+                for position, column in enumerate(self.columns)
+                if column in self.filled
+            ]
+            for row_number, template_row in self.template.rows.items():
+                if first_row <= row_number < first_row + len(df):
+                    idx = row_number - first_row
+                    rows[idx] = template_row.merge(
+                        row_numbers[idx],
+                        {
+                            letter: column_cells[idx]
+                            for letter, column_cells in zip(letters, cells)
+                        },
+                    )
+
+        return "".join(rows)
+
+    def save(self, wb: Any, filename: str) -> None:
+        """
+        Save the workbook (only its worksheet of the header) with the appended rows to the .xlsx file
+        """
+        header = BytesIO()
+        wb.save(header)
+
+        with ZipFile(header) as source:
+            (sheet,) = [
+                name
+                for name in source.namelist()
+                if name.startswith("xl/worksheets/sheet")
+            ]
+            head, sheet_data, tail = split_sheet_data(
+                source.read(sheet).decode(), filename=filename
+            )
+
+        self.write(header, filename, sheet=sheet, prefix=head + sheet_data, suffix=tail)
+
+    def save_template(self, filename: str) -> None:
+        """
+        Save the template (see SheetTemplate) with the appended rows to the .xlsx file, the template's rows below the appended rows are kept after them
+        """
+        assert self.template, "Template is required to save the template"
+
+        last_row = self.start_row + self.rows - 1
+        remaining = "".join(
+            template_row.merge(str(row_number), {})
+            for row_number, template_row in sorted(self.template.rows.items())
+            if row_number > last_row
+        )
+
+        self.write(
+            self.template.filename,
+            filename,
+            sheet=self.template.sheet,
+            prefix=self.template.prefix,
+            suffix=remaining + self.template.suffix,
+        )
+
+    def write(
+        self,
+        source_file: str | IO[bytes],
+        filename: str,
+        *,
+        sheet: str,
+        prefix: str,
+        suffix: str,
+    ) -> None:
+        """
+        Copy the .xlsx file with the appended rows written between the prefix and the suffix of its worksheet
+        """
+        prefix = DIMENSION_RE.sub(
+            partial(extend_dimension, last_row=self.start_row + self.rows - 1),
+            prefix,
+            count=1,
+        )
+
+        with (
+            ZipFile(source_file) as source,
+            ZipFile(
+                filename, "w", ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL
+            ) as output,
+        ):
+            for item in source.infolist():
+                if item.filename != sheet:
+                    output.writestr(item, source.read(item.filename))
+
+            with output.open(sheet, "w", force_zip64=True) as f:
+                f.write(prefix.encode())
+                self.file.seek(0)
+                shutil.copyfileobj(self.file, f)
+                f.write(suffix.encode())
+
+        self.file.close()
+
+
+def cells_xml(values: pd.Series, letter: str, row_numbers: np.ndarray) -> np.ndarray:
+    """
+    XML of the cells of the column (empty string for the missing values)
+    """
+    # ? Empty strings (i.e., template's missing values) are the same as the empty cells
+    present = (values.notna() & (values != "")).to_numpy()
+    cells = np.full(len(values), "", dtype=object)
+
+    if not present.any():
+        return cells
+
+    references = letter + row_numbers[present]
+    values = values[present]
+
+    if pd.api.types.is_bool_dtype(values):
+        text = values.astype(int).astype(str).to_numpy(dtype=object)
+        cells[present] = '<c r="' + references + '" t="b"><v>' + text + "</v></c>"
+    elif pd.api.types.is_numeric_dtype(values):
+        text = values.astype(str).to_numpy(dtype=object)
+        cells[present] = '<c r="' + references + '" t="n"><v>' + text + "</v></c>"
+    else:
+        text = (
+            values.astype(str)
+            .str.replace(ILLEGAL_CHARACTERS_RE, "", regex=True)
+            .str.replace("&", "&amp;", regex=False)
+            .str.replace("<", "&lt;", regex=False)
+            .str.replace(">", "&gt;", regex=False)
+            .to_numpy(dtype=object)
+        )
+        cells[present] = (
+            '<c r="'
+            + references
+            + '" t="inlineStr"><is><t xml:space="preserve">'
+            + text
+            + "</t></is></c>"
+        )
+
+    return cells
+
+
+def split_sheet_data(xml: str, *, filename: str) -> tuple[str, str, str]:
+    """
+    Split the worksheet XML into the part up to the start tag of the <sheetData> element, its rows and the part from its end tag, the rows are appended before the end tag
+
+    The element can have a namespace prefix (i.e., <x:sheetData>), attributes, or no rows at all (i.e., <sheetData/>)
+    """
+    if not (start := SHEET_DATA_RE.search(xml)):
+        raise ValueError(
+            f"Worksheet of '{filename}' has no <sheetData> element to write the rows into"
+        )
+
+    prefix, attributes, empty = start.groups()
+    tag = f"{prefix}:sheetData" if prefix else "sheetData"
+
+    if prefix and "xmlns=" not in attributes:
+        # ? Appended rows are written without the prefix, so they must be in the default namespace of the element
+        namespace = (
+            match.group(1)
+            if (match := re.search(rf'xmlns:{prefix}="([^"]*)"', xml))
+            else MAIN_NAMESPACE
+        )
+        attributes += f' xmlns="{namespace}"'
+
+    head = f"{xml[: start.start()]}<{tag}{attributes}>"
+    if empty:
+        return head, "", f"</{tag}>{xml[start.end() :]}"
+
+    if not (end := SHEET_DATA_END_RE.search(xml, start.end())):
+        raise ValueError(
+            f"Worksheet of '{filename}' has no end tag of its <{tag}> element"
+        )
+
+    return head, xml[start.end() : end.start()], xml[end.start() :]
+
+
+def active_sheet(source: ZipFile) -> str:
+    """
+    Path of the active worksheet (the same one as openpyxl's Workbook.active) in the .xlsx file
+    """
+    namespaces = {"main": MAIN_NAMESPACE}
+    workbook = ElementTree.fromstring(source.read("xl/workbook.xml"))
+
+    view = workbook.find("main:bookViews/main:workbookView", namespaces)
+    active = int(view.get("activeTab", 0)) if view is not None else 0
+    relationship_id = workbook.findall("main:sheets/main:sheet", namespaces)[
+        active
+    ].get(RELATIONSHIP_ID)
+
+    relationships = ElementTree.fromstring(source.read("xl/_rels/workbook.xml.rels"))
+    (target,) = [
+        relationship.get("Target", "")
+        for relationship in relationships
+        if relationship.get("Id") == relationship_id
+    ]
+
+    if target.startswith("/"):
+        return target.removeprefix("/")
+    return posixpath.normpath(posixpath.join("xl", target))
+
+
+def extend_dimension(match: re.Match[str], *, last_row: int) -> str:
+    """
+    Extend the used range of the worksheet (i.e., <dimension ref="A1:D1"/>) to the last appended row
+    """
+    prefix, start, column, row = match.groups()
+    if not column:
+        return match.group()
+    return f'<{prefix}dimension ref="{start}:{column}{max(int(row), last_row)}"'
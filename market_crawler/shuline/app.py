@@ -12,7 +12,6 @@ import shutil
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from functools import cache, singledispatch
-from glob import glob
 from typing import Any, NamedTuple
 from urllib.parse import urljoin
 
@@ -27,21 +26,19 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, parse_document, visit_link
 from dunia.login import LoginInfo
-from dunia.playwright import (
-    AsyncPlaywrightBrowser,
-    PlaywrightBrowser,
-    PlaywrightElementHandle,
-    PlaywrightPage,
-)
+from dunia.playwright import PlaywrightBrowser, PlaywrightElementHandle, PlaywrightPage
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
+from market_crawler.csvwriter import temp_format
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import load_content, parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file
+from market_crawler.resume import chained_files, hide_chained_files
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.shuline import config
 from market_crawler.shuline.data import ShulineCrawlData
@@ -68,6 +65,9 @@ def page_url(*, current_url: str, next_page_no: int) -> str:
 
 
 async def run(settings: Settings):
+    # ? remove_duplicate_with_lower_period() reads the temporary .CSV files
+    temp_format.set("csv")
+
     browser_config = BrowserConfig(
         headless=config.HEADLESS,
         default_navigation_timeout=config.DEFAULT_NAVIGATION_TIMEOUT,
@@ -83,9 +83,12 @@ async def run(settings: Settings):
         login_button_strategy=login_button_strategy,
     )
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
         categories = await get_categories(sitename=config.SITENAME)
 
         log.detail.total_categories(len(categories))
@@ -103,8 +106,9 @@ async def run(settings: Settings):
     remove_duplicate_with_lower_period(settings)
 
 
-def remove_duplicate_with_lower_period(settings: Settings):
-    temp_dir = os.path.join(os.path.dirname(__file__), "temp")
+def remove_duplicate_with_lower_period(
+    settings: Settings, temp_dir: str = os.path.join(os.path.dirname(__file__), "temp")
+):
     final_temporary_file = os.path.join(temp_dir, settings.DATE, "final_temporary.csv")
     backup_dir = os.path.join(temp_dir, settings.DATE, "backup")
 
@@ -121,7 +125,7 @@ def remove_duplicate_with_lower_period(settings: Settings):
         )
         os.remove(os.path.join(temp_dir, settings.DATE, "backup", file))
 
-    crawled_files = glob(os.path.join(temp_dir, settings.DATE, "*.csv"))
+    crawled_files = chained_files(os.path.join(temp_dir, settings.DATE), "*.csv")
 
     with ThreadPoolExecutor(max_workers=len(crawled_files)) as executor:
         results: list[Any] = [
@@ -140,7 +144,19 @@ def remove_duplicate_with_lower_period(settings: Settings):
 
     for file in crawled_files:
         shutil.copy(file, backup_dir)
-        os.remove(file)
+        # ? Files of the previous dates (see market_crawler.resume) are only read
+        if os.path.dirname(file) == os.path.join(temp_dir, settings.DATE):
+            os.remove(file)
+
+    # ? Files of the previous dates are hidden instead of being removed, so that final_temporary.csv is the only temporary file read by finalize() (i.e., the previous date's run was interrupted before this step)
+    hide_chained_files(
+        os.path.join(temp_dir, settings.DATE),
+        [
+            os.path.basename(file)
+            for file in crawled_files
+            if os.path.dirname(file) != os.path.join(temp_dir, settings.DATE)
+        ],
+    )
 
     df = df[df[settings.COLUMN_MAPPING["period"]] != "5/523"]
 
@@ -253,8 +269,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -265,10 +281,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
@@ -0,0 +1,72 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import json
+import os
+
+from pathlib import Path
+
+import pandas as pd
+
+from market_crawler.resume import chain_directory, chained_files
+from market_crawler.settings import Settings
+from market_crawler.shuline.app import remove_duplicate_with_lower_period
+
+
+def settings(date: str) -> Settings:
+    with open(
+        os.path.join(os.path.dirname(__file__), "..", "column_mapping.json"),
+        encoding="utf-8",
+    ) as f:
+        column_mapping: dict[str, str] = json.load(f)
+
+    return Settings(date, True, False, True, [], column_mapping, "", "", [], "", "")
+
+
+def save_rows(
+    filename: Path, column_mapping: dict[str, str], rows: list[tuple[str, str, str]]
+):
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(
+        rows,
+        columns=[
+            column_mapping["product_name"],
+            column_mapping["option1"],
+            column_mapping["period"],
+        ],
+    ).to_csv(filename, index=False)
+
+
+def test_interrupted_previous_date_is_not_counted_twice(tmp_path: Path):
+    today = settings("20240102")
+    column_mapping = today.COLUMN_MAPPING
+
+    # ? Previous date's run was interrupted before remove_duplicate_with_lower_period()
+    save_rows(
+        tmp_path / "20240101" / "bags_1_temporary.csv",
+        column_mapping,
+        [("Bag", "Red", "2024-01-01"), ("Bag", "Blue", "2024-01-01")],
+    )
+    chain_directory(str(tmp_path / "20240102"), "20240101")
+    save_rows(
+        tmp_path / "20240102" / "shoes_1_temporary.csv",
+        column_mapping,
+        [("Shoe", "250", "2024-01-02")],
+    )
+
+    remove_duplicate_with_lower_period(today, temp_dir=str(tmp_path))
+
+    files = chained_files(str(tmp_path / "20240102"), "*_temporary.csv")
+    assert files == [str(tmp_path / "20240102" / "final_temporary.csv")]
+    assert sum(len(pd.read_csv(file)) for file in files) == 3
+
+    # ? Run again on the same date, the inputs are restored from the backup directory
+    remove_duplicate_with_lower_period(today, temp_dir=str(tmp_path))
+
+    files = chained_files(str(tmp_path / "20240102"), "*_temporary.csv")
+    assert files == [str(tmp_path / "20240102" / "final_temporary.csv")]
+    assert sum(len(pd.read_csv(file)) for file in files) == 3
@@ -0,0 +1,175 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import asyncio
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import wraps
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from dunia import extraction
+from market_crawler.log import logger
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+    from typing import Any, Final, Literal
+
+    from dunia.document import Document
+
+    type Engine = Literal["lxml", "modest", "lexbor"]
+
+
+# ? Parsed documents are only needed while the products of the same page are being crawled (i.e., a chunk of products)
+DOCUMENT_CACHE_TTL: Final = 30.0
+DOCUMENT_CACHE_SIZE: Final = 16
+
+
+@dataclass(kw_only=True)
+class SingleFlight:
+    """
+    Share one call between all the concurrent callers with the same key (i.e., every product of the chunk loading the same category page)
+
+    The call runs in its own task, so it isn't cancelled if the caller that started it is cancelled while others are still waiting for it
+    """
+
+    name: str
+    in_flight: dict[Hashable, asyncio.Task[Any]] = field(
+        init=False, default_factory=dict
+    )
+    calls: int = field(init=False, default=0)
+    coalesced: int = field(init=False, default=0)
+
+    async def do[
+        ReturnType
+    ](self, key: Hashable, call: Callable[[], Awaitable[ReturnType]]) -> ReturnType:
+        self.calls += 1
+
+        if task := self.in_flight.get(key):
+            self.coalesced += 1
+        else:
+            task = self.in_flight[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            # ? Retrieve the exception even if every caller is cancelled, so that asyncio doesn't log it
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        return await asyncio.shield(task)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.coalesced} of {self.calls} calls coalesced"
+
+
+@dataclass(kw_only=True)
+class DocumentCache:
+    """
+    Keep the parsed documents for a short time, so that the same content is parsed only once (i.e., category page that is parsed again by every product to pick products[idx])
+
+    The documents are shared between the callers, so they must not be modified
+    """
+
+    ttl: float = DOCUMENT_CACHE_TTL
+    max_size: int = DOCUMENT_CACHE_SIZE
+    documents: OrderedDict[tuple[str, Engine], tuple[float, Document | None]] = field(
+        init=False, default_factory=OrderedDict
+    )
+    flight: SingleFlight = field(
+        init=False, default_factory=lambda: SingleFlight(name="parse_document")
+    )
+    hits: int = field(init=False, default=0)
+    parsed: int = field(init=False, default=0)
+
+    async def parse(self, content: str, engine: Engine) -> Document | None:
+        # ? Strings cache their hash, and the content shared by SingleFlight is the same object for every caller, so the lookup is cheap
+        key = (content, engine)
+        now = monotonic()
+
+        if (cached := self.documents.get(key)) and now - cached[0] < self.ttl:
+            self.hits += 1
+            self.documents.move_to_end(key)
+            return cached[1]
+
+        return await self.flight.do(key, lambda: self.parse_and_store(key))
+
+    async def parse_and_store(self, key: tuple[str, Engine]) -> Document | None:
+        content, engine = key
+        document = await extraction.parse_document(content, engine=engine)
+        self.parsed += 1
+
+        self.store(content, engine, document)
+        return document
+
+    def store(self, content: str, engine: Engine, document: Document | None) -> None:
+        key = (content, engine)
+        now = monotonic()
+        self.documents[key] = (now, document)
+        self.documents.move_to_end(key)
+
+        while self.documents and (
+            len(self.documents) > self.max_size
+            or now - next(iter(self.documents.values()))[0] >= self.ttl
+        ):
+            self.documents.popitem(last=False)
+
+    def __str__(self) -> str:
+        return f"parse_document: {self.parsed} documents parsed | {self.hits} cache hits | {self.flight.coalesced} concurrent parses coalesced"
+
+
+def get_document_cache() -> DocumentCache:
+    """
+    Document cache of the current run, every market has its own (see market_crawler.report.RunReport.get_or_create())
+    """
+    return get_run_report().get_or_create("document_cache", None, DocumentCache)
+
+
+def single_flight[
+    **ParamsType, ReturnType
+](key: Callable[ParamsType, Hashable]) -> Callable[
+    [Callable[ParamsType, Awaitable[ReturnType]]],
+    Callable[ParamsType, Awaitable[ReturnType]],
+]:
+    """
+    Coalesce the concurrent calls of the decorated function which have the same key (see SingleFlight)
+
+    Every market has its own SingleFlight of the function (see market_crawler.report.RunReport.get_or_create()), the keys include the browser anyway, so that different browsers (i.e., logged in) never share the content
+
+    Usage:
+        @single_flight(key=lambda browser, url, **_: (id(browser), url))
+        async def fetch_content(browser, url, ...): ...
+    """
+
+    def decorator(
+        func: Callable[ParamsType, Awaitable[ReturnType]]
+    ) -> Callable[ParamsType, Awaitable[ReturnType]]:
+        name = func.__name__
+
+        @wraps(func)
+        async def wrapper(
+            *args: ParamsType.args, **kwargs: ParamsType.kwargs
+        ) -> ReturnType:
+            flight = get_run_report().get_or_create(
+                "single_flight", name, lambda: SingleFlight(name=name)
+            )
+            return await flight.do(key(*args, **kwargs), lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def report_coalescing() -> None:
+    for flight in get_run_report().objects("single_flight"):
+        if flight.calls:
+            logger.info(f"Single-flight: {flight}")
+            get_run_report().add("Single-flight", str(flight))
+
+    for document_cache in get_run_report().objects("document_cache"):
+        if document_cache.parsed:
+            logger.info(f"Single-flight: {document_cache}")
+            get_run_report().add("Single-flight", str(document_cache))
@@ -26,6 +26,7 @@ USE_CATEGORY_SAVE_STATES: Final[bool] = (
     False  # ? SINUNSHI seems to change their products frequently, so it's better to check the categories everytime
 )
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "과일"
@@ -11,6 +11,9 @@ from typing import Final
 LOGIN_URL: Final[str] = "https://www.sinwoo.com/member/login.htm?gotourl=/index.php?"
 ID: Final[str] = "ID"
 PW: Final[str] = "PW"
+# ? Same page (gotourl of LOGIN_URL) and logout link that login_button_strategy() waits for after the login, the saved session is reused only if the link is present (see market_crawler.session.SessionProbe)
+SESSION_PROBE_URL: Final[str] = "https://www.sinwoo.com/index.php"
+LOGGED_IN_QUERY: Final[str] = "a[href='/member/logout.php']"
 
 HEADLESS: Final[bool] = True
 DEFAULT_NAVIGATION_TIMEOUT: Final[int] = 300000
@@ -24,6 +27,7 @@ MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 15
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "양말＆세트>신사패션(장목)/링크스외"
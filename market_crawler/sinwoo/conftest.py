@@ -15,8 +15,8 @@ from playwright.async_api import async_playwright
 
 from dunia.browser import BrowserConfig
 from dunia.login import LoginInfo
-from dunia.playwright import AsyncPlaywrightBrowser
 from market_crawler.log import info
+from market_crawler.session import SessionProbe, create_browser
 from market_crawler.sinwoo import config
 from market_crawler.sinwoo.app import login_button_strategy
 
@@ -57,9 +57,15 @@ async def browser():
     info("Running browser login fixture (headless) ...")
 
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+            probe=SessionProbe(
+                url=config.SESSION_PROBE_URL, logged_in_query=config.LOGGED_IN_QUERY
+            ),
+        )
 
 
 @pytest.fixture(scope="package")
@@ -80,6 +86,12 @@ async def browser_headed():
     )
     info("Running browser login fixture (headed) ...")
     async with async_playwright() as playwright:
-        yield await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        yield await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+            probe=SessionProbe(
+                url=config.SESSION_PROBE_URL, logged_in_query=config.LOGGED_IN_QUERY
+            ),
+        )
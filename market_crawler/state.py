@@ -5,23 +5,22 @@
 
 from __future__ import annotations
 
-import asyncio
 import os
 import pickle
 
-from contextlib import suppress
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 
-from aiofile import AIOFile
-
+from market_crawler.csvwriter import flush_csv_writers
 from market_crawler.log import debug
+from market_crawler.statestore import get_state_store
 
 
 if TYPE_CHECKING:
     from typing import Self
 
     from market_crawler.config import Config
+    from market_crawler.statestore import StateStore
 
 
 @dataclass(slots=True, kw_only=True)
@@ -31,6 +30,8 @@ class CategoryState:
     date: str
     sitename: str
     done: bool = field(init=False, default=False)
+    # ? Pages crawled out of order by crawl_pages() (see market_crawler.crawling), "pageno" is the first page that isn't crawled yet
+    done_pages: set[int] = field(init=False, default_factory=set)
 
     def __post_init__(self):
         self.name = self.name.replace("/", "_").replace(">", "_").replace(":", "_")
@@ -39,45 +40,38 @@ class CategoryState:
 
     @property
     def directory(self) -> str:
-        return os.path.join(
-            os.path.dirname(__file__), self.sitename, "states", self.date
-        )
-
-    @property
-    def file(self) -> str:
-        return os.path.join(self.directory, f"{self.name}.pkl")
+        return os.path.join(os.path.dirname(__file__), self.sitename, "states")
 
     async def exists(self) -> bool:
-        return await asyncio.to_thread(os.path.exists, self.file)
+        return (
+            get_state_store(self.directory).category_state(self.date, self.name)
+            is not None
+        )
 
     async def load(self) -> Self:
+        if (
+            state := get_state_store(self.directory).category_state(
+                self.date, self.name
+            )
+        ) is None:
+            return self
+
         try:
-            async with AIOFile(self.file, "rb") as f:
-                bytes_ = await f.read_bytes()
-                self = await asyncio.to_thread(pickle.loads, bytes_)
+            self = pickle.loads(state)
 
-        except EOFError as err:
-            debug(f"Category state ({self.file}) load faild: {err}")
+            # ? States saved before "done_pages" was added
+            if not hasattr(self, "done_pages"):
+                self.done_pages = set()
+
+        except (EOFError, pickle.UnpicklingError) as err:
+            debug(f"Category state ({self.date}/{self.name}) load faild: {err}")
 
         return self
 
     async def save(self) -> None:
-        with suppress(FileExistsError):
-            await asyncio.to_thread(
-                os.makedirs,
-                self.directory,
-                exist_ok=True,
-            )
-
-        with suppress(FileNotFoundError):
-            try:
-                async with AIOFile(self.file, "wb") as f:
-                    await f.write(await asyncio.to_thread(pickle.dumps, self))
-            except OSError as err:
-                debug(f"Category state ({self.file}) save faild: {err}")
-                # ? OSError: [Errno 9] Bad file descriptor
-                if err.errno != 9:
-                    raise err from err
+        store = get_state_store(self.directory)
+        store.save_category_state(self.date, self.name, pickle.dumps(self))
+        await commit_states(store)
 
 
 @dataclass(slots=True, kw_only=True)
@@ -97,48 +91,53 @@ class ProductState:
 
     @property
     def directory(self) -> str:
-        return os.path.join(
-            os.path.dirname(__file__),
-            self.sitename,
-            "states",
-            self.date,
-            self.category_name,
-        )
-
-    @property
-    def file(self) -> str:
-        return os.path.join(self.directory, f"{self.productid}.pkl")
+        return os.path.join(os.path.dirname(__file__), self.sitename, "states")
 
     async def exists(self) -> bool:
-        return await asyncio.to_thread(os.path.exists, self.file)
+        return (
+            get_state_store(self.directory).product_state(
+                self.date, self.category_name, self.productid
+            )
+            is not None
+        )
 
     async def load(self) -> Self:
-        try:
-            async with AIOFile(self.file, "rb") as f:
-                bytes_ = await f.read_bytes()
-                self = await asyncio.to_thread(pickle.loads, bytes_)
-        except EOFError as err:
-            debug(f"Product state ({self.file}) load faild: {err}")
-
+        # ? Only "done" is saved, the other fields are the key of the state
+        self.done = bool(
+            get_state_store(self.directory).product_state(
+                self.date, self.category_name, self.productid
+            )
+        )
         return self
 
+    async def is_done(self) -> bool:
+        return self.productid in get_state_store(self.directory).done_products(
+            self.date, self.category_name
+        )
+
     async def save(self) -> None:
-        with suppress(FileExistsError):
-            await asyncio.to_thread(
-                os.makedirs,
-                self.directory,
-                exist_ok=True,
-            )
+        store = get_state_store(self.directory)
+        store.save_product_state(
+            self.date, self.category_name, self.productid, self.done
+        )
+        await commit_states(store)
+
+
+async def commit_states(store: StateStore) -> None:
+    """
+    Commit the saved states when the batch is due, the buffered rows are written first so that a product is never done in the state store without its row in the file (i.e., the program is killed between the two)
+    """
+    if not store.commit_due or not (batch := store.checkpoint()):
+        return
 
-        with suppress(FileNotFoundError):
-            try:
-                async with AIOFile(self.file, "wb") as f:
-                    await f.write(await asyncio.to_thread(pickle.dumps, self))
-            except OSError as err:
-                debug(f"Product state ({self.file}) save faild: {err}")
-                # ? OSError: [Errno 9] Bad file descriptor
-                if err.errno != 9:
-                    raise err from err
+    try:
+        await flush_csv_writers()
+    except BaseException as err:
+        # ? States of the batch are pending again (see StateStore.collect())
+        batch.future.set_exception(err)
+        raise
+
+    store.submit(batch)
 
 
 async def get_category_state(
@@ -216,6 +215,17 @@ async def get_product_state(
         sitename=config.SITENAME,
     )
 
+    # ? Only the set of done product IDs of the category is loaded (once), instead of looking up the state of every product (i.e., resume runs where most of the products are done)
+    if config.PRELOAD_PRODUCT_STATES:
+        if await product_state.is_done():
+            debug(
+                f"Product {product_state.productid} was crawled already, so skipping it."
+            )
+
+            return None
+
+        return product_state
+
     if await product_state.exists():
         product_state = await product_state.load()
 
@@ -0,0 +1,476 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import atexit
+import os
+import pickle
+import sqlite3
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from market_crawler.log import debug, info, logger, warning
+from market_crawler.report import get_run_report
+
+
+if TYPE_CHECKING:
+    from typing import Final
+
+
+# ? Database of all the category and product states of the market, present in the market's "states" directory
+STATE_STORE_FILE: Final = "states.db"
+
+# ? States are committed in batches, the uncommitted states are committed at the exit of the program (or when the run is reported)
+BATCH_SIZE: Final = 200
+COMMIT_INTERVAL: Final = 5.0
+
+# ? Worker processes (see bot.run_workers()) share the database, so the writer waits for the lock instead of failing (it waits in the writer thread, not on the event loop)
+WRITE_TIMEOUT: Final = 60.0
+
+SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS category_states (
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (date, name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS product_states (
+    date TEXT NOT NULL,
+    category_name TEXT NOT NULL,
+    productid TEXT NOT NULL,
+    done INTEGER NOT NULL,
+    PRIMARY KEY (date, category_name, productid)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS migrated_dates (
+    date TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(slots=True, kw_only=True)
+class PendingStates:
+    categories: dict[tuple[str, str], bytes] = field(default_factory=dict)
+    products: dict[tuple[str, str, str], bool] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.categories) + len(self.products)
+
+    def update(self, newer: PendingStates) -> PendingStates:
+        self.categories.update(newer.categories)
+        self.products.update(newer.products)
+        return self
+
+
+@dataclass(slots=True, kw_only=True)
+class Batch:
+    states: PendingStates
+    future: Future[None] = field(default_factory=Future)
+    submitted: bool = False
+
+
+@dataclass(kw_only=True)
+class StateStore:
+    """
+    Category and product states of the market in a single SQLite database (WAL mode), instead of a pickle file per state in "states/<date>/<category>/"
+
+    The lookups are done on the event loop's thread as they only read the primary key index, and the writes are kept in memory and committed in batches (see BATCH_SIZE and COMMIT_INTERVAL) by the writer thread with its own connection, so the event loop never waits for the commit (or for the lock of the other worker processes)
+
+    Pickle directories of the previous runs are migrated to the database when it is opened (only once per date)
+    """
+
+    directory: str
+    batch_size: int = BATCH_SIZE
+    commit_interval: float = COMMIT_INTERVAL
+    connection: sqlite3.Connection = field(init=False)
+    writer: sqlite3.Connection = field(init=False)
+    executor: ThreadPoolExecutor | None = field(init=False, default=None)
+    pending: PendingStates = field(init=False, default_factory=PendingStates)
+    # ? Batches that are being committed by the writer thread, the oldest first
+    committing: deque[Batch] = field(init=False, default_factory=deque)
+    # ? Product IDs that are done, loaded once per category (see done_products())
+    done_product_ids: dict[tuple[str, str], set[str]] = field(
+        init=False, default_factory=dict
+    )
+    last_commit: float = field(init=False, default_factory=monotonic)
+    lookups: int = field(init=False, default=0)
+    writes: int = field(init=False, default=0)
+    commits: int = field(init=False, default=0)
+    migrated: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        filename = os.path.join(self.directory, STATE_STORE_FILE)
+        self.writer = sqlite3.connect(
+            filename, timeout=WRITE_TIMEOUT, check_same_thread=False
+        )
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        # ? Commits in WAL mode are still atomic without fsync, only the last commits may be lost on power failure
+        self.writer.execute("PRAGMA synchronous=NORMAL")
+        self.writer.executescript(SCHEMA)
+
+        # ? Readers of the WAL database don't wait for the writers
+        self.connection = sqlite3.connect(filename, timeout=WRITE_TIMEOUT)
+
+        self.migrate()
+
+    def uncommitted(self) -> list[PendingStates]:
+        """
+        States that are not committed yet, the newest first
+        """
+        self.collect()
+        return [self.pending, *(batch.states for batch in reversed(self.committing))]
+
+    def category_state(self, date: str, name: str) -> bytes | None:
+        self.lookups += 1
+
+        for states in self.uncommitted():
+            if (state := states.categories.get((date, name))) is not None:
+                return state
+
+        row = self.connection.execute(
+            "SELECT state FROM category_states WHERE date = ? AND name = ?",
+            (date, name),
+        ).fetchone()
+        return row[0] if row else None
+
+    def product_state(
+        self, date: str, category_name: str, productid: str
+    ) -> bool | None:
+        """
+        Return None if the state of the product isn't saved, otherwise whether the product is done
+        """
+        self.lookups += 1
+
+        for states in self.uncommitted():
+            if (
+                done := states.products.get((date, category_name, productid))
+            ) is not None:
+                return done
+
+        row = self.connection.execute(
+            "SELECT done FROM product_states WHERE date = ? AND category_name = ? AND productid = ?",
+            (date, category_name, productid),
+        ).fetchone()
+        return bool(row[0]) if row else None
+
+    def done_products(self, date: str, category_name: str) -> set[str]:
+        """
+        Product IDs of the category that are done, it is loaded with one query when the first product of the category is checked, and the products saved afterwards are added to it
+
+        The set must not be modified by the caller
+        """
+        key = (date, category_name)
+
+        if (productids := self.done_product_ids.get(key)) is None:
+            # ? Batches are taken before the query, so the batch committed during the query is still applied
+            uncommitted = self.uncommitted()
+
+            productids = self.done_product_ids[key] = {
+                productid
+                for (productid,) in self.connection.execute(
+                    "SELECT productid FROM product_states WHERE date = ? AND category_name = ? AND done",
+                    key,
+                )
+            }
+
+            # ? States that are not committed yet are newer than the database, so they are applied from the oldest
+            for states in reversed(uncommitted):
+                for (*state_key, productid), done in states.products.items():
+                    if tuple(state_key) != key:
+                        continue
+                    if done:
+                        productids.add(productid)
+                    else:
+                        productids.discard(productid)
+
+        self.lookups += 1
+        return productids
+
+    def save_category_state(self, date: str, name: str, state: bytes) -> None:
+        self.pending.categories[(date, name)] = state
+        self.saved()
+
+    def save_product_state(
+        self, date: str, category_name: str, productid: str, done: bool
+    ) -> None:
+        self.pending.products[(date, category_name, productid)] = done
+
+        if (productids := self.done_product_ids.get((date, category_name))) is not None:
+            if done:
+                productids.add(productid)
+            else:
+                productids.discard(productid)
+
+        self.saved()
+
+    def saved(self) -> None:
+        self.writes += 1
+
+    @property
+    def commit_due(self) -> bool:
+        return (
+            len(self.pending) >= self.batch_size
+            or monotonic() - self.last_commit >= self.commit_interval
+        )
+
+    def checkpoint(self) -> Batch | None:
+        """
+        Take the pending states as the next batch, it is committed when it is submitted (i.e., after the rows of the products are written, see market_crawler.state.commit_states()), and its states are found by the lookups until then
+        """
+        self.last_commit = monotonic()
+        self.collect()
+
+        if not self.pending:
+            return None
+
+        batch = Batch(states=self.pending)
+        self.pending = PendingStates()
+        self.committing.append(batch)
+        return batch
+
+    def submit(self, batch: Batch) -> None:
+        """
+        Commit the batch in the writer thread, it doesn't wait for the commit (see flush())
+        """
+        if not self.executor:
+            self.executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="state-store"
+            )
+
+        batch.submitted = True
+        try:
+            self.executor.submit(self.write, batch)
+        except RuntimeError:
+            # ? Threads can't be started anymore at the exit of the program (see close_state_stores()), so the batch is committed on this thread
+            self.write(batch)
+
+    def commit(self) -> None:
+        """
+        Commit the pending states in the writer thread, it doesn't wait for the commit (see flush())
+        """
+        if batch := self.checkpoint():
+            self.submit(batch)
+
+    def flush(self) -> None:
+        """
+        Commit the pending states and wait until all the submitted batches are committed
+
+        The batches that are not submitted yet are waiting for the rows of their products (see market_crawler.state.commit_states()), they are committed by the coroutine that took them
+        """
+        self.commit()
+
+        for batch in list(self.committing):
+            if batch.submitted:
+                batch.future.exception()
+
+        self.collect()
+
+        # ? States of the failed batches are pending again
+        if self.pending:
+            raise sqlite3.OperationalError(
+                f"States are not committed: {self.directory}"
+            )
+
+    def collect(self) -> None:
+        """
+        Forget the batches that have been committed, the states of the failed batches are pending again (under the newer states)
+        """
+        while self.committing and self.committing[0].future.done():
+            batch = self.committing.popleft()
+
+            if err := batch.future.exception():
+                warning(
+                    f"States are not committed ({err}), they will be committed with the next batch: {self.directory}"
+                )
+                self.pending = batch.states.update(self.pending)
+
+    def write(self, batch: Batch) -> None:
+        try:
+            with self.writer:
+                self.writer.executemany(
+                    "INSERT OR REPLACE INTO category_states VALUES (?, ?, ?)",
+                    ((*key, state) for key, state in batch.states.categories.items()),
+                )
+                self.writer.executemany(
+                    "INSERT OR REPLACE INTO product_states VALUES (?, ?, ?, ?)",
+                    ((*key, done) for key, done in batch.states.products.items()),
+                )
+        except Exception as err:
+            batch.future.set_exception(err)
+        else:
+            self.commits += 1
+            batch.future.set_result(None)
+
+    def delete_date(self, date: str) -> None:
+        self.flush()
+
+        for key in [key for key in self.done_product_ids if key[0] == date]:
+            del self.done_product_ids[key]
+
+        with self.writer:
+            self.writer.execute("DELETE FROM category_states WHERE date = ?", (date,))
+            self.writer.execute("DELETE FROM product_states WHERE date = ?", (date,))
+
+    def copy_date(self, last_date: str, date: str) -> None:
+        """
+        Copy the category states of the last date to the date (i.e., resume), the states that are already saved on the date are kept
+
+        Product states are not copied, same as the "states/<date>/<category>/" directories that were never copied before the state store
+        """
+        self.flush()
+
+        with self.writer:
+            self.writer.execute(
+                "INSERT OR IGNORE INTO category_states SELECT ?, name, state FROM category_states WHERE date = ?",
+                (date, last_date),
+            )
+
+    def migrate(self) -> None:
+        """
+        Import the pickle files of "states/<date>/" (categories) and "states/<date>/<category>/" (products) that were saved before the state store
+        """
+        migrated_dates = {
+            date for (date,) in self.writer.execute("SELECT date FROM migrated_dates")
+        }
+
+        for date in sorted(os.listdir(self.directory)):
+            if date in migrated_dates or not os.path.isdir(
+                os.path.join(self.directory, date)
+            ):
+                continue
+
+            categories, products = read_pickle_states(
+                os.path.join(self.directory, date)
+            )
+
+            # ? States that are already in the database are newer than the pickle files
+            with self.writer:
+                self.writer.executemany(
+                    "INSERT OR IGNORE INTO category_states VALUES (?, ?, ?)",
+                    ((date, name, state) for name, state in categories),
+                )
+                self.writer.executemany(
+                    "INSERT OR IGNORE INTO product_states VALUES (?, ?, ?, ?)",
+                    (
+                        (date, category_name, productid, done)
+                        for category_name, productid, done in products
+                    ),
+                )
+                self.writer.execute(
+                    "INSERT OR IGNORE INTO migrated_dates VALUES (?)", (date,)
+                )
+
+            if categories or products:
+                self.migrated += len(categories) + len(products)
+                info(
+                    f"Migrated {len(categories)} category states and {len(products)} product states of <light-cyan>{date}</> to the state store (pickle files in <light-cyan>{os.path.join(self.directory, date)}</> can be deleted)"
+                )
+
+    def close(self) -> None:
+        # ? Event loop is closed, so the batches that are waiting for the rows of their products are committed now
+        for batch in self.committing:
+            if not batch.submitted:
+                self.submit(batch)
+
+        try:
+            self.flush()
+        except sqlite3.Error as err:
+            warning(f"States are not committed ({err}): {self.directory}")
+
+        if self.executor:
+            self.executor.shutdown()
+        self.connection.close()
+        self.writer.close()
+
+    def __str__(self) -> str:
+        return f"{os.path.basename(os.path.dirname(self.directory))}: {self.lookups} lookups | {self.writes} writes in {self.commits} commits | {self.migrated} states migrated from pickle files"
+
+
+def read_pickle_states(
+    date_dir: str,
+) -> tuple[list[tuple[str, bytes]], list[tuple[str, str, bool]]]:
+    categories: list[tuple[str, bytes]] = []
+    products: list[tuple[str, str, bool]] = []
+
+    for entry in os.scandir(date_dir):
+        if entry.is_file() and entry.name.endswith(".pkl"):
+            with open(entry.path, "rb") as f:
+                state = f.read()
+            if state:
+                categories.append((entry.name.removesuffix(".pkl"), state))
+
+        elif entry.is_dir():
+            for product_entry in os.scandir(entry.path):
+                if not product_entry.name.endswith(".pkl"):
+                    continue
+
+                try:
+                    with open(product_entry.path, "rb") as f:
+                        product_state = pickle.load(f)
+                except (
+                    OSError,
+                    EOFError,
+                    pickle.UnpicklingError,
+                    AttributeError,
+                ) as err:
+                    debug(f"Product state ({product_entry.path}) load faild: {err}")
+                    continue
+
+                products.append(
+                    (
+                        entry.name,
+                        product_entry.name.removesuffix(".pkl"),
+                        bool(getattr(product_state, "done", False)),
+                    )
+                )
+
+    return categories, products
+
+
+# ? Stores are shared by the whole process like the rate limiters (see market_crawler.ratelimit), every market has its own
+state_stores: dict[str, StateStore] = {}
+
+
+def get_state_store(directory: str) -> StateStore:
+    if not (store := state_stores.get(directory)):
+        store = state_stores[directory] = StateStore(directory=directory)
+    get_run_report().use("state_stores", directory, store)
+    return store
+
+
+def close_state_store(directory: str) -> None:
+    if store := state_stores.pop(directory, None):
+        store.close()
+
+
+@atexit.register
+def close_state_stores() -> None:
+    while state_stores:
+        state_stores.popitem()[1].close()
+
+
+def flush_state_stores() -> None:
+    """
+    Commit the states of the stores used by the current run and wait for the commits, it blocks, so it should be run in a thread (i.e., asyncio.to_thread()) while the event loop is running
+    """
+    for store in get_run_report().objects("state_stores"):
+        # ? Store is replaced if it has been closed (i.e., --reset), the closed store has nothing to commit
+        if state_stores.get(store.directory) is store:
+            store.flush()
+
+
+def report_state_stores() -> None:
+    for store in get_run_report().objects("state_stores"):
+        if store.lookups or store.writes or store.migrated:
+            logger.info(f"State store: {store}")
+            get_run_report().add("State store", str(store))
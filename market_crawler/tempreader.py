@@ -0,0 +1,287 @@
+# Author: Danyal Zia Khan
+# Email: danyal6870@gmail.com
+# Copyright (c) 2020-2024 Danyal Zia Khan
+# All rights reserved.
+
+from __future__ import annotations
+
+import codecs
+import csv
+import os
+import pickle
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from io import BytesIO
+from itertools import accumulate
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from market_crawler.log import logger, warning
+from market_crawler.resume import chained_files
+
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Final
+
+
+# ? Temporary .xlsx files are read with calamine (Rust) if python-calamine is installed, it is much faster than openpyxl
+try:
+    import python_calamine  # noqa: F401  # type: ignore
+except ModuleNotFoundError:
+    EXCEL_ENGINE = "openpyxl"
+else:
+    EXCEL_ENGINE = "calamine"
+
+
+# ? Manifest in the date directory (i.e., "temp/<date>/") of the temporary files that are already read, with the table of their rows
+TEMP_MANIFEST: Final = "temp_manifest.pkl"
+
+# ? pandas' C parser releases the GIL while it parses, so the threads parse the files in parallel without the process startup and the pickling of the DataFrames (pyarrow's parser isn't used, it gives error for some data present in DAIWA files)
+MAX_READERS: Final = min(32, (os.cpu_count() or 1) + 4)
+
+# ? Consecutive .CSV files are parsed at once up to this size, so that the large directory is still parsed by several threads
+MAX_BATCH_BYTES: Final = 64 * 1024 * 1024
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    start: int
+    stop: int
+
+
+@dataclass(slots=True)
+class Manifest:
+    files: dict[str, ManifestEntry]
+    table: pd.DataFrame
+
+
+class Batch(NamedTuple):
+    table: pd.DataFrame
+    rows: list[int]
+
+
+def read_temporary_files(
+    directory: str,
+    patterns: Sequence[str] = ("*_temporary.csv", "*_temporary.xlsx"),
+    *,
+    exclude: str = "CUSTOM_URLS",
+) -> list[pd.DataFrame]:
+    """
+    Read the temporary files (through the resume chain, see chained_files()) that match the patterns into a single table, the rows are in the order of the patterns and the file names (same as the concatenated files)
+
+    Consecutive .CSV files with the same header are parsed at once by the threads (instead of thousands of read_csv() calls for the per page files), and the files that haven't changed (same size and modification time) since they were read last time (i.e., generate.py is run again) are taken from the manifest instead of being parsed again
+
+    The table is the only item of the list (empty list if there are no files), so it can be concatenated the same as the DataFrames of the files
+    """
+    filenames = [
+        filename
+        for pattern in patterns
+        for filename in chained_files(directory, pattern)
+        if not exclude or exclude not in filename
+    ]
+    if not filenames:
+        return []
+
+    manifest = load_manifest(directory)
+    stats: dict[str, tuple[int, int]] = {}
+    unchanged: dict[str, ManifestEntry] = {}
+
+    for filename in filenames:
+        stat = os.stat(filename)
+        stats[filename] = (stat.st_size, stat.st_mtime_ns)
+
+        entry = manifest.files.get(filename)
+        if entry and (entry.size, entry.mtime_ns) == stats[filename]:
+            unchanged[filename] = entry
+
+    with ThreadPoolExecutor(max_workers=MAX_READERS) as executor:
+        changed_csv_files = [
+            filename
+            for filename in filenames
+            if filename not in unchanged and filename.endswith(".csv")
+        ]
+        contents = dict(
+            zip(changed_csv_files, executor.map(read_bytes, changed_csv_files))
+        )
+
+        batches = list(
+            executor.map(
+                partial(
+                    read_batch,
+                    unchanged=unchanged,
+                    manifest=manifest,
+                    contents=contents,
+                ),
+                batch_filenames(filenames, unchanged, contents),
+            )
+        )
+
+    table = pd.concat([batch.table for batch in batches], ignore_index=True)
+
+    if len(unchanged) != len(filenames) or len(manifest.files) != len(filenames):
+        rows = [rows for batch in batches for rows in batch.rows]
+        save_manifest(
+            directory,
+            Manifest(
+                files={
+                    filename: ManifestEntry(*stats[filename], stop - count, stop)
+                    for filename, count, stop in zip(
+                        filenames, rows, accumulate(rows), strict=True
+                    )
+                },
+                table=table,
+            ),
+        )
+
+    if unchanged:
+        logger.info(
+            f"Temporary files: {len(unchanged)} of {len(filenames)} files are not changed since they were read last time"
+        )
+
+    return [table]
+
+
+def batch_filenames(
+    filenames: list[str],
+    unchanged: dict[str, ManifestEntry],
+    contents: dict[str, bytes],
+) -> list[list[str]]:
+    """
+    Group the consecutive files that are read together: the unchanged files that are next to each other in the manifest's table, and the changed .CSV files with the same header
+    """
+    batches: list[list[str]] = []
+    size = 0
+
+    for filename in filenames:
+        previous = batches[-1][-1] if batches else ""
+
+        if previous in unchanged and filename in unchanged:
+            same_batch = unchanged[previous].stop == unchanged[filename].start
+        elif previous in contents and filename in contents:
+            same_batch = size + len(contents[filename]) <= MAX_BATCH_BYTES and header(
+                contents[previous]
+            ) == header(contents[filename])
+        else:
+            same_batch = False
+
+        if same_batch:
+            batches[-1].append(filename)
+            size += len(contents.get(filename, b""))
+        else:
+            batches.append([filename])
+            size = len(contents.get(filename, b""))
+
+    return batches
+
+
+def read_batch(
+    filenames: list[str],
+    *,
+    unchanged: dict[str, ManifestEntry],
+    manifest: Manifest,
+    contents: dict[str, bytes],
+) -> Batch:
+    if filenames[0] in unchanged:
+        entries = [unchanged[filename] for filename in filenames]
+        return Batch(
+            manifest.table.iloc[entries[0].start : entries[-1].stop],
+            [entry.stop - entry.start for entry in entries],
+        )
+
+    if filenames[0] in contents:
+        return read_csv_batch(filenames, contents)
+
+    df = read_file(filenames[0])
+    return Batch(df, [len(df)])
+
+
+def read_csv_batch(filenames: list[str], contents: dict[str, bytes]) -> Batch:
+    """
+    Parse the .CSV files with the same header at once, the header lines of the files after the first one are parsed as the rows and they are the boundaries of the files
+    """
+    data = b"".join(
+        content if content.endswith(b"\n") else content + b"\n"
+        for content in (strip_bom(contents[filename]) for filename in filenames)
+    )
+    names = next(csv.reader([header(contents[filenames[0]]).decode("utf-8")]), [])
+
+    try:
+        df = pd.read_csv(BytesIO(data), encoding="utf-8", dtype="str")
+    except pd.errors.EmptyDataError:
+        df = pd.DataFrame()
+
+    boundaries: list[int] = []
+    if names and len(df.columns) == len(names):
+        boundaries = [
+            row
+            for row in np.flatnonzero((df.iloc[:, 0] == names[0]).to_numpy()).tolist()
+            if df.iloc[row].tolist() == names
+        ]
+
+    # ? Empty file (without the header) or the row that is the same as the header, then the files are read one by one
+    if not names or len(boundaries) != len(filenames) - 1:
+        dfs = [read_file(filename) for filename in filenames]
+        return Batch(pd.concat(dfs, ignore_index=True), [len(df) for df in dfs])
+
+    starts = [0, *(row + 1 for row in boundaries)]
+    stops = [*boundaries, len(df)]
+
+    return Batch(
+        df.drop(index=df.index[boundaries]),
+        [stop - start for start, stop in zip(starts, stops)],
+    )
+
+
+def read_file(filename: str) -> pd.DataFrame:
+    try:
+        if filename.endswith(".xlsx"):
+            return pd.read_excel(filename, engine=EXCEL_ENGINE, dtype="str")
+
+        return pd.read_csv(filename, encoding="utf-8-sig", dtype="str")
+    except pd.errors.EmptyDataError:
+        logger.error(
+            f"Data is empty in <light-cyan>{Path(filename).name}</> without any columns"
+        )
+        raise
+
+
+def read_bytes(filename: str) -> bytes:
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def strip_bom(content: bytes) -> bytes:
+    return content.removeprefix(codecs.BOM_UTF8)
+
+
+def header(content: bytes) -> bytes:
+    return strip_bom(content).split(b"\n", 1)[0].rstrip(b"\r")
+
+
+def load_manifest(directory: str) -> Manifest:
+    if os.path.exists(filename := os.path.join(directory, TEMP_MANIFEST)):
+        try:
+            with open(filename, "rb") as f:
+                return pickle.load(f)
+        except Exception as err:
+            warning(
+                f"Manifest of the temporary files is not readable ({err}): {filename}"
+            )
+
+    return Manifest(files={}, table=pd.DataFrame())
+
+
+def save_manifest(directory: str, manifest: Manifest) -> None:
+    filename = os.path.join(directory, TEMP_MANIFEST)
+
+    # ? Manifest is replaced when it is complete, so the interrupted run never leaves the half written manifest
+    with open(f"{filename}.tmp", "wb") as f:
+        pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{filename}.tmp", filename)
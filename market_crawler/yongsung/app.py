@@ -14,7 +14,6 @@ from collections.abc import Iterable
 from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from functools import cache, partial, reduce
-from glob import glob
 from multiprocessing import cpu_count
 from pathlib import Path
 from typing import Any, cast
@@ -27,7 +26,6 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import load_content, load_page, parse_document, visit_link
 from dunia.login import LoginInfo
 from dunia.playwright import (
     AsyncPlaywrightBrowser,
@@ -37,12 +35,21 @@ from dunia.playwright import (
 )
 from market_crawler import error, log
 from market_crawler.bot import copy_dataframe_cells_to_excel_template
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
+from market_crawler.csvwriter import flush_csv_writers
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import (
+    load_content,
+    load_page,
+    parse_document,
+    visit_link,
+)
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.html import CategoryHTML
 from market_crawler.initialization import Category, get_categories
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
+from market_crawler.resume import chained_files
+from market_crawler.session import create_browser
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.yongsung import config
@@ -92,9 +99,12 @@ async def run(settings: Settings):
     )
     login_info = get_login_info()
     async with async_playwright() as playwright:
-        browser = await AsyncPlaywrightBrowser(
-            browser_config=browser_config, playwright=playwright, login_info=login_info
-        ).create()
+        browser = await create_browser(
+            browser_config=browser_config,
+            playwright=playwright,
+            sitename=config.SITENAME,
+            login_info=login_info,
+        )
 
         columns = list(settings.COLUMN_MAPPING.values())
 
@@ -169,10 +179,8 @@ async def run(settings: Settings):
                 page_no=page_no,
             ).replace("_temporary.csv", ".csv")
 
-            for chunk in chunks(
-                range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE
-            ):
-                tasks = (
+            await crawl_products(
+                (
                     extract_product2(
                         idx,
                         browser,
@@ -183,10 +191,10 @@ async def run(settings: Settings):
                         settings,
                         number_of_products,
                     )
-                    for idx in chunk
-                )
-
-                await asyncio.gather(*tasks)
+                    for idx in range(number_of_products)
+                ),
+                chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+            )
 
             log.action.category_page_crawled("DETAIL", page_no)
 
@@ -194,6 +202,7 @@ async def run(settings: Settings):
 
     # ***************************************************************
 
+    await flush_csv_writers()
     process_detail_files(settings)
 
     # ***************************************************************
@@ -205,8 +214,8 @@ async def crawl_urls(
     urls: list[str], browser: PlaywrightBrowser, settings: Settings, columns: list[str]
 ):
     series: list[dict[str, str | int]] = []
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(
                 idx,
                 browser,
@@ -214,10 +223,10 @@ async def crawl_urls(
                 urls[idx],
                 series,
             )
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
     filename: str = temporary_custom_urls_csv_file(
         sitename=config.SITENAME,
@@ -344,9 +353,7 @@ def process_detail_files(settings: Settings):
                 os.path.join(detail_csv_files_dir, filename),
                 encoding="utf-8-sig",
             )
-            for filename in sorted(
-                glob(os.path.join(detail_csv_files_dir, "*_DETAIL*.csv"))
-            )
+            for filename in chained_files(detail_csv_files_dir, "*_DETAIL*.csv")
         ]
 
     df_list = [r.result() for r in results]
@@ -568,8 +575,8 @@ async def crawl(
             page_no=category_state.pageno,
         )
 
-        for chunk in chunks(range(number_of_products), config.MAX_PRODUCTS_CHUNK_SIZE):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -580,10 +587,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
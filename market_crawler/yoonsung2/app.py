@@ -9,7 +9,7 @@ import asyncio
 
 from collections.abc import Iterable
 from contextlib import suppress
-from functools import cache
+from functools import cache, partial
 from urllib.parse import urljoin
 
 from playwright.async_api import Route, async_playwright
@@ -19,7 +19,6 @@ from dunia.browser import BrowserConfig
 from dunia.document import Document
 from dunia.element import Element
 from dunia.error import HTMLParsingError
-from dunia.extraction import parse_document, visit_link
 from dunia.login import LoginInfo
 from dunia.playwright import (
     AsyncPlaywrightBrowser,
@@ -28,12 +27,14 @@ from dunia.playwright import (
     PlaywrightPage,
 )
 from market_crawler import error, log
-from market_crawler.crawling import ConcurrentCrawler, crawl_categories
+from market_crawler.crawling import ConcurrentCrawler, crawl_categories, crawl_products
 from market_crawler.excel import save_series_csv, to_series
-from market_crawler.helpers import chunks, compile_regex, parse_int
+from market_crawler.extraction import parse_document, visit_link
+from market_crawler.helpers import compile_regex, parse_int
 from market_crawler.initialization import Category, get_categories
 from market_crawler.memory import MemoryOptimizer
 from market_crawler.path import temporary_csv_file, temporary_custom_urls_csv_file
+from market_crawler.session import log_in
 from market_crawler.settings import Settings
 from market_crawler.state import CategoryState, get_category_state, get_product_state
 from market_crawler.yoonsung2 import config
@@ -162,7 +163,12 @@ async def run(settings: Settings) -> None:
             playwright=playwright,
         ).create()
 
-        await login(login_info, browser)
+        await log_in(
+            browser,
+            login_info,
+            sitename=config.SITENAME,
+            login=partial(login, login_info),
+        )
 
         columns = list(settings.COLUMN_MAPPING.values())
 
@@ -175,6 +181,7 @@ async def run(settings: Settings) -> None:
                 start_category=config.START_CATEGORY,
                 end_category=config.END_CATEGORY,
                 chunk_size=config.CATEGORIES_CHUNK_SIZE,
+                scheduler=config.CATEGORIES_SCHEDULER,
                 crawl=crawl,
             )
             await crawl_categories(crawler, browser, settings, columns)
@@ -196,13 +203,13 @@ async def crawl_urls(
         date=settings.DATE,
     )
 
-    for chunk in chunks(range(len(urls)), config.MAX_PRODUCTS_CHUNK_SIZE):
-        tasks = (
+    await crawl_products(
+        (
             extract_url(idx, browser, urls[idx], filename, settings, columns)
-            for idx in chunk
-        )
-
-        await asyncio.gather(*tasks)
+            for idx in range(len(urls))
+        ),
+        chunk_size=config.MAX_PRODUCTS_CHUNK_SIZE,
+    )
 
 
 async def extract_url(
@@ -536,8 +543,8 @@ async def crawl(
             browser, category_chunk_size, products_chunk_size
         )
 
-        for chunk in chunks(range(number_of_products), products_chunk_size):
-            tasks = (
+        await crawl_products(
+            (
                 extract_product(
                     idx,
                     browser,
@@ -548,10 +555,10 @@ async def crawl(
                     columns,
                     settings,
                 )
-                for idx in chunk
-            )
-
-            await asyncio.gather(*tasks)
+                for idx in range(number_of_products)
+            ),
+            chunk_size=products_chunk_size,
+        )
 
         log.action.category_page_crawled(category_state.name, category_state.pageno)
 
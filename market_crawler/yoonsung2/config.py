@@ -19,11 +19,13 @@ DEFAULT_ASYNC_TIMEOUT: Final[int] = 600
 DEFAULT_RATE_LIMIT: Final[int] = 20
 
 CATEGORIES_CHUNK_SIZE: Final[int] = 3
+CATEGORIES_SCHEDULER: Final[str] = "queue"
 MIN_PRODUCTS_CHUNK_SIZE: Final[int] = 20
 MAX_PRODUCTS_CHUNK_SIZE: Final[int] = 60
 
 USE_CATEGORY_SAVE_STATES: Final[bool] = True
 USE_PRODUCT_SAVE_STATES: Final[bool] = True
+PRELOAD_PRODUCT_STATES: Final[bool] = False
 SAVE_HTML: Final[bool] = True
 
 START_CATEGORY: Final[str] = "릴"
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import os
+
+from argparse import ArgumentParser
+from datetime import datetime
+from importlib import import_module
+from multiprocessing import freeze_support
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from colorama import init
+
+from market_crawler.bot import configure_logger, run_market
+from market_crawler.excel import get_column_mapping
+from market_crawler.log import error, info, success, warning
+from market_crawler.settings import Settings
+
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from typing import Any
+
+
+def read_markets(args: Namespace) -> list[str]:
+    markets: list[str] = []
+    if args.markets:
+        markets.extend(args.markets.split(","))
+
+    if args.markets_file:
+        markets.extend(Path(args.markets_file).read_text().split())
+
+    # ? Remove duplicate markets (if any) but preserve the order
+    return list(dict.fromkeys(market.strip() for market in markets if market.strip()))
+
+
+def market_settings(config: Any, args: Namespace, date: str) -> Settings:
+    column_mapping_file = os.path.join(
+        os.path.dirname(__file__),
+        "market_crawler",
+        config.SITENAME,
+        args.column_mapping_file,
+    )
+    if not os.path.exists(column_mapping_file):
+        raise FileNotFoundError(column_mapping_file)
+
+    return Settings(
+        date,
+        args.test_mode or False,
+        args.reset or False,
+        args.resume or False,
+        [],
+        get_column_mapping(column_mapping_file),
+        args.template_file or "",
+        f"{config.SITENAME.upper()}_{date}.xlsx",
+        args.remove_duplicated_data.split(",") if args.remove_duplicated_data else [],
+        args.detailed_images_html_source_top or "",
+        args.detailed_images_html_source_bottom or "",
+        TEMP_FORMAT=args.temp_format or "csv",
+        STREAM_FINALIZE=args.stream_finalize or False,
+    )
+
+
+async def run_markets(markets: list[str], args: Namespace, date: str):
+    """
+    Run all the markets in this process, either one after another or concurrently
+
+    At most --browsers markets are crawled at the same time, as every market launches its own browser with the limits (i.e., chunk sizes, rate limit, timeouts) from its own config.py
+    """
+    browsers = asyncio.Semaphore(args.browsers if args.concurrent else 1)
+    log_level = "DEBUG" if args.test_mode else "INFO"
+
+    async def run(market: str):
+        async with browsers:
+            app: Any = import_module(f"market_crawler.{market}.app")
+            config: Any = import_module(f"market_crawler.{market}.config")
+
+            if args.headless:
+                config.HEADLESS = True
+
+            await run_market(
+                getattr(app, "run"),
+                config,
+                market_settings(config, args, date),
+                log_level,
+            )
+
+    results = await asyncio.gather(
+        *(run(market) for market in markets), return_exceptions=True
+    )
+
+    failed = 0
+    for market, result in zip(markets, results):
+        if isinstance(result, BaseException):
+            failed += 1
+            error(f"Market <light-cyan>{market}</> failed: {result}")
+        else:
+            success(f"Market <light-cyan>{market}</> has been crawled")
+
+    return failed
+
+
+if __name__ == "__main__":
+    freeze_support()
+
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--markets",
+        help='Markets that need crawling (separated by ",")',
+        type=str,
+    )
+    parser.add_argument(
+        "--markets_file",
+        help="Markets that need crawling (.txt file, one market per line)",
+        type=str,
+    )
+    parser.add_argument(
+        "--concurrent",
+        help="Run the markets concurrently instead of one after another",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--browsers",
+        help="Maximum number of markets (and therefore browsers) running at the same time in --concurrent mode",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--date",
+        help="Date for output files",
+        type=str,
+    )
+    parser.add_argument(
+        "--headless",
+        help="Headless mode",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--test_mode",
+        help="Test mode",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--reset",
+        help="Remove all the state files, temporary crawled data files, HTML and cache files of today's date",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--resume",
+        help="Resume crawling from the last date",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--column_mapping_file",
+        help="Column Mapping information file (.json file) present in every market directory",
+        type=str,
+        default="column_mapping.json",
+    )
+    parser.add_argument(
+        "--template_file",
+        help="Excel template for the format of crawled data",
+        type=str,
+    )
+    parser.add_argument(
+        "--remove_duplicated_data",
+        help='Remove duplicate data from the output file (data columns are separated by ",")',
+        type=str,
+    )
+    parser.add_argument(
+        "--detailed_images_html_source_top",
+        help="Start of HTML source template",
+        type=str,
+    )
+    parser.add_argument(
+        "--detailed_images_html_source_bottom",
+        help="End of HTML source template",
+        type=str,
+    )
+    parser.add_argument(
+        "--temp_format",
+        help="Format of the temporary crawled data files (parquet needs pyarrow, i.e., poetry install --extras parquet)",
+        choices=["csv", "parquet"],
+        type=str,
+    )
+    parser.add_argument(
+        "--stream_finalize",
+        help="Write the output file in one pass from the temporary files (bounded memory for the large markets)",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    init(autoreset=True)
+
+    if not (markets := read_markets(args)):
+        raise ValueError("Please provide the markets with --markets or --markets_file")
+
+    date = args.date or datetime.now().strftime("%Y%m%d")
+
+    configure_logger(
+        Settings(
+            date, args.test_mode or False, False, False, [], {}, "", "", [], "", ""
+        ),
+        os.path.join(os.path.dirname(__file__), "logs", f"orchestrate_{date}.log"),
+    )
+
+    info(
+        f"Markets: <light-cyan>{', '.join(markets)}</> ({'concurrent' if args.concurrent else 'one after another'})"
+    )
+
+    if failed := asyncio.run(run_markets(markets, args, date)):
+        warning(f"{failed} of {len(markets)} markets have failed")
+        raise SystemExit(1)
+
+    success("All markets have been run successfully")
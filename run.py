@@ -68,6 +68,22 @@ if __name__ == "__main__":
         help="Chunk size for products",
         type=int,
     )
+    parser.add_argument(
+        "--workers",
+        help="Number of processes that crawl the categories (each process has its own browser)",
+        type=int,
+    )
+    parser.add_argument(
+        "--temp_format",
+        help="Format of the temporary crawled data files (parquet needs pyarrow, i.e., poetry install --extras parquet)",
+        choices=["csv", "parquet"],
+        type=str,
+    )
+    parser.add_argument(
+        "--stream_finalize",
+        help="Write the output file in one pass from the temporary files (bounded memory for the large markets)",
+        action="store_true",
+    )
     parser.add_argument(
         "--start_category",
         help="End category",
@@ -115,7 +131,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--remove_duplicated_data",
-        help='Remove duplicate data from the output file (data columns are separated by ",")',
+        help='Remove duplicate data from the output file (data columns are separated by ","), the memory is bounded only with --stream_finalize',
         type=str,
     )
     parser.add_argument(
@@ -279,6 +295,9 @@ if __name__ == "__main__":
                 remove_duplicated_data,
                 detailed_images_html_source_top,
                 detailed_images_html_source_bottom,
+                args.workers or 1,
+                TEMP_FORMAT=args.temp_format or "csv",
+                STREAM_FINALIZE=args.stream_finalize or False,
             ),
         )
 
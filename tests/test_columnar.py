@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from market_crawler.columnar import (
+    TEMPORARY_PARQUET,
+    iter_parquet_segments,
+    read_parquet_segments,
+    temporary_segments,
+    unique_columns,
+)
+from market_crawler.csvwriter import (
+    get_csv_writers,
+    temp_format,
+    use_market_csv_writers,
+    write_row,
+)
+from market_crawler.resume import chain_directory
+
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+COLUMNS = ["productid", "price"]
+
+
+async def crawl(directory: str, pages: dict[int, list[str]]) -> None:
+    """
+    Write the rows of every page as one segment per row, as if the writers were flushed after every product
+    """
+    token = temp_format.set("parquet")
+    try:
+        async with use_market_csv_writers():
+            for page, productids in pages.items():
+                filename = os.path.join(directory, f"products_cat_{page}_temporary.csv")
+                for productid in productids:
+                    await write_row(
+                        {"productid": productid, "price": 1000}, COLUMNS, filename
+                    )
+                    await get_csv_writers()[filename].flush()
+    finally:
+        temp_format.reset(token)
+
+
+def segment_names(directory: str) -> list[str]:
+    return sorted(os.listdir(os.path.join(directory, TEMPORARY_PARQUET)))
+
+
+@pytest.mark.asyncio
+async def test_segments_are_compacted_per_temporary_file(tmp_path: Path):
+    directory = str(tmp_path / "20240101")
+    await crawl(directory, {1: ["1001", "1002", "1003"], 2: ["2001", "2002"]})
+
+    names = segment_names(directory)
+    assert len(names) == 2
+    assert [name.split(".")[0] for name in names] == [
+        "products_cat_1_temporary",
+        "products_cat_2_temporary",
+    ]
+
+    df = read_parquet_segments(temporary_segments(directory))
+    assert df.values.tolist() == [
+        ["1001", "1000"],
+        ["1002", "1000"],
+        ["1003", "1000"],
+        ["2001", "1000"],
+        ["2002", "1000"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_segments_is_same_as_read(tmp_path: Path):
+    directory = str(tmp_path / "20240101")
+    await crawl(directory, {1: ["1001", "1002"], 2: ["2001"]})
+    segments = temporary_segments(directory)
+
+    rows = [row for df in iter_parquet_segments(segments) for row in df.values.tolist()]
+
+    assert rows == read_parquet_segments(segments).values.tolist()
+    assert list(iter_parquet_segments([])) == []
+
+
+def test_compacted_segments_cover_the_leftover_segments(tmp_path: Path):
+    directory = tmp_path / "20240101"
+    (directory / TEMPORARY_PARQUET).mkdir(parents=True)
+
+    # ? Process is killed after the compacted segment (1-2) is renamed, but before the segments are removed
+    for name in [
+        "s.1-1-7",
+        "s.2-2-7",
+        "s.1-2-7",
+        "s.3-3-7",
+        "s.2-2-8",
+        "not_a_segment",
+    ]:
+        (directory / TEMPORARY_PARQUET / f"{name}.parquet").touch()
+
+    assert [os.path.basename(path) for path in temporary_segments(str(directory))] == [
+        "s.1-2-7.parquet",
+        "s.2-2-8.parquet",
+        "s.3-3-7.parquet",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_segments_of_previous_dates_are_read_through_the_chain(tmp_path: Path):
+    previous, directory = str(tmp_path / "20240101"), str(tmp_path / "20240102")
+    await crawl(previous, {1: ["1001"], 2: ["2001"]})
+    await crawl(directory, {2: ["2002"]})
+    chain_directory(directory, "20240101")
+
+    df = read_parquet_segments(temporary_segments(directory))
+
+    # ? Page 2 of the date directory shadows page 2 of the previous date
+    assert df["productid"].tolist() == ["1001", "2002"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_columns_are_read_the_same_as_csv(tmp_path: Path):
+    columns = ["productid", "반품지구분", "반품지구분", "반품지구분"]
+    row = {"productid": "1001", "반품지구분": "0"}
+
+    directory = str(tmp_path / "20240101")
+    token = temp_format.set("parquet")
+    try:
+        async with use_market_csv_writers():
+            await write_row(
+                row, columns, os.path.join(directory, "products_temporary.csv")
+            )
+    finally:
+        temp_format.reset(token)
+
+    async with use_market_csv_writers():
+        await write_row(row, columns, str(tmp_path / "products_temporary.csv"))
+
+    df = read_parquet_segments(temporary_segments(directory))
+    csv = pd.read_csv(tmp_path / "products_temporary.csv", dtype="str")
+
+    assert df.columns.tolist() == csv.columns.tolist()
+    assert df.values.tolist() == csv.values.tolist()
+    assert unique_columns(["a", "a", "a.1", "a"]) == ["a", "a.2", "a.1", "a.3"]
+
+
+@pytest.mark.asyncio
+async def test_prices_are_saved_as_integers_and_read_as_strings(tmp_path: Path):
+    directory = str(tmp_path / "20240101")
+    await crawl(directory, {1: ["1001", "1002"]})
+
+    token = temp_format.set("parquet")
+    try:
+        async with use_market_csv_writers():
+            filename = os.path.join(directory, "products_cat_2_temporary.csv")
+            for price in [2000, "품절"]:
+                await write_row(
+                    {"productid": "2001", "price": price}, COLUMNS, filename
+                )
+                await get_csv_writers()[filename].flush()
+    finally:
+        temp_format.reset(token)
+
+    segments = temporary_segments(directory)
+    assert [pq.read_schema(segment).field("price").type for segment in segments] == [
+        pa.int64(),
+        # ? Compacted segment of a price that isn't a number in one of the batches
+        pa.string(),
+    ]
+
+    df = read_parquet_segments(segments)
+    assert df["price"].tolist() == ["1000", "1000", "2000", "품절"]
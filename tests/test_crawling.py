@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+
+from dataclasses import replace
+
+import pytest
+
+from market_crawler.crawling import (
+    ConcurrentCrawler,
+    WorkerUtilization,
+    count_pages,
+    crawl_categories_queue,
+    crawl_pages,
+    crawl_products,
+    shard_categories,
+    use_product_pool,
+)
+from market_crawler.initialization import Category
+from market_crawler.report import RunReport, current_run_report
+from market_crawler.settings import Settings
+from market_crawler.state import CategoryState
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        DATE="2024-01-01",
+        TEST_MODE=False,
+        RESET=False,
+        RESUME=False,
+        URLS=[],
+        COLUMN_MAPPING={},
+        TEMPLATE_FILE="",
+        OUTPUT_FILE="",
+        REMOVE_DUPLICATED_DATA=[],
+        DETAILED_IMAGES_HTML_SOURCE_TOP="",
+        DETAILED_IMAGES_HTML_SOURCE_BOTTOM="",
+    )
+
+
+@pytest.fixture
+def run_report():
+    report = RunReport()
+    token = current_run_report.set(report)
+    yield report
+    current_run_report.reset(token)
+
+
+def categories(*names: str) -> list[Category]:
+    return [Category(name=name, url=f"https://example.com/{name}") for name in names]
+
+
+@pytest.mark.asyncio
+async def test_queue_workers_pick_next_category_while_slow_one_runs(
+    settings: Settings, run_report: RunReport
+):
+    crawled: list[str] = []
+
+    async def crawl(category: Category, *_: object) -> None:
+        await asyncio.sleep(0.2 if category.name == "slow" else 0.01)
+        crawled.append(category.name)
+
+    await crawl_categories_queue(
+        categories("slow", "a", "b", "c", "d"), 2, crawl, None, settings, []  # type: ignore
+    )
+
+    # ? With the chunks of 2, "b", "c" and "d" would have waited for "slow"
+    assert crawled == ["a", "b", "c", "d", "slow"]
+
+    first, second = run_report.sections["Category workers"]
+    assert first.startswith("Worker # 1: 1 categories")
+    assert second.startswith("Worker # 2: 4 categories")
+
+
+@pytest.mark.asyncio
+async def test_failed_category_is_counted_and_raised(
+    settings: Settings, run_report: RunReport
+):
+    async def crawl(category: Category, *_: object) -> None:
+        if category.name == "broken":
+            raise ValueError("Products not found")
+
+    with pytest.raises(ValueError, match="Products not found"):
+        await crawl_categories_queue(
+            categories("broken"), 1, crawl, None, settings, []  # type: ignore
+        )
+
+
+def test_utilization_is_busy_time_over_elapsed_time():
+    worker = WorkerUtilization(worker=1, categories=3, busy=1.5)
+
+    assert worker.utilization(2.0) == 0.75
+    assert worker.utilization(0.0) == 0.0
+
+
+def test_unknown_scheduler_is_rejected():
+    with pytest.raises(ValueError):
+        ConcurrentCrawler(
+            categories=[],
+            start_category="",
+            end_category="",
+            chunk_size=2,
+            crawl=None,  # type: ignore
+            scheduler="stealing",
+        )
+
+
+@pytest.mark.asyncio
+async def test_product_pool_takes_jobs_of_categories_in_turn(run_report: RunReport):
+    crawled: list[str] = []
+
+    async def product(name: str) -> None:
+        await asyncio.sleep(0)
+        crawled.append(name)
+
+    async with use_product_pool(1):
+        await asyncio.gather(
+            crawl_products((product(f"a{idx}") for idx in range(4)), chunk_size=10),
+            crawl_products((product(f"b{idx}") for idx in range(2)), chunk_size=10),
+        )
+
+    # ? Large category "a" doesn't make "b" wait until all of its products are crawled
+    assert crawled == ["a0", "b0", "a1", "b1", "a2", "a3"]
+    assert run_report.sections["Product pool"] == [
+        "6 products crawled with 1 open pages"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_product_pool_limits_open_pages(run_report: RunReport):
+    open_pages = peak = 0
+
+    async def product() -> None:
+        nonlocal open_pages, peak
+        open_pages += 1
+        peak = max(peak, open_pages)
+        await asyncio.sleep(0.01)
+        open_pages -= 1
+
+    async with use_product_pool(3):
+        await asyncio.gather(
+            *(
+                crawl_products((product() for _ in range(5)), chunk_size=10)
+                for _ in range(4)
+            )
+        )
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_product_pool_raises_error_only_to_its_category(run_report: RunReport):
+    crawled: list[str] = []
+
+    async def product(name: str) -> None:
+        await asyncio.sleep(0)
+        if name == "a1":
+            raise ValueError("Product name not found")
+        crawled.append(name)
+
+    async with use_product_pool(2):
+        results = await asyncio.gather(
+            crawl_products((product(f"a{idx}") for idx in range(3)), chunk_size=10),
+            crawl_products((product(f"b{idx}") for idx in range(3)), chunk_size=10),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[0], ValueError)
+        assert results[1] is None
+        assert {"b0", "b1", "b2"} <= set(crawled)
+
+        # ? Workers of the pool are still alive for the next categories
+        await crawl_products((product(f"c{idx}") for idx in range(2)), chunk_size=10)
+        assert {"c0", "c1"} <= set(crawled)
+
+
+@pytest.mark.asyncio
+async def test_error_of_jobs_generator_is_raised(run_report: RunReport):
+    def jobs():
+        yield asyncio.sleep(0)
+        raise ValueError("Product link not found")
+
+    async with use_product_pool(2):
+        with pytest.raises(ValueError, match="Product link not found"):
+            await crawl_products(jobs(), chunk_size=10)
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_of_failed_category_are_closed(run_report: RunReport):
+    async def product(name: str) -> None:
+        await asyncio.sleep(0)
+        if name == "a0":
+            raise ValueError("Product name not found")
+
+    jobs = [product(f"a{idx}") for idx in range(3)]
+
+    async with use_product_pool(1):
+        with pytest.raises(ValueError, match="Product name not found"):
+            await crawl_products(jobs, chunk_size=10)
+
+    assert [inspect.getcoroutinestate(job) for job in jobs] == [inspect.CORO_CLOSED] * 3
+
+
+@pytest.mark.asyncio
+async def test_product_pool_without_limit_keeps_chunk_size_open_pages_per_category(
+    run_report: RunReport,
+):
+    open_pages: dict[str, int] = {"a": 0, "b": 0}
+    peak: dict[str, int] = {"a": 0, "b": 0}
+    finished: list[str] = []
+
+    async def product(name: str, delay: float) -> None:
+        category = name[0]
+        open_pages[category] += 1
+        peak[category] = max(peak[category], open_pages[category])
+        await asyncio.sleep(delay)
+        open_pages[category] -= 1
+        finished.append(name)
+
+    async with use_product_pool(0):
+        await asyncio.gather(
+            crawl_products(
+                (product(f"a{idx}", 0.1 if idx == 0 else 0.01) for idx in range(6)),
+                chunk_size=2,
+            ),
+            crawl_products(
+                (product(f"b{idx}", 0.01) for idx in range(3)), chunk_size=3
+            ),
+        )
+
+    assert peak == {"a": 2, "b": 3}
+    # ? Slow "a0" doesn't hold back the rest of its chunk, the free page keeps taking the next products
+    assert [name for name in finished if name.startswith("a")][-1] == "a0"
+    assert run_report.sections["Product pool"] == [
+        "9 products crawled with chunk size open pages per category page"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_products_are_crawled_in_chunks_without_pool():
+    open_pages = peak = 0
+
+    async def product() -> None:
+        nonlocal open_pages, peak
+        open_pages += 1
+        peak = max(peak, open_pages)
+        await asyncio.sleep(0.01)
+        open_pages -= 1
+
+    await crawl_products((product() for _ in range(7)), chunk_size=3)
+
+    assert peak == 3
+
+
+def test_every_category_is_crawled_by_exactly_one_worker(settings: Settings):
+    names = [f"category{idx}" for idx in range(10)]
+
+    shards = [
+        [
+            category.name
+            for category in shard_categories(
+                categories(*names), replace(settings, WORKERS=3, WORKER_INDEX=index)
+            )
+        ]
+        for index in range(3)
+    ]
+
+    # ? Round-robin, so that the large neighbouring categories go to different workers
+    assert shards == [
+        ["category0", "category3", "category6", "category9"],
+        ["category1", "category4", "category7"],
+        ["category2", "category5", "category8"],
+    ]
+
+
+def test_single_worker_crawls_every_category(settings: Settings):
+    all_categories = categories("a", "b", "c")
+
+    assert shard_categories(all_categories, settings) == all_categories
+
+
+def category_state(
+    pageno: int = 1, done_pages: set[int] | None = None
+) -> CategoryState:
+    state = CategoryState(
+        name="bags", pageno=pageno, date="2024-01-01", sitename="tests"
+    )
+    state.done_pages = done_pages or set()
+    return state
+
+
+@pytest.mark.asyncio
+async def test_resumed_concurrent_pages_skip_the_done_pages():
+    crawled: list[int] = []
+    open_pages = peak = 0
+
+    async def crawl_page(state: CategoryState) -> int:
+        nonlocal open_pages, peak
+        open_pages += 1
+        peak = max(peak, open_pages)
+        await asyncio.sleep(0.01)
+        crawled.append(state.pageno)
+        open_pages -= 1
+        return 20
+
+    async def total_pages() -> int:
+        return 6
+
+    # ? Previous run crawled page 1 and 2 in order, and page 4 out of order
+    state = category_state(pageno=3, done_pages={4})
+    await crawl_pages(
+        state,
+        crawl_page,
+        total_pages=total_pages,
+        max_concurrent_pages=2,
+        save_states=False,
+    )
+
+    assert sorted(crawled) == [3, 5, 6]
+    assert peak == 2
+    assert (state.pageno, state.done_pages, state.done) == (7, set(), True)
+
+
+@pytest.mark.asyncio
+async def test_pages_are_crawled_one_by_one_until_empty_page_when_total_is_unknown():
+    crawled: list[int] = []
+
+    async def crawl_page(state: CategoryState) -> int:
+        crawled.append(state.pageno)
+        return 0 if state.pageno == 4 else 20
+
+    state = category_state(done_pages={2})
+    await crawl_pages(state, crawl_page, max_concurrent_pages=4, save_states=False)
+
+    assert crawled == [1, 3, 4]
+    assert (state.pageno, state.done) == (4, True)
+
+
+@pytest.mark.asyncio
+async def test_pages_are_counted_from_total_products():
+    async def total_products() -> int:
+        return 41
+
+    async def unknown() -> None:
+        return None
+
+    assert await count_pages(None, total_products, 20) == 3
+    assert await count_pages(unknown, total_products, 20) == 3
+    assert await count_pages(None, total_products, None) is None
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import os
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from market_crawler import csvwriter
+from market_crawler.csvwriter import (
+    get_csv_writers,
+    use_market_csv_writers,
+    write_row,
+)
+from market_crawler.state import commit_states
+from market_crawler.statestore import StateStore
+
+
+COLUMNS = ["productid", "price"]
+
+
+def rows(filename: str) -> list[list[str]]:
+    if not os.path.exists(filename):
+        return []
+    return pd.read_csv(
+        filename, encoding="utf-8-sig", dtype="str", keep_default_na=False
+    ).values.tolist()
+
+
+@pytest.mark.asyncio
+async def test_rows_are_written_when_the_writers_are_closed(tmp_path: Path):
+    filename = str(tmp_path / "products_temporary.csv")
+
+    async with use_market_csv_writers():
+        await write_row({"productid": "1001", "price": 1000}, COLUMNS, filename)
+        await write_row({"productid": "1002"}, COLUMNS, filename)
+
+    assert rows(filename) == [["1001", "1000"], ["1002", ""]]
+
+
+@pytest.mark.asyncio
+async def test_markets_only_close_their_own_writers(tmp_path: Path):
+    closed = asyncio.Event()
+
+    async def market(name: str, *, wait: bool) -> list[str]:
+        async with use_market_csv_writers():
+            await write_row(
+                {"productid": name}, COLUMNS, str(tmp_path / f"{name}_temporary.csv")
+            )
+            if wait:
+                await closed.wait()
+            filenames = [os.path.basename(key) for key in get_csv_writers()]
+        closed.set()
+        return filenames
+
+    # ? Market "a" is closed first, the writer of "b" is still open (see orchestrate.py --concurrent)
+    b_writers, a_writers = await asyncio.gather(
+        market("b", wait=True), market("a", wait=False)
+    )
+
+    assert a_writers == ["a_temporary.csv"]
+    assert b_writers == ["b_temporary.csv"]
+    assert rows(str(tmp_path / "a_temporary.csv")) == [["a", ""]]
+    assert rows(str(tmp_path / "b_temporary.csv")) == [["b", ""]]
+    assert csvwriter.open_csv_writers == [csvwriter.csv_writers]
+
+
+@pytest.mark.asyncio
+async def test_idle_writer_task_exits_and_restarts_on_next_row(tmp_path: Path):
+    filename = str(tmp_path / "products_temporary.csv")
+
+    async with use_market_csv_writers() as writers:
+        await write_row({"productid": "1001", "price": 1000}, COLUMNS, filename)
+        writer = writers[filename]
+        writer.flush_interval = 0.01
+        writer.wakeup.set()
+
+        await asyncio.wait_for(writer.task, 1)  # type: ignore
+        assert rows(filename) == [["1001", "1000"]]
+
+        await write_row({"productid": "1002", "price": 2000}, COLUMNS, filename)
+        assert writer.task and not writer.task.done()
+
+    assert rows(filename) == [["1001", "1000"], ["1002", "2000"]]
+
+
+@pytest.mark.asyncio
+async def test_rows_are_written_before_states_are_committed(tmp_path: Path):
+    filename = str(tmp_path / "products_temporary.csv")
+    store = StateStore(directory=str(tmp_path / "states"), batch_size=1)
+
+    try:
+        async with use_market_csv_writers():
+            await write_row({"productid": "1001", "price": 1000}, COLUMNS, filename)
+            store.save_product_state("20240101", "bags", "1001", True)
+
+            assert rows(filename) == []
+            await commit_states(store)
+            assert rows(filename) == [["1001", "1000"]]
+
+            store.flush()
+            assert store.commits == 1
+    finally:
+        store.close()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_crawler.deduplication import RowDeduplicator
+
+
+COMPARE_COLS = ["상품명", "옵션1", "판매가"]
+
+
+def dataframes() -> list[pd.DataFrame]:
+    """
+    Temporary files with the duplicates in the same file and across the files, and the missing values as NaN (.CSV files) and None (Parquet segments)
+    """
+    return [
+        pd.DataFrame(
+            {
+                "상품명": ["A", "A", "B", "C", np.nan],
+                "옵션1": ["red", "red", "red", np.nan, "red"],
+                "판매가": ["1000", "1000", "2000", "3000", "4000"],
+                "카테고리": ["bags", "bags", "bags", "bags", "bags"],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "상품명": ["A", "A", "C", None, "D"],
+                "옵션1": ["red", "blue", None, "red", "red"],
+                "판매가": ["1000", "1000", "3000", "4000", "5000"],
+                "카테고리": ["hats", "hats", "hats", "hats", "hats"],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "상품명": ["D", "E"],
+                "판매가": ["5000", "6000"],
+                "카테고리": ["shoes", "shoes"],
+            }
+        ),
+    ]
+
+
+def expected(dfs: list[pd.DataFrame], compare_cols: list[str]) -> pd.DataFrame:
+    df = pd.concat(dfs, ignore_index=True)
+
+    # ? Missing columns of the file are missing values of its rows, same as the concatenated DataFrame
+    keys = df.reindex(columns=compare_cols)
+    keys = keys.where(keys.notna(), None)
+
+    return df[~keys.duplicated()]
+
+
+@pytest.mark.parametrize(
+    "compare_cols", [COMPARE_COLS, ["상품명"], ["상품명", "없는 컬럼"]]
+)
+def test_same_as_drop_duplicates(compare_cols: list[str]):
+    dfs = dataframes()
+    deduplicator = RowDeduplicator(compare_cols=compare_cols, category_col="카테고리")
+
+    result = pd.concat(
+        [deduplicator.drop_duplicates(df) for df in dfs], ignore_index=True
+    )
+    concatenated = expected(dfs, compare_cols).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(result, concatenated)
+    assert deduplicator.removed == sum(len(df) for df in dfs) - len(concatenated)
+
+
+def test_duplicates_are_counted_by_category():
+    deduplicator = RowDeduplicator(compare_cols=COMPARE_COLS, category_col="카테고리")
+    for df in dataframes():
+        deduplicator.drop_duplicates(df)
+
+    assert deduplicator.duplicates == {"bags": 1, "hats": 3}
+
+
+def test_duplicates_without_category_column():
+    deduplicator = RowDeduplicator(compare_cols=COMPARE_COLS, category_col="")
+    df = dataframes()[0]
+
+    assert len(deduplicator.drop_duplicates(df)) == 4
+    assert deduplicator.duplicates == {"": 1}
+
+
+def test_columns_with_the_same_name():
+    df = pd.DataFrame(
+        [["A", "1000", "x"], ["A", "1000", "y"], ["A", "2000", "x"]],
+        columns=["상품명", "판매가", "판매가"],
+    )
+    deduplicator = RowDeduplicator(compare_cols=["상품명", "판매가"])
+
+    # ? First column with the name is compared (see column_mapping.json)
+    assert deduplicator.drop_duplicates(df).values.tolist() == [
+        ["A", "1000", "x"],
+        ["A", "2000", "x"],
+    ]
+
+
+def test_frame_without_duplicates_is_returned_as_is():
+    deduplicator = RowDeduplicator(compare_cols=COMPARE_COLS)
+    df = dataframes()[2]
+
+    assert deduplicator.drop_duplicates(df) is df
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from market_crawler.excel import (
+    MAX_REPORTED_ROWS,
+    clean_template_rows,
+    copy_to_openpyxl_template,
+    remove_illegal_characters,
+    report_illegal_characters,
+)
+from market_crawler.report import RunReport, current_run_report
+
+
+@pytest.fixture
+def run_report():
+    report = RunReport()
+    token = current_run_report.set(report)
+    yield report
+    current_run_report.reset(token)
+
+
+def test_illegal_characters_are_removed_and_their_rows_are_returned():
+    df = pd.DataFrame(
+        {
+            "상품명": ["A\x00B", "C", None, "\x1f"],
+            "판매가": [1000, 2000, 3000, 4000],
+            "품절": [None, None, None, None],
+            "메모": ["memo", "memo\x0b", "memo", "memo"],
+        }
+    )
+
+    cleaned_df, cleaned = remove_illegal_characters(df, first_row=5)
+
+    assert cleaned_df["상품명"].tolist() == ["AB", "C", None, ""]
+    assert cleaned_df["메모"].tolist() == ["memo"] * 4
+    assert cleaned_df["판매가"].tolist() == [1000, 2000, 3000, 4000]
+
+    # ? Rows as numbered in the worksheet, i.e., the first row of the DataFrame is "first_row"
+    assert cleaned == {"상품명": [5, 8], "메모": [6]}
+
+    # ? DataFrame of the caller isn't modified
+    assert df["상품명"].tolist() == ["A\x00B", "C", None, "\x1f"]
+
+
+def test_dataframe_without_illegal_characters_is_not_copied():
+    df = pd.DataFrame({"상품명": ["A", "B"], "판매가": [1000, 2000]})
+
+    cleaned_df, cleaned = remove_illegal_characters(df)
+
+    assert cleaned_df is df
+    assert cleaned == {}
+
+
+def test_cleaned_rows_are_reported(run_report: RunReport):
+    rows = list(range(2, MAX_REPORTED_ROWS + 4))
+
+    report_illegal_characters({"상품명": [2, 5], "메모": rows})
+
+    assert run_report.sections["Illegal characters"] == [
+        "상품명: 2 rows (2, 5)",
+        f"메모: {len(rows)} rows ({', '.join(map(str, rows[:MAX_REPORTED_ROWS]))}, ...)",
+    ]
+
+
+COLUMNS = ["상품명", "판매가", "품절", "메모"]
+
+COLUMN_MAPPING = {
+    "product_name": "상품명",
+    "price": "판매가",
+    "sold_out": "품절",
+    "memo": "메모",
+}
+
+
+def save_template(filename: str) -> None:
+    wb = Workbook()
+    ws = wb.active
+    assert ws
+
+    for idx, column in enumerate(COLUMNS, start=1):
+        cell = ws.cell(row=1, column=idx, value=column)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill("solid", fgColor="DDEBF7")
+        ws.column_dimensions[get_column_letter(idx)].width = 10 + idx
+
+    ws.freeze_panes = "A2"
+    wb.save(filename)
+
+
+def save_full_template(filename: str) -> None:
+    """
+    Template with a guide worksheet before the active one, defined name, merged cells, data validation, row heights and pre-formatted rows below the header
+    """
+    save_template(filename)
+
+    wb = load_workbook(filename)
+    ws = wb.active
+    assert ws
+    ws.title = "상품"
+
+    guide = wb.create_sheet("안내", 0)
+    guide["A1"] = "품절 여부는 Y/N 으로 입력"
+    guide["A2"] = "Y"
+    guide["A3"] = "N"
+    guide.merge_cells("A1:C1")
+    wb.defined_names["품절값"] = DefinedName("품절값", attr_text="안내!$A$2:$A$3")
+
+    ws.merge_cells("F1:G1")
+    ws["F1"] = "비고"
+    validation = DataValidation(type="list", formula1="=품절값")
+    ws.add_data_validation(validation)
+    validation.add("C2:C1000")
+
+    # ? Rows 2 and 3 are pre-formatted, row 3 is below the written rows and has an example in the column that is not crawled
+    for row in (2, 3, 6):
+        ws.row_dimensions[row].height = 24
+        for column in range(1, len(COLUMNS) + 1):
+            ws.cell(row=row, column=column).fill = PatternFill(
+                "solid", fgColor="FFF2CC"
+            )
+    ws["D2"] = "예시"
+    ws["A6"] = "합계"
+
+    wb.active = 1
+    wb.save(filename)
+
+
+def copy_cell_by_cell(
+    *,
+    df: pd.DataFrame,
+    output_file: str,
+    template_file: str,
+    crawl_data: SimpleNamespace,
+) -> None:
+    """
+    Previous copy_to_openpyxl_template(): every mapped column is written into the loaded template cell by cell (see excelsheet.write_to_excel_template_cell_openpyxl())
+    """
+    wb = load_workbook(template_file)
+    ws = wb.active
+    assert ws
+
+    for attr, data in vars(crawl_data).items():
+        if data is None:
+            continue
+        column = COLUMN_MAPPING[attr]
+        letter = get_column_letter(COLUMNS.index(column) + 1)
+        for row, value in enumerate(df[column], start=2):
+            ws[f"{letter}{row}"] = value
+
+    wb.save(output_file.replace(".csv", ".xlsx"))
+
+
+def test_only_whole_missing_value_cells_are_cleaned_for_template():
+    df = pd.DataFrame(
+        {
+            "상품명": ["Banana", "None", None, "Nonesuch"],
+            "판매가": ["nan", "NaN", "1000", None],
+        }
+    )
+
+    cleaned_df = clean_template_rows(df, COLUMN_MAPPING)
+
+    assert cleaned_df.values.tolist() == [
+        ["Banana", ""],
+        ["", ""],
+        ["Nonesuch", ""],
+    ]
+
+
+def test_template_rows_match_cell_by_cell_copy(tmp_path: Path):
+    template_file = str(tmp_path / "template.xlsx")
+    save_template(template_file)
+
+    # ? Template's DataFrame is read as strings and its missing values are empty strings (see copy_dataframe_cells_to_excel_template())
+    df = pd.DataFrame(
+        {
+            "상품명": ["가방 A & <B>", 'Shoes "C"', "  공백  ", "D"],
+            "판매가": ["10,000", "2000.50", "", "0"],
+            "품절": ["품절", "", "", ""],
+            "메모": ["memo", "memo", "memo", "memo"],
+        }
+    )
+    # ? "memo" isn't crawled, so its column is left empty
+    crawl_data = SimpleNamespace(product_name="", price="", sold_out="", memo=None)
+
+    copy_cell_by_cell(
+        df=df,
+        output_file=str(tmp_path / "baseline.csv"),
+        template_file=template_file,
+        crawl_data=crawl_data,
+    )
+    copy_to_openpyxl_template(
+        df=df,
+        output_file=str(tmp_path / "output.csv"),
+        template_file=template_file,
+        column_mapping=COLUMN_MAPPING,
+        crawl_data=crawl_data,  # type: ignore
+    )
+
+    baseline = load_workbook(tmp_path / "baseline.xlsx").active
+    output = load_workbook(tmp_path / "output.xlsx").active
+    assert baseline and output
+
+    assert list(output.iter_rows(values_only=True)) == list(
+        baseline.iter_rows(values_only=True)
+    )
+
+    for baseline_cell, output_cell in zip(baseline[1], output[1]):
+        assert output_cell.font.b == baseline_cell.font.b
+        assert output_cell.fill.fgColor.rgb == baseline_cell.fill.fgColor.rgb
+
+    assert output.freeze_panes == baseline.freeze_panes
+    for letter in "ABCD":
+        assert (
+            output.column_dimensions[letter].width
+            == baseline.column_dimensions[letter].width
+        )
+
+
+def test_template_features_are_kept(tmp_path: Path):
+    template_file = str(tmp_path / "template.xlsx")
+    save_full_template(template_file)
+
+    df = pd.DataFrame(
+        {
+            "상품명": ["A", "B", "C"],
+            "판매가": ["1000", "", "3000"],
+            "품절": ["", "Y", ""],
+            "메모": ["memo", "memo", "memo"],
+        }
+    )
+    crawl_data = SimpleNamespace(product_name="", price="", sold_out="", memo=None)
+
+    copy_cell_by_cell(
+        df=df,
+        output_file=str(tmp_path / "baseline.csv"),
+        template_file=template_file,
+        crawl_data=crawl_data,
+    )
+    copy_to_openpyxl_template(
+        df=df,
+        output_file=str(tmp_path / "output.csv"),
+        template_file=template_file,
+        column_mapping=COLUMN_MAPPING,
+        crawl_data=crawl_data,  # type: ignore
+    )
+
+    baseline = load_workbook(tmp_path / "baseline.xlsx")
+    output = load_workbook(tmp_path / "output.xlsx")
+
+    assert output.sheetnames == baseline.sheetnames == ["안내", "상품"]
+    assert list(output.defined_names) == list(baseline.defined_names) == ["품절값"]
+
+    for name in output.sheetnames:
+        baseline_ws, output_ws = baseline[name], output[name]
+
+        assert list(output_ws.iter_rows(values_only=True)) == list(
+            baseline_ws.iter_rows(values_only=True)
+        )
+        assert set(map(str, output_ws.merged_cells.ranges)) == set(
+            map(str, baseline_ws.merged_cells.ranges)
+        )
+
+        for baseline_row, output_row in zip(
+            baseline_ws.iter_rows(), output_ws.iter_rows()
+        ):
+            for baseline_cell, output_cell in zip(baseline_row, output_row):
+                assert output_cell.fill.fgColor.rgb == baseline_cell.fill.fgColor.rgb
+
+    ws = output["상품"]
+    assert output.active.title == "상품"  # type: ignore
+    assert [
+        str(validation.sqref) for validation in ws.data_validations.dataValidation
+    ] == ["C2:C1000"]
+    assert {row: ws.row_dimensions[row].height for row in (2, 3, 4, 6)} == {
+        row: baseline["상품"].row_dimensions[row].height for row in (2, 3, 4, 6)
+    }
+    # ? "메모" isn't crawled, so the example of the template is kept, and the rows below the written rows are kept
+    assert ws["D2"].value == "예시"
+    assert ws["A6"].value == "합계"
+    assert ws.max_row == 6
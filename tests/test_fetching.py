@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+import pytest
+
+from aiohttp import web
+
+from calibrate import calibrate_page_type
+from market_crawler.extraction import load_content
+from market_crawler.fetching import PageType, use_http_fetcher
+from market_crawler.report import RunReport, current_run_report
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+PRODUCT_HTML = '<html><body><div class="product"><span class="price">10,000</span></div></body></html>'
+
+# ? Price is filled by JavaScript, so it isn't present in the HTTP content
+SHELL_HTML = (
+    '<html><body><div class="product"><span class="price"></span></div></body></html>'
+)
+
+BROWSER_HTML = '<html><body><div class="product"><span class="price">10,000원</span></div></body></html>'
+
+
+@asynccontextmanager
+async def serve() -> AsyncIterator[str]:
+    async def product(_: web.Request):
+        return web.Response(text=PRODUCT_HTML, content_type="text/html")
+
+    async def shell(_: web.Request):
+        return web.Response(text=SHELL_HTML, content_type="text/html")
+
+    async def error(_: web.Request):
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/product", product)
+    app.router.add_get("/shell", shell)
+    app.router.add_get("/error", error)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}"
+    finally:
+        await runner.cleanup()
+
+
+class BrowserResponse:
+    status = 200
+    headers = {"content-type": "text/html; charset=utf-8"}
+
+    async def body(self) -> bytes:
+        return BROWSER_HTML.encode("utf-8")
+
+
+class BrowserRequest:
+    def __init__(self) -> None:
+        self.urls: list[str] = []
+
+    async def get(self, url: str) -> BrowserResponse:
+        self.urls.append(url)
+        return BrowserResponse()
+
+
+class Browser:
+    def __init__(self) -> None:
+        self.request = BrowserRequest()
+
+
+class MissingHTML:
+    file = "product.html"
+
+    async def exists(self) -> bool:
+        return False
+
+
+async def has_price(content: str) -> bool:
+    return 'class="price"></span>' not in content
+
+
+async def load(browser: Browser, url: str) -> str:
+    return await load_content(
+        browser=browser,  # type: ignore
+        url=url,
+        html=MissingHTML(),  # type: ignore
+        on_failure="fetch",
+        fetch_mode="http",
+        validate=has_price,
+    )
+
+
+@pytest.mark.asyncio
+async def test_valid_http_content_doesnt_use_browser():
+    browser = Browser()
+
+    token = current_run_report.set(RunReport())
+    try:
+        async with serve() as base_url, use_http_fetcher() as fetcher:
+            content = await load(browser, f"{base_url}/product")
+    finally:
+        current_run_report.reset(token)
+
+    assert content == PRODUCT_HTML
+    assert browser.request.urls == []
+    assert (fetcher.fetched, fetcher.fallbacks, fetcher.failed) == (1, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_invalid_http_content_falls_back_to_browser():
+    browser = Browser()
+
+    report = RunReport()
+    token = current_run_report.set(report)
+    try:
+        async with serve() as base_url, use_http_fetcher() as fetcher:
+            content = await load(browser, f"{base_url}/shell")
+    finally:
+        current_run_report.reset(token)
+
+    assert content == BROWSER_HTML
+    assert browser.request.urls == [f"{base_url}/shell"]
+    assert (fetcher.fetched, fetcher.fallbacks, fetcher.failed) == (0, 1, 0)
+    assert report.sections["HTTP fetch"] == [
+        "0 pages fetched | 1 fallbacks to browser (selectors not present) | 0 fallbacks to browser (request failed)"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_http_request_falls_back_to_browser():
+    browser = Browser()
+
+    token = current_run_report.set(RunReport())
+    try:
+        async with serve() as base_url, use_http_fetcher() as fetcher:
+            content = await load(browser, f"{base_url}/error")
+    finally:
+        current_run_report.reset(token)
+
+    assert content == BROWSER_HTML
+    assert browser.request.urls == [f"{base_url}/error"]
+    assert (fetcher.fetched, fetcher.fallbacks, fetcher.failed) == (0, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_calibration_loads_the_browser_content_the_same_way_as_the_crawler():
+    browser = Browser()
+
+    async def urls(*_: object) -> list[str]:
+        return [f"{base_url}/product"]
+
+    async def price(content: str, _: str) -> str:
+        return "".join(filter(str.isdigit, content))
+
+    token = current_run_report.set(RunReport())
+    try:
+        async with serve() as base_url, use_http_fetcher() as fetcher:
+            result = await calibrate_page_type(
+                PageType(
+                    name="product",
+                    urls=urls,
+                    extract=price,
+                    on_failure="fetch",
+                    wait_until="networkidle",
+                ),
+                [],
+                browser,  # type: ignore
+                fetcher,
+                samples=3,
+                rate_limit=10,
+                async_timeout=60,
+            )
+    finally:
+        current_run_report.reset(token)
+
+    # ? Browser content is fetched (on_failure="fetch") as the crawler does, instead of visiting the page
+    assert browser.request.urls == [f"{base_url}/product"]
+    assert (result["mode"], result["samples"], result["matched"]) == ("http", 1, 1)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from market_crawler.pipeline import Pipeline, Stage
+from market_crawler.report import RunReport, current_run_report
+
+
+@pytest.mark.asyncio
+async def test_items_pass_through_every_stage_in_their_executors():
+    written: list[tuple[int, str]] = []
+
+    async def fetch(item: int) -> int | None:
+        await asyncio.sleep(0)
+        # ? Odd items are already crawled
+        return item if item % 2 == 0 else None
+
+    def extract(item: int) -> tuple[int, str]:
+        return item * 10, threading.current_thread().name
+
+    async def write(item: tuple[int, str]) -> None:
+        written.append(item)
+
+    async with Pipeline(
+        stages=[
+            Stage(name="fetch", fn=fetch, workers=3),
+            Stage(name="extract", fn=extract, workers=2, executor="thread"),
+            Stage(name="write", fn=write),
+        ],
+    ) as pipeline:
+        await pipeline.run(range(10))
+
+    assert sorted(value for value, _ in written) == [0, 20, 40, 60, 80]
+    assert all(thread.startswith("pipeline") for _, thread in written)
+
+    fetch_stage, extract_stage, write_stage = pipeline.stages
+    assert (fetch_stage.processed, fetch_stage.dropped) == (10, 5)
+    assert (extract_stage.processed, extract_stage.dropped) == (5, 0)
+    assert write_stage.processed == 5
+
+
+@pytest.mark.asyncio
+async def test_coroutine_function_reuses_the_event_loop_of_its_thread():
+    loops: dict[str, set[int]] = {}
+
+    async def extract(item: int) -> int:
+        await asyncio.sleep(0)
+        loops.setdefault(threading.current_thread().name, set()).add(
+            id(asyncio.get_running_loop())
+        )
+        return item
+
+    async with Pipeline(
+        stages=[Stage(name="extract", fn=extract, workers=2, executor="thread")],
+        max_thread_workers=2,
+    ) as pipeline:
+        await pipeline.run(range(20))
+        thread_loops = list(pipeline.thread_loops)
+
+    assert pipeline.stages[0].processed == 20
+    # ? Every thread runs all of its items on one event loop
+    assert all(len(ids) == 1 for ids in loops.values())
+    assert all(loop.is_closed() for loop in thread_loops)
+
+
+@pytest.mark.asyncio
+async def test_slow_stage_bounds_the_queues():
+    release = asyncio.Event()
+
+    async def fetch(item: int) -> int:
+        return item
+
+    async def write(_: int) -> None:
+        await release.wait()
+
+    pipeline = Pipeline(
+        stages=[
+            Stage(name="fetch", fn=fetch, workers=4),
+            Stage(name="write", fn=write),
+        ],
+        queue_size=3,
+    )
+    task = asyncio.create_task(pipeline.run(range(50)))
+    await asyncio.sleep(0.05)
+
+    # ? Write is blocked, so the fetches stop once the queue between the stages is full
+    assert pipeline.stages[0].processed < 50
+    assert all(depth.peak <= 3 for depth in pipeline.depths)
+
+    release.set()
+    await task
+    assert pipeline.stages[1].processed == 50
+
+
+@pytest.mark.asyncio
+async def test_exception_of_a_stage_cancels_the_run():
+    async def fetch(item: int) -> int:
+        if item == 3:
+            raise ValueError("Product not found")
+        return item
+
+    def extract(item: int) -> int:
+        return item
+
+    pipeline = Pipeline(
+        stages=[
+            Stage(name="fetch", fn=fetch),
+            Stage(name="extract", fn=extract, executor="thread"),
+        ]
+    )
+
+    with pytest.raises(ValueError, match="Product not found"):
+        await pipeline.run(range(10))
+
+    pipeline.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_runs_share_the_metrics_and_report_them():
+    async def fetch(item: int) -> int:
+        await asyncio.sleep(0.01)
+        return item
+
+    report = RunReport()
+    token = current_run_report.set(report)
+    try:
+        async with Pipeline(
+            stages=[Stage(name="fetch", fn=fetch, workers=2)]
+        ) as pipeline:
+            await asyncio.gather(pipeline.run(range(4)), pipeline.run(range(6)))
+    finally:
+        current_run_report.reset(token)
+
+    [metrics] = pipeline.metrics()
+    assert metrics.processed == 10
+    assert metrics.throughput > 0
+
+    [line] = report.sections["Pipeline"]
+    assert line.startswith("fetch: 10 items (0 dropped)")
+    assert "Queue depth" in line
+
+
+def test_async_stage_must_be_a_coroutine_function():
+    with pytest.raises(TypeError):
+        Stage(name="extract", fn=lambda item: item)
+
+    with pytest.raises(ValueError):
+        Stage(name="extract", fn=lambda item: item, executor="gpu")
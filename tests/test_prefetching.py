@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from market_crawler.prefetching import Prefetcher
+from market_crawler.report import RunReport, current_run_report
+from market_crawler.singleflight import single_flight
+
+
+@pytest.fixture(autouse=True)
+def run_report():
+    token = current_run_report.set(RunReport())
+    yield
+    current_run_report.reset(token)
+
+
+@pytest.mark.asyncio
+async def test_prefetched_page_is_taken_once_loaded():
+    async def load() -> str:
+        return "<html>Page 2</html>"
+
+    prefetcher = Prefetcher()
+    prefetcher.prefetch("page2", load, engine=None)
+    await prefetcher.tasks["page2"]
+
+    assert prefetcher.take("page2") == "<html>Page 2</html>"
+    assert prefetcher.take("page2") is None
+    assert (prefetcher.used, prefetcher.missed) == (1, 0)
+
+    await prefetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_page_still_being_prefetched_is_loaded_once():
+    loads = 0
+
+    @single_flight(key=lambda url: url)
+    async def load(url: str) -> str:
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return f"<html>{url}</html>"
+
+    prefetcher = Prefetcher()
+    prefetcher.prefetch("page2", lambda: load("page2"), engine=None)
+
+    # ? Crawler reaches the page before its prefetch is finished
+    assert prefetcher.take("page2") is None
+    assert await load("page2") == "<html>page2</html>"
+    assert await prefetcher.tasks["page2"]
+
+    assert loads == 1
+    assert (prefetcher.used, prefetcher.missed) == (0, 1)
+
+    await prefetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_prefetch_is_not_taken():
+    async def load() -> str:
+        raise ConnectionResetError("Connection reset by peer")
+
+    prefetcher = Prefetcher()
+    prefetcher.prefetch("page2", load, engine=None)
+    await asyncio.gather(prefetcher.tasks["page2"], return_exceptions=True)
+
+    assert prefetcher.take("page2") is None
+    assert (prefetcher.used, prefetcher.failed) == (0, 1)
+
+    await prefetcher.close()
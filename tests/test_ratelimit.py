@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import pytest
+
+from market_crawler import ratelimit
+from market_crawler.error import PlaywrightTimeoutError
+from market_crawler.ratelimit import AdaptiveRateLimiter, rate_limited
+
+
+@pytest.fixture(autouse=True)
+def rate_limiters():
+    ratelimit.rate_limiters.clear()
+    yield ratelimit.rate_limiters
+    ratelimit.rate_limiters.clear()
+
+
+def limiter(rate: float = 10, **kwargs: float) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(
+        host="example.com", rate=rate, max_rate=rate * 2, **kwargs
+    )
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_error_status_halves_rate(status: int):
+    rate_limiter = limiter()
+    rate_limiter.record(latency=0.1, status=status, failed=False)
+
+    assert rate_limiter.rate == 5
+    assert rate_limiter.errors == rate_limiter.backoffs == 1
+
+
+def test_timeout_halves_rate():
+    rate_limiter = limiter()
+    rate_limiter.record(latency=30, status=None, failed=True)
+
+    assert rate_limiter.rate == 5
+
+
+def test_client_error_is_healthy():
+    rate_limiter = limiter()
+    rate_limiter.record(latency=0.1, status=404, failed=False)
+
+    assert rate_limiter.rate == 10
+    assert rate_limiter.healthy_streak == 1
+
+
+def test_burst_of_errors_backs_off_once_per_cooldown():
+    rate_limiter = limiter(cooldown=60)
+    for _ in range(5):
+        rate_limiter.record(latency=0.1, status=429, failed=False)
+
+    assert rate_limiter.rate == 5
+    assert rate_limiter.errors == 5
+    assert rate_limiter.backoffs == 1
+
+
+def test_backoff_stops_at_min_rate():
+    rate_limiter = limiter(rate=1, cooldown=0)
+    for _ in range(10):
+        rate_limiter.record(latency=0.1, status=503, failed=False)
+
+    assert rate_limiter.rate == rate_limiter.min_rate
+
+
+def test_healthy_requests_increase_rate_up_to_max():
+    rate_limiter = limiter(rate=2)
+
+    rate_limiter.record(latency=0.1, status=200, failed=False)
+    assert rate_limiter.rate == 2
+
+    rate_limiter.record(latency=0.1, status=200, failed=False)
+    assert rate_limiter.rate == 3
+
+    for _ in range(100):
+        rate_limiter.record(latency=0.1, status=200, failed=False)
+    assert rate_limiter.rate == rate_limiter.max_rate == 4
+
+
+def test_slow_requests_dont_increase_rate():
+    rate_limiter = limiter(rate=2)
+    for _ in range(10):
+        rate_limiter.record(latency=ratelimit.SLOW_LATENCY, status=200, failed=False)
+
+    assert rate_limiter.rate == 2
+    assert rate_limiter.healthy_streak == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_records_status(
+    rate_limiters: dict[str, AdaptiveRateLimiter]
+):
+    async with rate_limited("https://example.com/product/1", 10) as request:
+        request.status = 429
+
+    rate_limiter = rate_limiters["example.com"]
+    assert rate_limiter.requests == 1
+    assert rate_limiter.rate == 5
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_records_timeout(
+    rate_limiters: dict[str, AdaptiveRateLimiter],
+):
+    with pytest.raises(PlaywrightTimeoutError):
+        async with rate_limited("https://example.com/product/1", 10):
+            raise PlaywrightTimeoutError("Timeout 30000ms exceeded")
+
+    assert rate_limiters["example.com"].rate == 5
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_records_connection_error(
+    rate_limiters: dict[str, AdaptiveRateLimiter],
+):
+    with pytest.raises(ConnectionResetError):
+        async with rate_limited("https://example.com/product/1", 10):
+            raise ConnectionResetError("Connection reset by peer")
+
+    rate_limiter = rate_limiters["example.com"]
+    assert rate_limiter.errors == 1
+    assert rate_limiter.rate == 5
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_doesnt_blame_host_for_error_after_response(
+    rate_limiters: dict[str, AdaptiveRateLimiter],
+):
+    with pytest.raises(UnicodeDecodeError):
+        async with rate_limited("https://example.com/product/1", 10) as request:
+            request.status = 200
+            b"\xff".decode("utf-8")
+
+    rate_limiter = rate_limiters["example.com"]
+    assert rate_limiter.errors == 0
+    assert rate_limiter.rate == 10
+
+
+@pytest.mark.asyncio
+async def test_limiter_is_shared_by_host(rate_limiters: dict[str, AdaptiveRateLimiter]):
+    async with rate_limited("https://example.com/a", 10):
+        pass
+    async with rate_limited("https://example.com/b", 50):
+        pass
+
+    assert list(rate_limiters) == ["example.com"]
+    assert rate_limiters["example.com"].max_rate == 20
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+
+from time import perf_counter
+
+import pytest
+
+from market_crawler.error import PlaywrightError, TimeoutException
+from market_crawler.readiness import (
+    SelectorPresent,
+    TextNonEmpty,
+    cancel_measurement,
+    get_readiness_stats,
+    measurements,
+    wait_until_ready,
+)
+from market_crawler.report import RunReport, current_run_report
+
+
+URL = "https://example.com/product/1"
+
+
+class Page:
+    """
+    Page whose selectors and load state are reached after the given delays (or fail with the given errors)
+    """
+
+    def __init__(
+        self,
+        *,
+        ready_after: float,
+        loaded_after: float,
+        ready_error: Exception | None = None,
+        load_error: Exception | None = None,
+    ) -> None:
+        self.ready_after = ready_after
+        self.loaded_after = loaded_after
+        self.ready_error = ready_error
+        self.load_error = load_error
+
+    async def ready(self) -> None:
+        await asyncio.sleep(self.ready_after)
+        if self.ready_error:
+            raise self.ready_error
+
+    async def wait_for_selector(self, selector: str, *, state: str) -> None:
+        await self.ready()
+
+    async def wait_for_function(self, expression: str, *, arg: str) -> None:
+        await self.ready()
+
+    async def wait_for_load_state(self, state: str) -> None:
+        await asyncio.sleep(self.loaded_after)
+        if self.load_error:
+            raise self.load_error
+
+
+@pytest.fixture(autouse=True)
+def run_report():
+    token = current_run_report.set(RunReport())
+    yield
+    current_run_report.reset(token)
+    measurements.clear()
+
+
+READY = (SelectorPresent(".product-list"), TextNonEmpty(".price"))
+
+
+@pytest.mark.asyncio
+async def test_page_is_ready_before_load_state_and_time_saved_is_measured():
+    page = Page(ready_after=0.01, loaded_after=0.2)
+
+    start_time = perf_counter()
+    await wait_until_ready(page, URL, READY, "networkidle", start_time)  # type: ignore
+    assert perf_counter() - start_time < 0.2
+
+    stats = get_readiness_stats(URL)
+    assert (stats.ready, stats.fallbacks, stats.measured) == (1, 0, 0)
+
+    await measurements[page]  # type: ignore
+    assert stats.measured == 1
+    assert stats.saved > 0.1
+
+
+@pytest.mark.asyncio
+async def test_unmet_conditions_fall_back_to_load_state():
+    page = Page(
+        ready_after=0.01,
+        loaded_after=0.05,
+        ready_error=PlaywrightError("Timeout 30000ms exceeded"),
+    )
+
+    await wait_until_ready(page, URL, READY, "networkidle", perf_counter())  # type: ignore
+
+    stats = get_readiness_stats(URL)
+    assert (stats.ready, stats.fallbacks) == (0, 1)
+    assert page not in measurements  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_failed_load_state_raises_timeout():
+    page = Page(
+        ready_after=1,
+        loaded_after=0.01,
+        load_error=PlaywrightError("Timeout 30000ms exceeded"),
+    )
+
+    with pytest.raises(TimeoutException):
+        await wait_until_ready(page, URL, READY, "networkidle", perf_counter())  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_reused_page_stops_measuring_previous_navigation():
+    page = Page(ready_after=0.01, loaded_after=1)
+
+    await wait_until_ready(page, URL, READY, "networkidle", perf_counter())  # type: ignore
+    task = measurements[page]  # type: ignore
+
+    cancel_measurement(page)  # type: ignore
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    stats = get_readiness_stats(URL)
+    assert (stats.measured, stats.unsettled) == (0, 1)
+    assert page not in measurements  # type: ignore
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+
+from pathlib import Path
+
+from market_crawler.resume import (
+    RESUME_MANIFEST,
+    chain_directory,
+    chained_directories,
+    chained_files,
+    hide_chained_files,
+    resolve_file,
+)
+
+
+def dates(tmp_path: Path, *names: str) -> list[str]:
+    directories = [str(tmp_path / name) for name in names]
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    return directories
+
+
+def test_directories_are_chained_to_previous_dates(tmp_path: Path):
+    first, second, third = dates(tmp_path, "20240101", "20240102", "20240103")
+    chain_directory(second, "20240101")
+    chain_directory(third, "20240102")
+
+    assert chained_directories(third) == [third, second, first]
+    assert chained_directories(first) == [first]
+
+
+def test_nearest_date_shadows_the_previous_dates(tmp_path: Path):
+    first, second = dates(tmp_path, "20240101", "20240102")
+    chain_directory(second, "20240101")
+
+    for directory, filename in (
+        (first, "page_1.csv"),
+        (first, "page_2.csv"),
+        (second, "page_2.csv"),
+        (second, "page_3.csv"),
+    ):
+        Path(directory, filename).touch()
+
+    assert chained_files(second, "*.csv") == [
+        os.path.join(first, "page_1.csv"),
+        os.path.join(second, "page_2.csv"),
+        os.path.join(second, "page_3.csv"),
+    ]
+    assert resolve_file(second, "page_1.csv") == os.path.join(first, "page_1.csv")
+    assert resolve_file(second, "page_4.csv") is None
+
+
+def test_chain_stops_at_cycles_and_deleted_dates(tmp_path: Path):
+    first, second = dates(tmp_path, "20240101", "20240102")
+    chain_directory(first, "20240102")
+    chain_directory(second, "20240101")
+
+    assert chained_directories(second) == [second, first]
+
+    (third,) = dates(tmp_path, "20240103")
+    chain_directory(third, "20231231")
+
+    assert chained_directories(third) == [third]
+
+
+def test_unreadable_manifest_stops_the_chain(tmp_path: Path):
+    (directory,) = dates(tmp_path, "20240102")
+    Path(directory, RESUME_MANIFEST).write_text("{", encoding="utf-8")
+
+    assert chained_directories(directory) == [directory]
+
+
+def test_hidden_files_of_previous_dates_are_not_read(tmp_path: Path):
+    first, second, third = dates(tmp_path, "20240101", "20240102", "20240103")
+    chain_directory(second, "20240101")
+
+    for directory, filename in (
+        (first, "bags_temporary.csv"),
+        (first, "shoes_temporary.csv"),
+        (second, "final_temporary.csv"),
+    ):
+        Path(directory, filename).touch()
+
+    hide_chained_files(second, ["bags_temporary.csv", "shoes_temporary.csv"])
+    # ? Chaining the date again (i.e., another --resume run on the same date) keeps them hidden
+    chain_directory(second, "20240101")
+    chain_directory(third, "20240102")
+
+    for directory in (second, third):
+        assert chained_files(directory, "*_temporary.csv") == [
+            os.path.join(second, "final_temporary.csv")
+        ]
+        assert resolve_file(directory, "bags_temporary.csv") is None
+
+    # ? File written again in the date directory is not hidden
+    Path(second, "bags_temporary.csv").touch()
+    assert resolve_file(third, "bags_temporary.csv") == os.path.join(
+        second, "bags_temporary.csv"
+    )
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from dunia.login import LoginInfo
+from market_crawler import session
+from market_crawler.report import RunReport, current_run_report
+from market_crawler.session import SessionProbe, log_in
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+
+PROBE = SessionProbe(
+    url="https://market.test/",
+    logged_in_query="a[href*='/exec/front/Member/logout']",
+)
+
+LOGGED_IN_HTML = (
+    '<html><body><a href="/exec/front/Member/logout/">로그아웃</a></body></html>'
+)
+LOGGED_OUT_HTML = '<html><body><a href="/member/login.html">로그인</a></body></html>'
+
+LOGIN_INFO = LoginInfo(
+    login_url="https://market.test/member/login.html",
+    user_id="user",
+    password="password",
+    user_id_query="#member_id",
+    password_query="#member_passwd",
+    login_button_query="a.btnLogin",
+)
+
+
+class Response:
+    status = 200
+    headers = {"content-type": "text/html; charset=utf-8"}
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+    async def body(self) -> bytes:
+        return self.content.encode("utf-8")
+
+
+class Market:
+    """
+    Server side of the market, only the sessions in "valid" are logged in
+    """
+
+    def __init__(self, *valid: str) -> None:
+        self.valid = set(valid)
+        self.logins = 0
+
+    async def log_in(self, browser: Browser) -> None:
+        self.logins += 1
+        self.valid.add(token := f"new-{self.logins}")
+        browser.cookies.append({"name": "session", "value": token})
+
+
+class Request:
+    def __init__(self, browser: Browser) -> None:
+        self.browser = browser
+
+    async def get(self, url: str) -> Response:
+        logged_in = any(
+            cookie["value"] in self.browser.market.valid
+            for cookie in self.browser.cookies
+        )
+        return Response(LOGGED_IN_HTML if logged_in else LOGGED_OUT_HTML)
+
+
+class Browser:
+    def __init__(self, market: Market) -> None:
+        self.market = market
+        self.cookies: list[dict[str, Any]] = []
+        self.request = Request(self)
+
+    async def add_cookies(self, cookies: list[dict[str, Any]]) -> None:
+        self.cookies.extend(cookies)
+
+    async def clear_cookies(self) -> None:
+        self.cookies = []
+
+    async def add_init_script(self, script: str) -> None:
+        pass
+
+    async def storage_state(self) -> dict[str, Any]:
+        return {"cookies": self.cookies, "origins": []}
+
+
+@pytest.fixture
+def session_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "sessions" / "account.json"
+    monkeypatch.setattr(session, "session_file", lambda *_: str(path))
+    return path
+
+
+@pytest.fixture
+def report():
+    report = RunReport()
+    token = current_run_report.set(report)
+    yield report
+    current_run_report.reset(token)
+
+
+def save(path: Path, token: str) -> None:
+    path.parent.mkdir(parents=True)
+    path.write_text(
+        json.dumps({"cookies": [{"name": "session", "value": token}], "origins": []}),
+        encoding="utf-8",
+    )
+
+
+def saved_tokens(path: Path) -> list[str]:
+    state = json.loads(path.read_text(encoding="utf-8"))
+    return [cookie["value"] for cookie in state["cookies"]]
+
+
+async def run(market: Market) -> Browser:
+    browser = Browser(market)
+    await log_in(
+        browser,  # type: ignore
+        LOGIN_INFO,
+        sitename="market",
+        probe=PROBE,
+        login=market.log_in,  # type: ignore
+    )
+    return browser
+
+
+@pytest.mark.asyncio
+async def test_session_is_saved_after_login(session_path: Path, report: RunReport):
+    market = Market()
+
+    await run(market)
+
+    assert market.logins == 1
+    assert saved_tokens(session_path) == ["new-1"]
+    assert report.sections["Session"] == ["market: logged in and session saved"]
+
+
+@pytest.mark.asyncio
+async def test_valid_session_is_restored_without_login(
+    session_path: Path, report: RunReport
+):
+    market = Market("saved")
+    save(session_path, "saved")
+
+    browser = await run(market)
+
+    assert market.logins == 0
+    assert browser.cookies == [{"name": "session", "value": "saved"}]
+    assert report.sections["Session"] == ["market: saved session reused"]
+
+
+@pytest.mark.asyncio
+async def test_expired_session_logs_in_again(session_path: Path, report: RunReport):
+    market = Market()
+    save(session_path, "expired")
+
+    browser = await run(market)
+
+    assert market.logins == 1
+    # ? Cookies of the expired session are cleared before the login
+    assert browser.cookies == [{"name": "session", "value": "new-1"}]
+    assert saved_tokens(session_path) == ["new-1"]
+    assert report.sections["Session"] == ["market: logged in and session saved"]
+
+
+@pytest.mark.asyncio
+async def test_session_is_not_saved_without_probe(
+    session_path: Path, report: RunReport
+):
+    market = Market()
+
+    await log_in(
+        Browser(market),  # type: ignore
+        LOGIN_INFO,
+        sitename="market",
+        login=market.log_in,  # type: ignore
+    )
+
+    assert market.logins == 1
+    assert not session_path.exists()
+    assert report.sections["Session"] == ["market: logged in (no session probe)"]
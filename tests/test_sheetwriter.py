@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import re
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from openpyxl import Workbook, load_workbook
+
+from market_crawler.sheetwriter import MAIN_NAMESPACE, SheetTemplate, SheetWriter
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+COLUMNS = ["상품명", "판매가", "품절", "메모"]
+
+
+def save(tmp_path: Path, *dfs: pd.DataFrame, filled: set[str]) -> list[tuple]:
+    wb = Workbook(write_only=True)
+    wb.create_sheet().append(COLUMNS)
+
+    writer = SheetWriter(columns=COLUMNS, filled=filled)
+    for df in dfs:
+        writer.append(df)
+
+    filename = str(tmp_path / "output.xlsx")
+    writer.save(wb, filename)
+
+    return list(load_workbook(filename).active.iter_rows(values_only=True))
+
+
+def test_rows_are_written_below_the_header(tmp_path: Path):
+    rows = save(
+        tmp_path,
+        pd.DataFrame(
+            {
+                "상품명": ["A & <B>", "=SUM(A1)"],
+                "판매가": [1000, 2000.5],
+                "품절": [True, False],
+            }
+        ),
+        pd.DataFrame({"상품명": ["C", None, ""], "판매가": [3000, np.nan, 4000]}),
+        filled=set(COLUMNS),
+    )
+
+    assert rows == [
+        tuple(COLUMNS),
+        ("A & <B>", 1000, True, None),
+        # ? Strings beginning with "=" are not formulas
+        ("=SUM(A1)", 2000.5, False, None),
+        ("C", 3000, None, None),
+        (None, None, None, None),
+        (None, 4000, None, None),
+    ]
+
+
+def test_columns_that_are_not_filled_are_empty(tmp_path: Path):
+    rows = save(
+        tmp_path,
+        pd.DataFrame({"상품명": ["A"], "판매가": ["1000"], "메모": ["memo"]}),
+        filled={"상품명", "판매가"},
+    )
+
+    assert rows == [tuple(COLUMNS), ("A", "1000", None, None)]
+
+
+def test_illegal_characters_are_removed(tmp_path: Path):
+    rows = save(
+        tmp_path, pd.DataFrame({"상품명": ["A\x00B\x1fC"]}), filled=set(COLUMNS)
+    )
+
+    assert rows[1][0] == "ABC"
+
+
+def save_template(filename: str, rewrite_sheet: Callable[[str], str]) -> None:
+    wb = Workbook()
+    wb.active.append(COLUMNS)  # type: ignore
+    wb.save(filename)
+
+    with ZipFile(filename) as source:
+        items = {name: source.read(name) for name in source.namelist()}
+
+    sheet = "xl/worksheets/sheet1.xml"
+    items[sheet] = rewrite_sheet(items[sheet].decode()).encode()
+
+    with ZipFile(filename, "w") as output:
+        for name, data in items.items():
+            output.writestr(name, data)
+
+
+def prefix_elements(xml: str) -> str:
+    # ? Same worksheet with the "x:" prefix on every element instead of the default namespace
+    xml = xml.replace(f'xmlns="{MAIN_NAMESPACE}"', f'xmlns:x="{MAIN_NAMESPACE}"')
+    return re.sub(r"<(/?)(\w+)([\s/>])", r"<\1x:\2\3", xml)
+
+
+def test_rows_are_written_into_namespace_prefixed_template(tmp_path: Path):
+    template_file = str(tmp_path / "template.xlsx")
+    save_template(template_file, prefix_elements)
+
+    writer = SheetWriter(
+        columns=COLUMNS,
+        filled=set(COLUMNS),
+        template=SheetTemplate.read(template_file),
+    )
+    writer.append(pd.DataFrame({"상품명": ["A", "B"], "판매가": [1000, 2000]}))
+
+    filename = str(tmp_path / "output.xlsx")
+    writer.save_template(filename)
+
+    assert list(load_workbook(filename).active.iter_rows(values_only=True)) == [
+        tuple(COLUMNS),
+        ("A", 1000, None, None),
+        ("B", 2000, None, None),
+    ]
+
+
+def test_template_without_sheet_data_is_rejected_with_its_name(tmp_path: Path):
+    template_file = str(tmp_path / "template.xlsx")
+    save_template(
+        template_file, lambda xml: re.sub(r"<sheetData>.*</sheetData>", "", xml)
+    )
+
+    with pytest.raises(ValueError, match="template.xlsx"):
+        SheetTemplate.read(template_file)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from market_crawler.extraction import load_content
+from market_crawler.report import RunReport, current_run_report
+from market_crawler.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_with_same_key_are_coalesced():
+    flight = SingleFlight(name="tests")
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "content"
+
+    results = await asyncio.gather(*(flight.do("url", call) for _ in range(5)))
+
+    assert results == ["content"] * 5
+    assert calls == 1
+    assert (flight.calls, flight.coalesced) == (5, 4)
+    assert flight.in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_calls_with_different_keys_are_not_coalesced():
+    flight = SingleFlight(name="tests")
+
+    async def call(key: str) -> str:
+        await asyncio.sleep(0.01)
+        return key
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: call("a")), flight.do("b", lambda: call("b"))
+    )
+
+    assert results == ["a", "b"]
+    assert flight.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_exception_is_raised_to_every_caller():
+    flight = SingleFlight(name="tests")
+
+    async def call() -> str:
+        await asyncio.sleep(0.01)
+        raise TimeoutError("url")
+
+    results = await asyncio.gather(
+        *(flight.do("url", call) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, TimeoutError) for result in results)
+    assert flight.in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_doesnt_cancel_the_others():
+    flight = SingleFlight(name="tests")
+    started = asyncio.Event()
+
+    async def call() -> str:
+        started.set()
+        await asyncio.sleep(0.05)
+        return "content"
+
+    first = asyncio.create_task(flight.do("url", call))
+    await started.wait()
+    second = asyncio.create_task(flight.do("url", call))
+    await asyncio.sleep(0)
+
+    first.cancel()
+
+    assert await second == "content"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_call_after_completion_is_not_coalesced():
+    flight = SingleFlight(name="tests")
+
+    async def call() -> str:
+        return "content"
+
+    await flight.do("url", call)
+    await flight.do("url", call)
+
+    assert (flight.calls, flight.coalesced) == (2, 0)
+
+
+class SavedHTML:
+    def __init__(self) -> None:
+        self.file = "category.html"
+        self.loads = 0
+
+    async def exists(self) -> bool:
+        return True
+
+    async def load(self) -> str:
+        self.loads += 1
+        await asyncio.sleep(0.01)
+        return "<html></html>"
+
+
+@pytest.mark.asyncio
+async def test_load_content_only_coalesces_calls_that_load_the_same_way():
+    browser, html = object(), SavedHTML()
+
+    token = current_run_report.set(RunReport())
+    try:
+        await asyncio.gather(
+            load_content(browser=browser, url="url", html=html, on_failure="fetch"),  # type: ignore
+            load_content(browser=browser, url="url", html=html, on_failure="visit"),  # type: ignore
+            load_content(browser=browser, url="url", html=html, on_failure="visit"),  # type: ignore
+        )
+    finally:
+        current_run_report.reset(token)
+
+    assert html.loads == 2
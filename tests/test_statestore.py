@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import pickle
+
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from market_crawler.report import RunReport, current_run_report, get_run_report
+from market_crawler.state import CategoryState, ProductState, get_product_state
+from market_crawler.statestore import (
+    StateStore,
+    close_state_store,
+    flush_state_stores,
+    get_state_store,
+    report_state_stores,
+    state_stores,
+)
+
+
+DATE = "20240101"
+
+
+@pytest.fixture
+def directory(tmp_path: Path) -> str:
+    return str(tmp_path / "states")
+
+
+@pytest.fixture
+def open_store(directory: str) -> Iterator[Callable[..., StateStore]]:
+    stores: list[StateStore] = []
+
+    def open_store(**kwargs: Any) -> StateStore:
+        stores.append(store := StateStore(directory=directory, **kwargs))
+        return store
+
+    yield open_store
+
+    for store in stores:
+        store.close()
+
+
+def save_pickle_category(directory: str, name: str, pageno: int) -> bytes:
+    category_state = CategoryState(
+        name=name, pageno=pageno, date=DATE, sitename="tests"
+    )
+    state = pickle.dumps(category_state)
+
+    os.makedirs(os.path.join(directory, DATE), exist_ok=True)
+    with open(os.path.join(directory, DATE, f"{name}.pkl"), "wb") as f:
+        f.write(state)
+
+    return state
+
+
+def save_pickle_product(
+    directory: str, category_name: str, productid: str, done: bool
+) -> None:
+    product_state = ProductState(
+        productid=productid, category_name=category_name, date=DATE, sitename="tests"
+    )
+    product_state.done = done
+
+    os.makedirs(os.path.join(directory, DATE, category_name), exist_ok=True)
+    with open(
+        os.path.join(directory, DATE, category_name, f"{productid}.pkl"), "wb"
+    ) as f:
+        f.write(pickle.dumps(product_state))
+
+
+def test_pickle_states_are_migrated(
+    directory: str, open_store: Callable[..., StateStore]
+):
+    state = save_pickle_category(directory, "bags", 3)
+    save_pickle_product(directory, "bags", "1001", True)
+    save_pickle_product(directory, "bags", "1002", False)
+
+    store = open_store()
+
+    assert store.migrated == 3
+    assert store.category_state(DATE, "bags") == state
+    assert pickle.loads(state).pageno == 3
+    assert store.product_state(DATE, "bags", "1001") is True
+    assert store.product_state(DATE, "bags", "1002") is False
+    assert store.product_state(DATE, "bags", "1003") is None
+    assert store.done_products(DATE, "bags") == {"1001"}
+
+
+def test_pickle_states_are_migrated_once(
+    directory: str, open_store: Callable[..., StateStore]
+):
+    save_pickle_product(directory, "bags", "1001", True)
+    open_store().close()
+
+    # ? Pickle file that is added after the date is migrated is not imported
+    save_pickle_product(directory, "bags", "1002", True)
+    store = open_store()
+
+    assert store.migrated == 0
+    assert store.product_state(DATE, "bags", "1002") is None
+
+
+def test_unreadable_pickle_states_are_skipped(
+    directory: str, open_store: Callable[..., StateStore]
+):
+    save_pickle_product(directory, "bags", "1001", True)
+    with open(os.path.join(directory, DATE, "bags", "1002.pkl"), "wb") as f:
+        f.write(b"not a pickle")
+    with open(os.path.join(directory, DATE, "empty.pkl"), "wb"):
+        pass
+
+    store = open_store()
+
+    assert store.migrated == 1
+    assert store.product_state(DATE, "bags", "1001") is True
+    assert store.product_state(DATE, "bags", "1002") is None
+    assert store.category_state(DATE, "empty") is None
+
+
+def test_states_are_committed_in_batches(open_store: Callable[..., StateStore]):
+    store = open_store(batch_size=2)
+
+    store.save_product_state(DATE, "bags", "1001", True)
+    assert store.commit_due is False
+
+    store.save_product_state(DATE, "bags", "1002", True)
+    assert store.commit_due is True
+
+    store.commit()
+    store.flush()
+
+    assert store.commits == 1
+    assert store.connection.execute(
+        "SELECT COUNT(*) FROM product_states"
+    ).fetchone() == (2,)
+
+
+def test_uncommitted_states_are_found(open_store: Callable[..., StateStore]):
+    store = open_store()
+
+    assert store.done_products(DATE, "bags") == set()
+
+    store.save_product_state(DATE, "bags", "1001", True)
+    batch = store.checkpoint()
+    store.save_product_state(DATE, "bags", "1002", True)
+
+    # ? Batch that isn't submitted yet (see market_crawler.state.commit_states())
+    assert batch is not None and not batch.submitted
+    assert store.product_state(DATE, "bags", "1001") is True
+    assert store.product_state(DATE, "bags", "1002") is True
+    assert store.done_products(DATE, "bags") == {"1001", "1002"}
+
+    store.submit(batch)
+    store.flush()
+
+    assert store.connection.execute(
+        "SELECT COUNT(*) FROM product_states"
+    ).fetchone() == (2,)
+
+
+def test_failed_batch_is_pending_again(open_store: Callable[..., StateStore]):
+    store = open_store()
+
+    store.save_product_state(DATE, "bags", "1001", True)
+    batch = store.checkpoint()
+    assert batch is not None
+
+    batch.future.set_exception(OSError("rows are not written"))
+    store.save_product_state(DATE, "bags", "1002", False)
+    store.flush()
+
+    assert store.connection.execute(
+        "SELECT productid, done FROM product_states ORDER BY productid"
+    ).fetchall() == [("1001", 1), ("1002", 0)]
+
+
+def test_states_are_committed_on_close(open_store: Callable[..., StateStore]):
+    store = open_store()
+    store.save_product_state(DATE, "bags", "1001", True)
+    store.checkpoint()
+    store.save_product_state(DATE, "bags", "1002", True)
+    store.close()
+
+    assert open_store().done_products(DATE, "bags") == {"1001", "1002"}
+
+
+@pytest.mark.asyncio
+async def test_every_market_flushes_and_reports_its_own_store(tmp_path: Path):
+    directories = [str(tmp_path / market / "states") for market in ("a", "b")]
+    other_market_saved = asyncio.Event()
+
+    async def run_market(directory: str, other_directory: str) -> RunReport:
+        current_run_report.set(report := RunReport())
+
+        store = get_state_store(directory)
+        store.save_product_state(DATE, "bags", "1001", True)
+
+        if directory == directories[0]:
+            # ? The other market is still crawling when this one is finished
+            await other_market_saved.wait()
+            await asyncio.to_thread(flush_state_stores)
+            report_state_stores()
+
+            assert store.connection.execute(
+                "SELECT COUNT(*) FROM product_states"
+            ).fetchone() == (1,)
+            assert state_stores[other_directory].pending.products
+        else:
+            other_market_saved.set()
+
+        return report
+
+    try:
+        report, _ = await asyncio.gather(
+            run_market(directories[0], directories[1]),
+            run_market(directories[1], directories[0]),
+        )
+    finally:
+        for directory in directories:
+            close_state_store(directory)
+
+    [line] = report.sections["State store"]
+    assert line.startswith("a: ")
+    assert get_run_report() is not report
+
+
+@pytest.mark.asyncio
+async def test_preloaded_product_states_match_per_product_lookup(
+    open_store: Callable[..., StateStore]
+):
+    store = open_store(batch_size=100)
+    directory = ProductState(
+        productid="", category_name="bags", date=DATE, sitename="tests"
+    ).directory
+    state_stores[directory] = store
+
+    store.save_product_state(DATE, "bags", "1001", True)
+    store.save_product_state(DATE, "bags", "1002", False)
+    store.save_product_state(DATE, "bags", "1004", True)
+    store.commit()
+    store.flush()
+
+    # ? Batch that isn't submitted yet, and states that are only pending
+    store.save_product_state(DATE, "bags", "1003", True)
+    store.checkpoint()
+    store.save_product_state(DATE, "bags", "1004", False)
+
+    productids = ["1001", "1002", "1003", "1004", "1005"]
+
+    async def skipped(preload: bool) -> list[str]:
+        config = SimpleNamespace(
+            USE_PRODUCT_SAVE_STATES=True,
+            PRELOAD_PRODUCT_STATES=preload,
+            SITENAME="tests",
+        )
+        return [
+            productid
+            for productid in productids
+            if await get_product_state(config, productid, "bags", DATE) is None  # type: ignore
+        ]
+
+    try:
+        assert await skipped(preload=False) == ["1001", "1003"]
+        assert await skipped(preload=True) == ["1001", "1003"]
+
+        # ? Products saved after the category is preloaded
+        store.save_product_state(DATE, "bags", "1001", False)
+        store.save_product_state(DATE, "bags", "1005", True)
+
+        assert await skipped(preload=True) == ["1003", "1005"]
+        assert await skipped(preload=False) == ["1003", "1005"]
+    finally:
+        del state_stores[directory]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from market_crawler import tempreader
+from market_crawler.tempreader import TEMP_MANIFEST, load_manifest, read_temporary_files
+
+
+HEADER = "상품명,판매가\n"
+
+
+def save(directory: Path, page: int, *rows: str) -> str:
+    filename = directory / f"products_cat_{page}_temporary.csv"
+    filename.write_text(HEADER + "".join(f"{row}\n" for row in rows), "utf-8-sig")
+    return str(filename)
+
+
+def read(directory: Path) -> list[list[str]]:
+    (table,) = read_temporary_files(str(directory))
+    return table.values.tolist()
+
+
+@pytest.fixture
+def directory(tmp_path: Path) -> Path:
+    save(tmp_path, 1, "A,1000", "B,2000")
+    save(tmp_path, 2, "C,3000")
+    save(tmp_path, 3, "D,4000")
+    return tmp_path
+
+
+@pytest.fixture
+def parsed(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """
+    Files that are parsed (i.e., not taken from the manifest)
+    """
+    parsed: list[str] = []
+    read_bytes = tempreader.read_bytes
+
+    def read_and_record(filename: str) -> bytes:
+        parsed.append(os.path.basename(filename))
+        return read_bytes(filename)
+
+    monkeypatch.setattr(tempreader, "read_bytes", read_and_record)
+    return parsed
+
+
+def test_same_as_reading_every_file(directory: Path):
+    expected = pd.concat(
+        [
+            pd.read_csv(filename, encoding="utf-8-sig", dtype="str")
+            for filename in sorted(directory.glob("*_temporary.csv"))
+        ],
+        ignore_index=True,
+    )
+
+    (table,) = read_temporary_files(str(directory))
+
+    pd.testing.assert_frame_equal(table.reset_index(drop=True), expected)
+
+
+def test_unchanged_files_are_taken_from_the_manifest(
+    directory: Path, parsed: list[str]
+):
+    first = read(directory)
+    assert len(parsed) == 3
+
+    parsed.clear()
+    assert read(directory) == first
+    assert parsed == []
+
+
+def test_changed_file_is_parsed_again(directory: Path, parsed: list[str]):
+    read(directory)
+    parsed.clear()
+
+    save(directory, 2, "C,3000", "C2,3500")
+
+    assert read(directory) == [
+        ["A", "1000"],
+        ["B", "2000"],
+        ["C", "3000"],
+        ["C2", "3500"],
+        ["D", "4000"],
+    ]
+    assert parsed == ["products_cat_2_temporary.csv"]
+
+
+def test_file_with_same_size_and_new_mtime_is_parsed_again(
+    directory: Path, parsed: list[str]
+):
+    read(directory)
+    parsed.clear()
+
+    filename = save(directory, 3, "E,5000")
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert read(directory)[-1] == ["E", "5000"]
+    assert parsed == ["products_cat_3_temporary.csv"]
+
+
+def test_added_and_removed_files_update_the_manifest(directory: Path):
+    read(directory)
+
+    os.remove(directory / "products_cat_2_temporary.csv")
+    save(directory, 4, "F,6000")
+
+    assert read(directory) == [
+        ["A", "1000"],
+        ["B", "2000"],
+        ["D", "4000"],
+        ["F", "6000"],
+    ]
+    assert sorted(
+        os.path.basename(filename) for filename in load_manifest(str(directory)).files
+    ) == [
+        "products_cat_1_temporary.csv",
+        "products_cat_3_temporary.csv",
+        "products_cat_4_temporary.csv",
+    ]
+
+
+def test_unreadable_manifest_is_ignored(directory: Path, parsed: list[str]):
+    first = read(directory)
+    (directory / TEMP_MANIFEST).write_bytes(b"not a pickle")
+    parsed.clear()
+
+    assert read(directory) == first
+    assert len(parsed) == 3
+
+
+def test_row_same_as_the_header_is_kept(tmp_path: Path):
+    save(tmp_path, 1, "A,1000")
+    save(tmp_path, 2, "상품명,판매가", "B,2000")
+
+    assert read(tmp_path) == [["A", "1000"], ["상품명", "판매가"], ["B", "2000"]]